@@ -47,6 +47,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,7 +94,10 @@ DATABASES = {
         'NAME': os.environ.get("DB_NAME"),
         'USER': os.environ.get("DB_USER"),
         'PASSWORD': os.environ.get("DB_PASS"),
-        # 'DISABLE_SERVER_SIDE_CURSORS': True,
+        # Needed behind PgBouncer in transaction pooling mode.
+        'DISABLE_SERVER_SIDE_CURSORS': bool(
+            int(os.environ.get("DB_DISABLE_SERVER_SIDE_CURSORS", 0))
+        ),
     }
 }
 
@@ -134,6 +139,19 @@ MEDIA_URL = '/static/media/'
 STATIC_ROOT = '/vol/web/static'
 MEDIA_ROOT = '/vol/web/media'
 
+# collectstatic writes hashed names plus .gz/.br copies the proxy serves.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Responses smaller than this are sent uncompressed.
+COMPRESSION_MIN_SIZE = 1024
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -141,10 +159,72 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = "core.User"
 
+# Rows fetched per round trip when streaming recipe exports.
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 2000))
+
+# Query instrumentation (core.middleware.QueryBudgetMiddleware)
+# Budgets are keyed by URL view name, e.g. "recipe:recipe-list".
+
+QUERY_SLOW_THRESHOLD_MS = int(os.environ.get("QUERY_SLOW_THRESHOLD_MS", 200))
+QUERY_BUDGET_DEFAULT = int(os.environ.get("QUERY_BUDGET_DEFAULT", 50))
+QUERY_BUDGETS = {
+    # Runs a fixed number of queries per batch of imported rows.
+    "recipe:recipe-import": 1000,
+    # The default budget for each of up to BATCH_MAX_OPERATIONS requests.
+    "batch": QUERY_BUDGET_DEFAULT * 20,
+}
+# Raise instead of logging overruns; app.test_settings turns it on.
+QUERY_BUDGET_STRICT = bool(int(os.environ.get("QUERY_BUDGET_STRICT", 0)))
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # orjson based, both fall back to DRF's stock JSON classes.
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Admin change lists above this many rows show an estimated count.
+ADMIN_COUNT_ESTIMATE_THRESHOLD = 10000
+
+# API lists count exactly up to this many rows, then estimate.
+PAGINATION_EXACT_COUNT_THRESHOLD = 1000
+
+# Similar recipes kept per recipe, and recipes scored to find them.
+SIMILAR_RECIPES_K = 20
+SIMILAR_RECIPES_CANDIDATES = 1000
+# Recipes refreshed when a change commits; larger changes are left to
+# `refresh_similar_recipes`.
+SIMILAR_RECIPES_REFRESH_LIMIT = 20
+
+# Sub-requests accepted by one call of the batch endpoint.
+BATCH_MAX_OPERATIONS = 20
+
+# Delta sync: rows per table and call, how long before now changes are
+# assumed committed, how long an open transaction may hold sync back and
+# how long deletions are kept.
+SYNC_PAGE_SIZE = 500
+SYNC_SETTLE_SECONDS = 1
+SYNC_TOMBSTONE_RETENTION_DAYS = 90
+
+# Server-sent change events: keep-alive comment interval and the delay
+# before clients reconnect.
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_RETRY_MS = 3000
+
+# How long responses to writes with an Idempotency-Key are replayed.
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+
+# Precomputed OpenAPI schema, regenerate with `manage.py build_schema`.
+SCHEMA_FILE = BASE_DIR / "schema.yml"
+SCHEMA_CACHE_MAX_AGE = int(os.environ.get("SCHEMA_CACHE_MAX_AGE", 300))
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Recipe App Project API',
     'DESCRIPTION': '',
@@ -0,0 +1,8 @@
+"""
+Settings for running the test suite, e.g.
+`python manage.py test --settings=app.test_settings`.
+"""
+from .settings import *  # noqa: F401,F403
+
+# Fail tests whose requests overrun their query budget.
+QUERY_BUDGET_STRICT = True
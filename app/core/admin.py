@@ -1,20 +1,91 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as CustomUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .deletion import request_deletion
 from .models import Recipe, Tag, Ingredient
 
 
+def estimated_count(model, using="default"):
+    """Row count of `model`'s table from planner statistics, or None.
+
+    `pg_class.reltuples` is refreshed by autovacuum/ANALYZE and is -1 for a
+    table that was never analyzed.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that skips `COUNT(*)` on large unfiltered change lists.
+
+    Counting millions of rows means a full scan on PostgreSQL; without
+    filters the planner's estimate is used instead once the table has more
+    than `ADMIN_COUNT_ESTIMATE_THRESHOLD` rows.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and \
+                    estimate >= settings.ADMIN_COUNT_ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class UsedListFilter(admin.SimpleListFilter):
+    title = "استفاده"
+    parameter_name = "used"
+
+    def lookups(self, request, model_admin):
+        return [("1", "استفاده شده"), ("0", "استفاده نشده")]
+
+    def queryset(self, request, queryset):
+        if self.value() == "1":
+            return queryset.filter(recipe_count__gt=0)
+        if self.value() == "0":
+            return queryset.filter(recipe_count=0)
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Change lists without full counts and foreign keys loaded by join."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ["user"]
+    autocomplete_fields = ["user"]
+
+
 @admin.register(get_user_model())
 class UserAdmin(CustomUserAdmin):
     list_display = ["email", "name", "is_staff", "is_superuser", "is_active"]
     ordering = ["id"]
+    search_fields = ["email__startswith", "name__startswith"]
     fieldsets = [(None, {"fields": ["email", "name"]}),
                  ("دسترسی ها",
                   {"fields": ["is_staff", "is_superuser", "is_active"]}
                   ),
-                 ("تاریخ ها", {"fields": ["last_login"]}),
+                 ("تاریخ ها",
+                  {"fields": ["last_login", "deletion_requested_at"]}
+                  ),
                  ]
-    readonly_fields = ["last_login"]
+    readonly_fields = ["last_login", "deletion_requested_at"]
     add_fieldsets = [
         [None, {
             "fields": [
@@ -30,17 +101,42 @@ class UserAdmin(CustomUserAdmin):
         }]
     ]
 
+    def get_deleted_objects(self, objs, request):
+        # Collecting every dependent row for the confirmation page would
+        # be as slow as the cascade itself.
+        return [str(obj) for obj in objs], {}, set(), []
+
+    def delete_model(self, request, obj):
+        # Power users own too many rows to cascade within a request, the
+        # purge_users command deletes them in batches.
+        request_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            request_deletion(user)
+
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
-    pass
+class RecipeAdmin(LargeTableAdmin):
+    list_display = ["title", "user", "price", "time_minutes"]
+    list_filter = [("image", admin.EmptyFieldListFilter)]
+    search_fields = ["title__startswith"]
+    autocomplete_fields = ["user", "tags", "ingredients"]
 
 
 @admin.register(Tag)
-class TagAdmin(admin.ModelAdmin):
-    pass
+class TagAdmin(LargeTableAdmin):
+    list_display = ["name", "user", "recipe_count"]
+    ordering = ["name", "id"]
+    list_filter = [UsedListFilter]
+    search_fields = ["name__startswith"]
+    readonly_fields = ["recipe_count"]
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
-    pass
+class IngredientAdmin(LargeTableAdmin):
+    list_display = ["name", "user", "recipe_count"]
+    ordering = ["name", "id"]
+    list_filter = [UsedListFilter]
+    search_fields = ["name__startswith"]
+    readonly_fields = ["recipe_count"]
@@ -0,0 +1,30 @@
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from rest_framework.authentication import BaseAuthentication
+
+# Attribute of a batch sub-request holding the batch request.
+BATCH_REQUEST = "batch_request"
+
+
+class BatchAuthentication(BaseAuthentication):
+    """Authenticate a batch sub-request as the user of its batch request.
+
+    Only `core.batch` sets the attribute, clients can't reach it.
+    """
+    def authenticate(self, request):
+        # Looked up on the wrapped HttpRequest.
+        batch = getattr(request, BATCH_REQUEST, None)
+        if batch is None:
+            return None
+        return batch.user, batch.auth
+
+
+class BatchAuthenticationScheme(OpenApiAuthenticationExtension):
+    """Nothing to document, clients authenticate the batch request."""
+    target_class = BatchAuthentication
+    name = []
+
+    def get_security_requirement(self, auto_schema):
+        return None
+
+    def get_security_definition(self, auto_schema):
+        return []
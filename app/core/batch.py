@@ -0,0 +1,182 @@
+import logging
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from drf_spectacular.utils import extend_schema
+from rest_framework import serializers, status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import BATCH_REQUEST
+from core.renderers import FastJSONRenderer
+
+logger = logging.getLogger(__name__)
+
+METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE"]
+NAMESPACES = {"user", "recipe"}
+
+# Request headers a sub-request shares with the batch request.
+INHERITED_META = [
+    "SERVER_NAME", "SERVER_PORT", "REMOTE_ADDR", "HTTP_HOST",
+    "HTTP_USER_AGENT", "HTTP_ACCEPT_LANGUAGE",
+]
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=METHODS, default="GET")
+    path = serializers.CharField(
+        help_text="Path of a user or recipe endpoint, with a query string"
+    )
+    body = serializers.JSONField(required=False, allow_null=True)
+
+    def validate_path(self, value):
+        url = urlsplit(value)
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            raise serializers.ValidationError(f"No endpoint at '{url.path}'.")
+        # Only DRF views, event streams and other plain views can't run.
+        if not NAMESPACES.intersection(match.namespaces) or \
+                not hasattr(match.func, "cls"):
+            raise serializers.ValidationError(
+                f"'{url.path}' can not be used in a batch."
+            )
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    operations = BatchOperationSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_OPERATIONS,
+    )
+    atomic = serializers.BooleanField(
+        default=False,
+        help_text="Run all operations in one transaction, stopping and "
+                  "rolling back at the first failure"
+    )
+
+
+class BatchResultSerializer(serializers.Serializer):
+    status = serializers.IntegerField()
+    body = serializers.JSONField(allow_null=True)
+
+
+class BatchResponseSerializer(serializers.Serializer):
+    results = BatchResultSerializer(many=True)
+
+
+def sub_request(request, operation):
+    """A request for `operation`, authenticated as the user of the batch
+    `request`."""
+    url = urlsplit(operation["path"])
+    body = b""
+    if operation.get("body") is not None:
+        body = FastJSONRenderer().render(operation["body"])
+
+    environ = {
+        key: request.META[key]
+        for key in INHERITED_META if key in request.META
+    }
+    environ.update({
+        "REQUEST_METHOD": operation["method"],
+        "SCRIPT_NAME": request.META.get("SCRIPT_NAME", ""),
+        "PATH_INFO": url.path,
+        "QUERY_STRING": url.query,
+        "HTTP_ACCEPT": "application/json",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.url_scheme": request.scheme,
+        "wsgi.input": BytesIO(body),
+    })
+    sub = WSGIRequest(environ)
+    # Read by core.authentication.BatchAuthentication.
+    setattr(sub, BATCH_REQUEST, request)
+    return sub
+
+
+def run_operation(request, operation):
+    """`(status, body)` of one operation, run in process.
+
+    An operation raising an error is rolled back on its own and reported
+    as a 500, like the same request made alone.
+    """
+    sub = sub_request(request, operation)
+    match = resolve(sub.path_info)
+    sub.resolver_match = match
+    try:
+        with transaction.atomic():
+            response = match.func(sub, *match.args, **match.kwargs)
+    except Exception:
+        logger.exception(
+            "Batch operation %s %s failed",
+            operation["method"], operation["path"]
+        )
+        return status.HTTP_500_INTERNAL_SERVER_ERROR, {
+            "detail": "Internal server error."
+        }
+
+    # Not closed, that would signal the end of the outer request; the
+    # unconsumed iterator is closed as the response is dropped.
+    if response.streaming:
+        return status.HTTP_501_NOT_IMPLEMENTED, {
+            "detail": "Streaming endpoints can not be used in a batch."
+        }
+    return response.status_code, getattr(response, "data", None)
+
+
+def run_batch(request, operations, atomic=False):
+    """Run `operations` in order, returning one result per operation.
+
+    Atomic batches share a transaction: the first failure rolls it back
+    and the operations after it are not run.
+    """
+    if not atomic:
+        return [run_operation(request, operation) for operation in operations]
+
+    results = []
+    with transaction.atomic():
+        for operation in operations:
+            code, body = run_operation(request, operation)
+            results.append((code, body))
+            if code >= 400:
+                transaction.set_rollback(True)
+                break
+    skipped = {"detail": "Not run, an earlier operation failed."}
+    results += [
+        (status.HTTP_424_FAILED_DEPENDENCY, skipped)
+        for operation in operations[len(results):]
+    ]
+    return results
+
+
+class BatchView(APIView):
+    """Run several user and recipe requests in one round trip."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        request=BatchSerializer,
+        responses=BatchResponseSerializer,
+        description="اجرای چند درخواست در یک رفت و برگشت"
+    )
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = run_batch(
+            request,
+            serializer.validated_data["operations"],
+            serializer.validated_data["atomic"],
+        )
+        return Response({
+            "results": [
+                {"status": code, "body": body} for code, body in results
+            ]
+        })
@@ -0,0 +1,273 @@
+import io
+import math
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from decimal import Decimal
+
+from PIL import Image
+from django.db import transaction
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from core.renderers import FastJSONRenderer
+from recipe.serializers import RecipeSerializer, ValuesListSerializer
+
+SCENARIOS = {}
+METRICS = ["p50", "p95", "p99", "mean"]
+
+
+class Rollback(Exception):
+    pass
+
+
+def scenario(name, writes=False):
+    """Register a benchmark scenario.
+
+    Scenarios that `writes` run inside a transaction that is rolled back
+    after every iteration, so the seeded data stays unchanged.
+    """
+    def decorator(func):
+        SCENARIOS[name] = (func, writes)
+        return func
+    return decorator
+
+
+@dataclass
+class BenchmarkContext:
+    user: object
+    password: str
+    client: APIClient = field(init=False)
+
+    def __post_init__(self):
+        token, created = Token.objects.get_or_create(user=self.user)
+        self.client = APIClient(HTTP_HOST="127.0.0.1")
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        recipes = Recipe.objects.filter(user=self.user).order_by("id")
+        self.recipe_id = recipes.values_list("id", flat=True).first()
+        self.tag_ids = list(
+            Tag.objects.filter(user=self.user).values_list("id", flat=True)[:3]
+        )
+        self.ingredient_ids = list(
+            Ingredient.objects.filter(user=self.user)
+            .values_list("id", flat=True)[:3]
+        )
+
+        self.request = RequestFactory().get("/", HTTP_HOST="127.0.0.1")
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (256, 256)).save(buffer, format="JPEG")
+        self.image = buffer.getvalue()
+
+    @cached_property
+    def recipe_list_data(self):
+        serializer = ValuesListSerializer(
+            RecipeSerializer,
+            context={"request": self.request},
+        )
+        return serializer.to_representation(_user_recipes(self))
+
+
+def percentile(samples, pct):
+    """Linear-interpolated percentile of an unsorted list of samples."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples, elapsed):
+    """Latencies in ms plus throughput in requests per second."""
+    return {
+        "iterations": len(samples),
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "mean": sum(samples) / len(samples) if samples else 0.0,
+        "throughput": len(samples) / elapsed if elapsed else 0.0,
+    }
+
+
+def run_scenario(name, context, iterations=50, warmup=5):
+    func, writes = SCENARIOS[name]
+    samples = []
+    started = time.perf_counter()
+
+    for iteration in range(warmup + iterations):
+        start = time.perf_counter()
+        if writes:
+            try:
+                with transaction.atomic():
+                    func(context)
+                    raise Rollback
+            except Rollback:
+                pass
+        else:
+            func(context)
+        duration = (time.perf_counter() - start) * 1000
+
+        if iteration == warmup - 1:
+            started = time.perf_counter()
+        if iteration >= warmup:
+            samples.append(duration)
+
+    return summarize(samples, time.perf_counter() - started)
+
+
+def compare(results, baseline, threshold):
+    """Return the metrics of `results` that regressed against `baseline`.
+
+    A latency regresses when it grows by more than `threshold` (a ratio,
+    e.g. 0.2 for 20%); throughput regresses when it drops by as much.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in METRICS + ["throughput"]:
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if metric == "throughput":
+                change = -change
+            if change > threshold:
+                regressions.append({
+                    "scenario": name,
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "change": change,
+                })
+    return regressions
+
+
+def _check(response):
+    if response.status_code >= 400:
+        raise AssertionError(
+            f"{response.request['REQUEST_METHOD']} "
+            f"{response.request['PATH_INFO']} returned "
+            f"{response.status_code}"
+        )
+    return response
+
+
+@scenario("recipe-list")
+def recipe_list(context):
+    _check(context.client.get(reverse("recipe:recipe-list")))
+
+
+@scenario("recipe-list-filtered")
+def recipe_list_filtered(context):
+    _check(context.client.get(reverse("recipe:recipe-list"), {
+        "tags": ",".join(map(str, context.tag_ids)),
+        "ingredients": ",".join(map(str, context.ingredient_ids)),
+    }))
+
+
+@scenario("recipe-retrieve")
+def recipe_retrieve(context):
+    _check(context.client.get(
+        reverse("recipe:recipe-detail", args=[context.recipe_id])
+    ))
+
+
+@scenario("recipe-create-many-tags", writes=True)
+def recipe_create_many_tags(context):
+    _check(context.client.post(reverse("recipe:recipe-list"), {
+        "title": "benchmark recipe",
+        "price": Decimal("12.50"),
+        "time_minutes": 20,
+        "tags": [{"name": f"bench tag {index}"} for index in range(20)],
+        "ingredients": [{"name": f"bench ing {index}"} for index in range(5)],
+    }, format="json"))
+
+
+@scenario("recipe-update", writes=True)
+def recipe_update(context):
+    _check(context.client.put(
+        reverse("recipe:recipe-detail", args=[context.recipe_id]),
+        {
+            "title": "updated recipe",
+            "price": Decimal("8.00"),
+            "time_minutes": 15,
+            "tags": [{"name": "tag 0"}, {"name": "tag 1"}],
+            "ingredients": [{"name": "ingredient 0"}],
+        },
+        format="json",
+    ))
+
+
+@scenario("recipe-upload-image", writes=True)
+def recipe_upload_image(context):
+    image = io.BytesIO(context.image)
+    image.name = "benchmark.jpg"
+    _check(context.client.post(
+        reverse("recipe:recipe-upload-image", args=[context.recipe_id]),
+        {"image": image},
+        format="multipart",
+    ))
+
+
+@scenario("tag-list-assigned")
+def tag_list_assigned(context):
+    _check(context.client.get(reverse("recipe:tag-list"), {
+        "assigned_only": 1,
+    }))
+
+
+@scenario("ingredient-list-assigned")
+def ingredient_list_assigned(context):
+    _check(context.client.get(reverse("recipe:ingredient-list"), {
+        "assigned_only": 1,
+    }))
+
+
+@scenario("token-create")
+def token_create(context):
+    _check(context.client.post(reverse("user:token"), {
+        "email": context.user.email,
+        "password": context.password,
+    }))
+
+
+def _user_recipes(context):
+    return Recipe.objects.filter(user=context.user).order_by("-id")
+
+
+@scenario("recipe-serialize-model")
+def recipe_serialize_model(context):
+    recipes = _user_recipes(context).prefetch_related("tags", "ingredients")
+    serializer = RecipeSerializer(
+        recipes,
+        many=True,
+        context={"request": context.request},
+    )
+    JSONRenderer().render(serializer.data)
+
+
+@scenario("recipe-serialize-values")
+def recipe_serialize_values(context):
+    serializer = ValuesListSerializer(
+        RecipeSerializer,
+        context={"request": context.request},
+    )
+    JSONRenderer().render(serializer.to_representation(_user_recipes(context)))
+
+
+@scenario("render-json-stock")
+def render_json_stock(context):
+    JSONRenderer().render(context.recipe_list_data)
+
+
+@scenario("render-json-fast")
+def render_json_fast(context):
+    FastJSONRenderer().render(context.recipe_list_data)
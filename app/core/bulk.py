@@ -0,0 +1,64 @@
+import io
+
+from django.db import connections
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_rows(table, columns, rows, using="default", batch_size=10000):
+    """Load `rows` into `table`, using COPY on PostgreSQL.
+
+    `rows` may be any iterable of tuples; it is consumed in batches so
+    memory stays bounded. Other backends fall back to `executemany`.
+    Returns the number of rows written.
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    column_list = ", ".join(qn(column) for column in columns)
+    total = 0
+
+    with connection.cursor() as cursor:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                _write_batch(connection, cursor, table, column_list, batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            _write_batch(connection, cursor, table, column_list, batch)
+            total += len(batch)
+
+    return total
+
+
+def _write_batch(connection, cursor, table, column_list, batch):
+    table = connection.ops.quote_name(table)
+    if connection.vendor == "postgresql":
+        buffer = io.StringIO()
+        for row in batch:
+            buffer.write("\t".join(_copy_value(value) for value in row))
+            buffer.write("\n")
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY {table} ({column_list}) FROM STDIN",
+            buffer
+        )
+    else:
+        placeholders = ", ".join(["%s"] * len(batch[0]))
+        cursor.executemany(
+            f"INSERT INTO {table} ({column_list}) VALUES ({placeholders})",
+            batch
+        )
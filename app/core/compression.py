@@ -0,0 +1,90 @@
+import gzip
+import zlib
+
+from django.utils.text import compress_sequence, compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# A quick setting for responses compressed per request.
+BROTLI_QUALITY = 5
+
+# Random bytes in the gzip header against BREACH, as GZipMiddleware.
+GZIP_MAX_RANDOM_BYTES = 100
+
+
+def encodings():
+    """Supported content codings, preferred first."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate(accept_encoding, allowed=None):
+    """The coding of `allowed` (default `encodings()`) the client ranks
+    highest in its `Accept-Encoding` header, or None."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in allowed or encodings():
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return compress_string(data, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+
+
+def compress_static(data, encoding):
+    """Strongest, reproducible compression for files compressed once."""
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _compressor(encoding):
+    """`(process, finish)` of an incremental compressor for `encoding`."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, compressor.flush
+
+
+def compress_chunks(chunks, encoding):
+    """Compress an iterable of bytes lazily, for streaming responses."""
+    if encoding == "gzip":
+        yield from compress_sequence(
+            chunks, max_random_bytes=GZIP_MAX_RANDOM_BYTES
+        )
+        return
+
+    process, finish = _compressor(encoding)
+    for chunk in chunks:
+        if data := process(chunk):
+            yield data
+    yield finish()
+
+
+async def compress_async_chunks(chunks, encoding):
+    """`compress_chunks` for an async iterable."""
+    process, finish = _compressor(encoding)
+    async for chunk in chunks:
+        if data := process(chunk):
+            yield data
+    yield finish()
@@ -0,0 +1,115 @@
+from django.db import connection
+from django.db.models import Sum
+
+from core.models import IngredientPair, Recipe
+
+# Pairs gained or lost when the `changed` links are added or removed: each
+# changed ingredient with every other ingredient of its recipe, and the
+# mirrored pair unless the partner changed too and is counted by its own
+# row already.
+_PAIRS_SQL = """
+WITH changed AS (
+    SELECT recipe_id, ingredient_id FROM {through} WHERE {where}
+), pairs AS (
+    SELECT c.ingredient_id AS a, l.ingredient_id AS b
+    FROM changed c JOIN {through} l ON l.recipe_id = c.recipe_id
+    WHERE l.ingredient_id <> c.ingredient_id
+    UNION ALL
+    SELECT l.ingredient_id, c.ingredient_id
+    FROM changed c JOIN {through} l ON l.recipe_id = c.recipe_id
+    WHERE l.ingredient_id <> c.ingredient_id AND {mirrored}
+)
+SELECT a, b, count(*) AS n FROM pairs GROUP BY a, b
+"""
+
+_ADD_SQL = """
+INSERT INTO {table} (ingredient_id, other_id, count)
+{pairs}
+ON CONFLICT (ingredient_id, other_id)
+DO UPDATE SET count = {table}.count + EXCLUDED.count
+"""
+
+_REMOVE_SQL = """
+UPDATE {table} p SET count = greatest(p.count - x.n, 0)
+FROM ({pairs}) x
+WHERE p.ingredient_id = x.a AND p.other_id = x.b
+RETURNING p.id, p.count
+"""
+
+
+def adjust(recipe_ids, ingredient_ids, delta):
+    """Count the links between `recipe_ids` and `ingredient_ids` in or out
+    of the pair table.
+
+    Call it after links are added with `delta=1` and before they are
+    removed with `delta=-1`. `None` matches every recipe or ingredient.
+    """
+    if (recipe_ids is not None and not recipe_ids) or \
+            (ingredient_ids is not None and not ingredient_ids):
+        return
+
+    where, params = [], {}
+    if recipe_ids is not None:
+        where.append("recipe_id = ANY(%(recipes)s)")
+        params["recipes"] = list(recipe_ids)
+    if ingredient_ids is not None:
+        where.append("ingredient_id = ANY(%(ingredients)s)")
+        params["ingredients"] = list(ingredient_ids)
+    pairs = _PAIRS_SQL.format(
+        through=Recipe.ingredients.through._meta.db_table,
+        where=" AND ".join(where),
+        mirrored="false" if ingredient_ids is None
+        else "NOT l.ingredient_id = ANY(%(ingredients)s)",
+    )
+
+    table = IngredientPair._meta.db_table
+    with connection.cursor() as cursor:
+        if delta > 0:
+            cursor.execute(_ADD_SQL.format(table=table, pairs=pairs), params)
+            return
+        cursor.execute(_REMOVE_SQL.format(table=table, pairs=pairs), params)
+        emptied = [pair_id for pair_id, count in cursor.fetchall()
+                   if count == 0]
+    IngredientPair.objects.filter(id__in=emptied, count=0).delete()
+
+
+def rebuild(ingredients=None):
+    """Recompute the pairs of `ingredients`, or of every ingredient, from
+    the through table. Returns the number of pairs stored."""
+    pairs = IngredientPair.objects.all()
+    where, params = "", []
+    if ingredients is not None:
+        ids = list(ingredients.values_list("id", flat=True))
+        pairs = pairs.filter(ingredient_id__in=ids)
+        where, params = "WHERE a.ingredient_id = ANY(%s) ", [ids]
+    pairs.delete()
+
+    through = Recipe.ingredients.through._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {IngredientPair._meta.db_table} "
+            "(ingredient_id, other_id, count) "
+            "SELECT a.ingredient_id, b.ingredient_id, count(*) "
+            f"FROM {through} a JOIN {through} b "
+            "ON b.recipe_id = a.recipe_id "
+            f"AND b.ingredient_id <> a.ingredient_id {where}"
+            "GROUP BY a.ingredient_id, b.ingredient_id",
+            params
+        )
+        return cursor.rowcount
+
+
+def suggest(user, ingredient_ids, limit=10):
+    """The user's ingredients most often used with `ingredient_ids`, as
+    `(ingredient_id, score)` pairs, best first."""
+    return list(
+        IngredientPair.objects.filter(
+            ingredient_id__in=ingredient_ids,
+            ingredient__user=user,
+            other__user=user,
+        ).exclude(other_id__in=ingredient_ids)
+        .values("other_id")
+        .annotate(score=Sum("count"))
+        .order_by("-score", "other_id")
+        .values_list("other_id", "score")[:limit]
+    )
@@ -0,0 +1,54 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.models import Ingredient, Recipe, Tag
+
+COUNTED_FIELDS = {
+    Tag: "tags",
+    Ingredient: "ingredients",
+}
+
+
+def _through(model):
+    return getattr(Recipe, COUNTED_FIELDS[model]).through
+
+
+def _column(model):
+    return f"{model._meta.model_name}_id"
+
+
+def linked_ids(model, recipe_ids):
+    """Ids of `model` rows linked to `recipe_ids`, once per link."""
+    links = _through(model).objects.filter(recipe_id__in=recipe_ids)
+    return list(links.values_list(_column(model), flat=True))
+
+
+def adjust(model, ids, delta):
+    """Add `delta` to `recipe_count` once for every occurrence in `ids`."""
+    by_delta = {}
+    for target_id in ids:
+        by_delta[target_id] = by_delta.get(target_id, 0) + delta
+
+    groups = {}
+    for target_id, change in by_delta.items():
+        groups.setdefault(change, []).append(target_id)
+    for change, target_ids in groups.items():
+        model.objects.filter(id__in=target_ids).update(
+            recipe_count=F("recipe_count") + change
+        )
+
+
+def recount(model, queryset=None):
+    """Recompute `recipe_count` from the through table.
+
+    Returns the number of rows whose stored count was wrong.
+    """
+    queryset = model.objects.all() if queryset is None else queryset
+    column = _column(model)
+    counts = _through(model).objects.filter(**{column: OuterRef("pk")}) \
+        .values(column).annotate(count=Count("*")).values("count")
+    actual = Coalesce(Subquery(counts), 0)
+
+    return queryset.annotate(actual=actual) \
+        .exclude(recipe_count=F("actual")) \
+        .update(recipe_count=actual)
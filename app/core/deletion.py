@@ -0,0 +1,100 @@
+import logging
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core import cooccurrence, counters, images
+from core.models import Ingredient, Recipe, RecipeSimilarity, Tag
+
+logger = logging.getLogger(__name__)
+
+
+def request_deletion(user):
+    """Lock `user` out now and leave their data to `purge_user`."""
+    with transaction.atomic():
+        user.is_active = False
+        user.deletion_requested_at = timezone.now()
+        user.save(update_fields=["is_active", "deletion_requested_at"])
+        Token.objects.filter(user=user).delete()
+
+
+def _delete_recipes(user):
+    def delete(ids):
+        for model in counters.COUNTED_FIELDS:
+            links = counters._through(model).objects.filter(recipe_id__in=ids)
+            # The user's own tags and ingredients are deleted next anyway,
+            # only rows shared with other accounts need their counter fixed.
+            foreign = list(
+                links.exclude(**{f"{model._meta.model_name}__user": user})
+                .values_list(counters._column(model), flat=True)
+            )
+            counters.adjust(model, foreign, -1)
+            if model is Ingredient:
+                cooccurrence.adjust(ids, set(foreign), -1)
+            links.delete()
+        RecipeSimilarity.objects.filter(
+            Q(recipe_id__in=ids) | Q(similar_id__in=ids)
+        ).delete()
+        images.adjust_refs(
+            Recipe.objects.filter(id__in=ids, image__isnull=False)
+            .values_list("image", flat=True),
+            -1
+        )
+        # A plain DELETE; Recipe.delete() would load every row for the
+        # pre_delete signal.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {Recipe._meta.db_table} WHERE id = ANY(%s)",
+                [ids]
+            )
+
+    return Recipe.objects.filter(user=user), delete
+
+
+def _delete_owned(model, user):
+    def delete(ids):
+        model.objects.filter(id__in=ids).delete()
+
+    return model.objects.filter(user=user), delete
+
+
+def purge_user(user, batch_size=1000, progress=None):
+    """Delete `user` and everything they own in bounded transactions.
+
+    Each batch commits on its own, so locks are short and a crash loses at
+    most one batch; calling it again resumes with whatever is left.
+    `progress(step, deleted)` is called after every batch. Returns the
+    number of rows deleted per step.
+    """
+    steps = {
+        "recipes": _delete_recipes(user),
+        "tags": _delete_owned(Tag, user),
+        "ingredients": _delete_owned(Ingredient, user),
+    }
+    deleted = dict.fromkeys(steps, 0)
+
+    for step, (queryset, delete) in steps.items():
+        queryset = queryset.order_by().values_list("id", flat=True)
+        while True:
+            with transaction.atomic():
+                ids = list(queryset[:batch_size])
+                if ids:
+                    delete(ids)
+            if not ids:
+                break
+            deleted[step] += len(ids)
+            if progress:
+                progress(step, deleted[step])
+
+    get_user_model().objects.filter(pk=user.pk).delete()
+    logger.info("Purged user %s: %s", user.pk, deleted)
+    return deleted
+
+
+def pending_deletions():
+    return get_user_model().objects.filter(
+        deletion_requested_at__isnull=False
+    ).order_by("deletion_requested_at")
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+# Written by the triggers of migration 0017.
+CHANNEL = "core_changes"
+
+
+class Listener:
+    """One `LISTEN` connection per process, fanning notifications out to
+    the queues of subscribed users.
+
+    The connection is opened with the first subscriber, read from the
+    event loop and closed after the last one leaves. If it fails every
+    queue gets `None`, ending the streams so clients reconnect, and the
+    next subscriber opens a new one.
+    """
+
+    def __init__(self):
+        self.queues = {}
+        self.connection = None
+        self.fileno = None
+        self.lock = asyncio.Lock()
+
+    def _connect(self):
+        # A connection of its own, outside Django's per-request handling.
+        wrapper = connections.create_connection(DEFAULT_DB_ALIAS)
+        wrapper.connect()
+        with wrapper.connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        return wrapper.connection
+
+    async def start(self):
+        async with self.lock:
+            if self.connection is not None:
+                return
+            self.connection = await sync_to_async(
+                self._connect, thread_sensitive=False
+            )()
+            self.fileno = self.connection.fileno()
+            asyncio.get_running_loop().add_reader(self.fileno, self._read)
+
+    def stop(self):
+        if self.connection is None:
+            return
+        connection, self.connection = self.connection, None
+        asyncio.get_running_loop().remove_reader(self.fileno)
+        connection.close()
+
+    def _read(self):
+        try:
+            self.connection.poll()
+        except Exception:
+            logger.exception("The %s listener failed", CHANNEL)
+            self.stop()
+            for queues in self.queues.values():
+                for queue in queues:
+                    queue.put_nowait(None)
+            return
+
+        while self.connection.notifies:
+            notify = self.connection.notifies.pop(0)
+            try:
+                payload = json.loads(notify.payload)
+                queues = self.queues.get(payload["user"], ())
+            except (ValueError, KeyError, TypeError):
+                continue
+            for queue in queues:
+                queue.put_nowait(payload["model"])
+
+    async def subscribe(self, user_id):
+        await self.start()
+        queue = asyncio.Queue()
+        self.queues.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        queues = self.queues.get(user_id, set())
+        queues.discard(queue)
+        if not queues:
+            self.queues.pop(user_id, None)
+        if not self.queues:
+            self.stop()
+
+
+_listeners = weakref.WeakKeyDictionary()
+
+
+def listener():
+    """The `Listener` of the running event loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in _listeners:
+        _listeners[loop] = Listener()
+    return _listeners[loop]
+
+
+def event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+async def stream(user_id):
+    """Server-sent events for `user_id`: a `change` event naming the
+    models written since the last one, and a comment every
+    `EVENTS_HEARTBEAT_SECONDS` so idle connections stay open."""
+    source = listener()
+    queue = await source.subscribe(user_id)
+    try:
+        yield f"retry: {settings.EVENTS_RETRY_MS}\n\n".encode()
+        while True:
+            try:
+                model = await asyncio.wait_for(
+                    queue.get(), settings.EVENTS_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if model is None:
+                return
+
+            # Writes come in bursts, one event covers everything queued.
+            models = {model}
+            while not queue.empty():
+                model = queue.get_nowait()
+                if model is None:
+                    return
+                models.add(model)
+            yield event("change", {"models": sorted(models)})
+    finally:
+        source.unsubscribe(user_id, queue)
@@ -0,0 +1,113 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections
+
+from core.importer import CSV_LIST_SEPARATOR
+from core.models import Recipe
+
+FORMATS = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv",
+}
+COLUMNS = [
+    "id",
+    "title",
+    "description",
+    "price",
+    "time_minutes",
+    "link",
+    "image",
+    "tags",
+    "ingredients",
+]
+
+
+class _Echo:
+    """File-like object whose `write` returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _chunks(queryset, chunk_size):
+    """Yield lists of at most `chunk_size` rows from `queryset`.
+
+    Uses a server-side cursor unless the database disables them (e.g.
+    behind a transaction-pooling PgBouncer), in which case it pages by id
+    so only one chunk is ever held in memory.
+    """
+    db_settings = connections[queryset.db].settings_dict
+    if not db_settings.get("DISABLE_SERVER_SIDE_CURSORS"):
+        rows = queryset.iterator(chunk_size=chunk_size)
+        while chunk := list(islice(rows, chunk_size)):
+            yield chunk
+        return
+
+    queryset = queryset.order_by("-id")
+    last_id = None
+    while True:
+        page = queryset
+        if last_id is not None:
+            page = queryset.filter(id__lt=last_id)
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]["id"]
+
+
+def _names_by_recipe(field, recipe_ids):
+    through = getattr(Recipe, field).through
+    target = getattr(Recipe, field).field.m2m_reverse_field_name()
+    names = defaultdict(list)
+    links = through.objects.filter(recipe_id__in=recipe_ids) \
+        .order_by("id").values_list("recipe_id", f"{target}__name")
+    for recipe_id, name in links:
+        names[recipe_id].append(name)
+    return names
+
+
+def iter_rows(queryset, chunk_size=None):
+    """Yield one plain dict per recipe of `queryset`, chunk by chunk.
+
+    Tags and ingredients are fetched with one query per chunk, so memory
+    use is bounded by `chunk_size` regardless of the number of recipes.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    rows = queryset.values(*COLUMNS[:-2])
+
+    for chunk in _chunks(rows, chunk_size):
+        recipe_ids = [row["id"] for row in chunk]
+        tags = _names_by_recipe("tags", recipe_ids)
+        ingredients = _names_by_recipe("ingredients", recipe_ids)
+        for row in chunk:
+            row["price"] = str(row["price"])
+            row["image"] = row["image"] or ""
+            row["tags"] = tags[row["id"]]
+            row["ingredients"] = ingredients[row["id"]]
+            yield row
+
+
+def export_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def export_csv(rows):
+    """CSV lines in the layout `core.importer` reads back."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        row["tags"] = CSV_LIST_SEPARATOR.join(row["tags"])
+        row["ingredients"] = CSV_LIST_SEPARATOR.join(row["ingredients"])
+        yield writer.writerow([row[column] for column in COLUMNS])
+
+
+def export(queryset, format):
+    if format == "csv":
+        return export_csv(iter_rows(queryset))
+    return export_jsonl(iter_rows(queryset))
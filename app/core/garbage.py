@@ -0,0 +1,128 @@
+import os
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from core import counters
+from core.images import BLOB_DIR
+from core.models import ImageBlob, Recipe
+
+UPLOAD_DIRS = [os.path.join("uploads", "recipe"), BLOB_DIR]
+
+
+def orphan_rows(model):
+    """Tags or ingredients no recipe links to.
+
+    `recipe_count` narrows the candidates through its index and the
+    NOT EXISTS on the through table guards against a drifted counter.
+    """
+    links = counters._through(model).objects.filter(
+        **{counters._column(model): OuterRef("pk")}
+    )
+    return model.objects.filter(recipe_count=0).exclude(Exists(links))
+
+
+def delete_orphan_rows(model, batch_size=1000, dry_run=False):
+    """Delete orphan `model` rows in batches, returning how many."""
+    if dry_run:
+        return orphan_rows(model).count()
+
+    deleted = 0
+    ids = orphan_rows(model).order_by().values_list("id", flat=True)
+    while True:
+        with transaction.atomic():
+            batch = list(ids[:batch_size])
+            if batch:
+                # Filtered again so a row linked meanwhile is kept.
+                count, _ = orphan_rows(model).filter(id__in=batch).delete()
+        if not batch:
+            return deleted
+        deleted += count
+
+
+def _scan(path, root):
+    """Yield `(name, size, mtime)` for files under `path`, streaming."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _scan(entry.path, root)
+            elif entry.is_file(follow_symlinks=False):
+                stat = entry.stat()
+                name = os.path.relpath(entry.path, root)
+                yield name.replace(os.sep, "/"), stat.st_size, stat.st_mtime
+
+
+def orphan_files(batch_size=1000, min_age=3600):
+    """Yield `(name, size)` of upload files nothing points at.
+
+    The directories are scanned lazily and names are checked against
+    recipes and image blobs `batch_size` at a time. Files younger than
+    `min_age` seconds are skipped, their row may not be saved yet.
+    """
+    root = default_storage.path("")
+    cutoff = time.time() - min_age
+    for directory in UPLOAD_DIRS:
+        path = os.path.join(root, directory)
+        if not os.path.isdir(path):
+            continue
+
+        files = (
+            (name, size) for name, size, mtime in _scan(path, root)
+            if mtime < cutoff
+        )
+        while batch := dict(islice(files, batch_size)):
+            names = list(batch)
+            used = set(
+                Recipe.objects.filter(image__in=names)
+                .values_list("image", flat=True)
+            ) | set(
+                ImageBlob.objects.filter(name__in=names)
+                .values_list("name", flat=True)
+            )
+            for name, size in batch.items():
+                if name not in used:
+                    yield name, size
+
+
+def delete_orphan_files(batch_size=1000, min_age=3600, dry_run=False):
+    """Delete orphan upload files, returning `(count, bytes)`."""
+    count = reclaimed = 0
+    for name, size in orphan_files(batch_size, min_age):
+        if not dry_run:
+            default_storage.delete(name)
+        count += 1
+        reclaimed += size
+    return count, reclaimed
+
+
+def delete_unused_blobs(batch_size=1000, min_age=3600, dry_run=False):
+    """Delete image blobs no recipe references, returning `(count, bytes)`.
+
+    Blobs used in the last `min_age` seconds are kept: an upload resolves
+    to its blob before the recipe that takes the reference is saved.
+    """
+    cutoff = timezone.now() - timedelta(seconds=min_age)
+    unused = ImageBlob.objects.filter(ref_count=0, used_at__lt=cutoff)
+    if dry_run:
+        return unused.count(), sum(unused.values_list("size", flat=True))
+
+    count = reclaimed = 0
+    while True:
+        with transaction.atomic():
+            blobs = list(
+                unused.select_for_update(skip_locked=True)
+                .order_by("used_at")[:batch_size]
+            )
+            ImageBlob.objects.filter(id__in=[blob.id for blob in blobs]) \
+                .delete()
+        if not blobs:
+            return count, reclaimed
+        for blob in blobs:
+            default_storage.delete(blob.name)
+            count += 1
+            reclaimed += blob.size
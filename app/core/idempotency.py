@@ -0,0 +1,124 @@
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from django.http import QueryDict
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from core.models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def fingerprint(request):
+    """SHA-256 of the parsed request, to tell a retry from another request
+    reusing its key. Uploaded files are hashed chunk by chunk."""
+    digest = hashlib.sha256(f"{request.method} {request.path}".encode())
+    data = request.data
+    if not isinstance(data, QueryDict):
+        digest.update(json.dumps(data, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    for name, values in sorted(data.lists()):
+        digest.update(b"\0" + name.encode())
+        for value in values:
+            digest.update(b"\0")
+            if isinstance(value, UploadedFile):
+                for chunk in value.chunks():
+                    digest.update(chunk)
+                value.seek(0)
+            else:
+                digest.update(str(value).encode())
+    return digest.hexdigest()
+
+
+def claim(user, route, key, fingerprint):
+    """Return `(record, created)` for `key`, like get_or_create.
+
+    Must run in a transaction. A new record stays invisible until it
+    commits, so a concurrent request with the same key blocks on the
+    unique constraint until then and gets the finished record, or creates
+    its own if the first one rolled back or dropped it.
+    """
+    now = timezone.now()
+    lookup = {"user": user, "route": route, "key": key}
+    IdempotencyKey.objects.filter(**lookup, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                **lookup,
+                fingerprint=fingerprint,
+                expires_at=now + timedelta(
+                    hours=settings.IDEMPOTENCY_KEY_TTL_HOURS
+                ),
+            ), True
+    except IntegrityError:
+        return IdempotencyKey.objects.get(**lookup), False
+
+
+def idempotent(view):
+    """Run the view method once per `Idempotency-Key` header.
+
+    The first successful response is stored and replayed to retries
+    without running the view again. Failures aren't stored, a retry runs
+    the view anew. Reusing a key for a different request is rejected.
+    """
+    @functools.wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(self, request, *args, **kwargs)
+        if not key or len(key) > 255:
+            raise ValidationError(
+                {HEADER: "Must be 1 to 255 characters long."}
+            )
+
+        route = f"{request.method} {request.path}"
+        digest = fingerprint(request)
+        with transaction.atomic():
+            record, created = claim(request.user, route, key, digest)
+            if not created:
+                if record.fingerprint != digest:
+                    return Response(
+                        {"detail": f"{HEADER} was already used for a "
+                                   "different request."},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                    )
+                return Response(
+                    record.response,
+                    status=record.status,
+                    headers={REPLAYED_HEADER: "true"}
+                )
+
+            response = view(self, request, *args, **kwargs)
+            if status.is_success(response.status_code) and \
+                    not response.streaming:
+                record.status = response.status_code
+                record.response = response.data
+                record.save(update_fields=["status", "response"])
+            else:
+                record.delete()
+        return response
+
+    return wrapper
+
+
+def prune_idempotency_keys(batch_size=1000, dry_run=False):
+    """Delete stored responses past their `expires_at`."""
+    expired = IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+    if dry_run:
+        return expired.count()
+
+    deleted = 0
+    ids = expired.order_by().values_list("id", flat=True)
+    while batch := list(ids[:batch_size]):
+        deleted += IdempotencyKey.objects.filter(id__in=batch).delete()[0]
+    return deleted
@@ -0,0 +1,102 @@
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import ImageBlob, Recipe
+
+BLOB_DIR = os.path.join("uploads", "blobs")
+
+
+def blob_name(digest, ext):
+    return "/".join([BLOB_DIR, digest[:2], f"{digest}{ext.lower()}"])
+
+
+def file_digest(file):
+    """SHA-256 of a Django `File`, read chunk by chunk."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def store_image(file, name=None):
+    """Return `(blob, created)` for `file`'s content, like get_or_create.
+
+    The file is written only if no blob with the same digest exists yet.
+    A new blob starts unreferenced: callers point a recipe at `blob.name`
+    and the save signal takes the reference.
+    """
+    digest = file_digest(file)
+    blob = ImageBlob.objects.filter(digest=digest).first()
+    if blob is not None:
+        if blob.ref_count == 0:
+            # Keep `collect_garbage` away until the reference is taken.
+            ImageBlob.objects.filter(id=blob.id).update(used_at=timezone.now())
+        return blob, False
+
+    ext = os.path.splitext(name or file.name or "")[1]
+    target = blob_name(digest, ext)
+    if not default_storage.exists(target):
+        saved = default_storage.save(target, file)
+        if saved != target:
+            # A concurrent upload of the same content got there first.
+            default_storage.delete(saved)
+
+    try:
+        with transaction.atomic():
+            return ImageBlob.objects.create(
+                digest=digest,
+                name=target,
+                size=file.size,
+            ), True
+    except IntegrityError:
+        return ImageBlob.objects.get(digest=digest), False
+
+
+def adjust_refs(names, delta):
+    """Add `delta` to `ref_count` of the blobs in `names`, once per
+    occurrence. Names without a blob, i.e. legacy uploads, are ignored."""
+    counts = {}
+    for name in names:
+        if name:
+            counts[name] = counts.get(name, 0) + delta
+
+    groups = {}
+    for name, change in counts.items():
+        groups.setdefault(change, []).append(name)
+    for change, group in groups.items():
+        ImageBlob.objects.filter(name__in=group).update(
+            ref_count=F("ref_count") + change
+        )
+
+
+def legacy_images():
+    """Distinct image names of recipes that don't point at a blob."""
+    return Recipe.objects.filter(image__isnull=False) \
+        .exclude(image="").exclude(image__startswith=BLOB_DIR + "/") \
+        .order_by("image").values_list("image", flat=True).distinct()
+
+
+def dedupe_image(name):
+    """Point the recipes using legacy upload `name` at a blob and delete
+    the old file.
+
+    Returns `(blob, created)`. Raises FileNotFoundError when the file is
+    missing. Each call commits on its own, so an interrupted run can simply
+    be started again.
+    """
+    with default_storage.open(name) as file:
+        with transaction.atomic():
+            blob, created = store_image(file, name)
+            moved = Recipe.objects.filter(image=name).update(image=blob.name)
+            ImageBlob.objects.filter(id=blob.id).update(
+                ref_count=F("ref_count") + moved
+            )
+
+    default_storage.delete(name)
+    return blob, created
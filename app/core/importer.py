@@ -0,0 +1,250 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import connection, transaction
+
+from core import cooccurrence
+from core.bulk import copy_rows
+from core.models import Ingredient, Recipe, Tag
+
+FORMATS = ["csv", "jsonl"]
+CSV_LIST_SEPARATOR = "|"
+
+STAGING_RECIPES = "import_recipe_staging"
+STAGING_LINKS = "import_link_staging"
+
+
+class RecipeImportError(Exception):
+    def __init__(self, message, line=None):
+        self.line = line
+        if line is not None:
+            message = f"line {line}: {message}"
+        super().__init__(message)
+
+
+def _names(value, field, line):
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(CSV_LIST_SEPARATOR)
+    if not isinstance(value, list):
+        raise RecipeImportError(f"{field} must be a list of names", line)
+    names = []
+    for item in value:
+        name = item.get("name", "") if isinstance(item, dict) else item
+        if not isinstance(name, str):
+            raise RecipeImportError(f"{field} must be a list of names", line)
+        name = name.strip()
+        if name and name not in names:
+            names.append(name[:255])
+    return names
+
+
+def _text(row, field, line):
+    value = row.get(field) or ""
+    if not isinstance(value, str):
+        raise RecipeImportError(f"{field} must be text", line)
+    return value
+
+
+def _minutes(value, line):
+    """`time_minutes` as an int: digits, or a whole JSON number."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise RecipeImportError("invalid time_minutes", line)
+    try:
+        minutes = int(value)
+    except ValueError:
+        raise RecipeImportError("invalid time_minutes", line)
+    low, high = connection.ops.integer_field_range("IntegerField")
+    if not low <= minutes <= high:
+        raise RecipeImportError("time_minutes is out of range", line)
+    return minutes
+
+
+def clean_row(row, line):
+    """Validate one parsed record and return the staging tuple for it."""
+    title = _text(row, "title", line).strip()
+    if not title:
+        raise RecipeImportError("title is required", line)
+
+    try:
+        price = Decimal(str(row.get("price", "")).strip())
+    except (InvalidOperation, TypeError, ValueError):
+        raise RecipeImportError("invalid price", line)
+    if not price.is_finite() or price.as_tuple().exponent < -2 \
+            or abs(price) >= 1000:
+        raise RecipeImportError("price must have at most 5 digits", line)
+    time_minutes = _minutes(row.get("time_minutes", ""), line)
+
+    description = _text(row, "description", line)
+    link = _text(row, "link", line)[:255]
+    tags = _names(row.get("tags"), "tags", line)
+    ingredients = _names(row.get("ingredients"), "ingredients", line)
+    # PostgreSQL text can't hold NUL characters.
+    if any("\x00" in text
+           for text in [title, description, link, *tags, *ingredients]):
+        raise RecipeImportError("text must not contain NUL characters", line)
+
+    recipe = (line, title[:255], description, price, time_minutes, link)
+    return recipe, tags, ingredients
+
+
+def read_rows(stream, format):
+    """Yield `clean_row` results from a text stream of CSV or JSONL."""
+    if format == "csv":
+        reader = csv.DictReader(stream)
+        try:
+            for row in reader:
+                yield clean_row(row, reader.line_num)
+        except csv.Error as error:
+            raise RecipeImportError(f"invalid CSV: {error}", reader.line_num)
+    elif format == "jsonl":
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError:
+                raise RecipeImportError("invalid JSON", line)
+            if not isinstance(row, dict):
+                raise RecipeImportError("expected a JSON object", line)
+            yield clean_row(row, line)
+    else:
+        raise RecipeImportError(f"unsupported format '{format}'")
+
+
+class RecipeImporter:
+    """Import recipes for one user through COPY into staging tables.
+
+    Rows are read and loaded `batch_size` at a time, so memory use does not
+    depend on the size of the input. Each batch is copied into temporary
+    staging tables, then tags, ingredients, recipes and through-table rows
+    are inserted with set-based SQL.
+    """
+
+    def __init__(self, user, batch_size=5000, progress=None):
+        self.user = user
+        self.batch_size = batch_size
+        self.progress = progress
+        self.counts = dict.fromkeys(
+            ["recipes", "tags", "ingredients", "links"], 0
+        )
+
+    def run(self, stream, format):
+        if connection.vendor != "postgresql":
+            raise RecipeImportError("bulk import requires PostgreSQL")
+
+        rows = read_rows(stream, format)
+        with transaction.atomic(), connection.cursor() as cursor:
+            self._create_staging(cursor)
+            while batch := list(islice(rows, self.batch_size)):
+                self._load_batch(cursor, batch)
+                if self.progress:
+                    self.progress(self.counts)
+            self._drop_staging(cursor)
+        return self.counts
+
+    def _create_staging(self, cursor):
+        self._drop_staging(cursor)
+        cursor.execute(
+            f"CREATE TEMP TABLE {STAGING_RECIPES} ("
+            "seq bigint PRIMARY KEY, title varchar(255), description text, "
+            "price numeric(5, 2), time_minutes integer, "
+            "link varchar(255), recipe_id bigint)"
+        )
+        cursor.execute(
+            f"CREATE TEMP TABLE {STAGING_LINKS} ("
+            "seq bigint, kind char(1), name varchar(255))"
+        )
+
+    def _drop_staging(self, cursor):
+        cursor.execute(
+            f"DROP TABLE IF EXISTS {STAGING_RECIPES}, {STAGING_LINKS}"
+        )
+
+    def _load_batch(self, cursor, batch):
+        cursor.execute(f"TRUNCATE {STAGING_RECIPES}, {STAGING_LINKS}")
+
+        copy_rows(
+            STAGING_RECIPES,
+            ["seq", "title", "description", "price", "time_minutes", "link"],
+            (recipe for recipe, tags, ingredients in batch),
+        )
+        copy_rows(
+            STAGING_LINKS,
+            ["seq", "kind", "name"],
+            (
+                (recipe[0], kind, name)
+                for recipe, tags, ingredients in batch
+                for kind, names in (("t", tags), ("i", ingredients))
+                for name in names
+            ),
+        )
+
+        recipe_table = Recipe._meta.db_table
+        cursor.execute(
+            f"UPDATE {STAGING_RECIPES} SET recipe_id = "
+            f"nextval(pg_get_serial_sequence('{recipe_table}', 'id'))"
+        )
+        cursor.execute(
+            f"INSERT INTO {recipe_table} "
+            "(id, title, description, price, time_minutes, link, user_id) "
+            "SELECT recipe_id, title, description, price, time_minutes, "
+            f"link, %s FROM {STAGING_RECIPES}",
+            [self.user.id],
+        )
+        self.counts["recipes"] += cursor.rowcount
+
+        for kind, model, through in (
+            ("t", Tag, Recipe.tags.through),
+            ("i", Ingredient, Recipe.ingredients.through),
+        ):
+            key = model._meta.model_name
+            self.counts[f"{key}s"] += self._insert_missing(
+                cursor, kind, model._meta.db_table
+            )
+            self.counts["links"] += self._insert_links(
+                cursor, kind, model._meta.db_table, through._meta.db_table,
+                f"{key}_id",
+            )
+
+        cursor.execute(f"SELECT recipe_id FROM {STAGING_RECIPES}")
+        cooccurrence.adjust([row[0] for row in cursor.fetchall()], None, 1)
+
+    def _insert_missing(self, cursor, kind, table):
+        cursor.execute(
+            f"INSERT INTO {table} (name, user_id, recipe_count) "
+            f"SELECT DISTINCT l.name, %s, 0 FROM {STAGING_LINKS} l "
+            "WHERE l.kind = %s AND NOT EXISTS ("
+            f"SELECT 1 FROM {table} t WHERE t.user_id = %s "
+            "AND t.name = l.name)",
+            [self.user.id, kind, self.user.id],
+        )
+        return cursor.rowcount
+
+    def _insert_links(self, cursor, kind, table, through_table, column):
+        cursor.execute(
+            f"INSERT INTO {through_table} (recipe_id, {column}) "
+            f"SELECT DISTINCT r.recipe_id, t.id "
+            f"FROM {STAGING_LINKS} l "
+            f"JOIN {STAGING_RECIPES} r ON r.seq = l.seq "
+            f"JOIN (SELECT name, min(id) AS id FROM {table} "
+            "WHERE user_id = %s GROUP BY name) t ON t.name = l.name "
+            "WHERE l.kind = %s",
+            [self.user.id, kind],
+        )
+        links = cursor.rowcount
+
+        # Signals don't fire for raw inserts, keep recipe_count in sync.
+        cursor.execute(
+            f"UPDATE {table} t SET recipe_count = t.recipe_count + x.count "
+            f"FROM (SELECT {column} AS id, count(*) AS count "
+            f"FROM {through_table} WHERE recipe_id IN "
+            f"(SELECT recipe_id FROM {STAGING_RECIPES}) "
+            f"GROUP BY {column}) x WHERE t.id = x.id"
+        )
+        return links
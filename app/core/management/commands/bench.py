@@ -0,0 +1,106 @@
+import json
+import platform
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from core import benchmarks
+
+
+class Command(BaseCommand):
+    """Django command to benchmark API endpoints against seeded data."""
+    help = "Measure p50/p95/p99 latency and throughput of API endpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            help="Email of the user to benchmark as "
+                 "(default: the user with most recipes)."
+        )
+        parser.add_argument(
+            "--password", default="seed12345",
+            help="Password of the user, used by the token scenario."
+        )
+        parser.add_argument(
+            "--scenario", action="append", dest="scenarios",
+            choices=sorted(benchmarks.SCENARIOS),
+            help="Scenario to run, may be repeated (default: all)."
+        )
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--output", help="Write results to this JSON file."
+        )
+        parser.add_argument(
+            "--baseline", help="JSON results of a previous run to compare to."
+        )
+        parser.add_argument(
+            "--threshold", type=float, default=0.2,
+            help="Allowed relative slowdown before flagging a regression."
+        )
+
+    def handle(self, *args, **options):
+        user = self._get_user(options["user"])
+        context = benchmarks.BenchmarkContext(user, options["password"])
+
+        results = {}
+        for name in options["scenarios"] or benchmarks.SCENARIOS:
+            results[name] = benchmarks.run_scenario(
+                name,
+                context,
+                iterations=options["iterations"],
+                warmup=options["warmup"],
+            )
+            self.stdout.write(
+                "{:<28} p50 {p50:8.2f} ms  p95 {p95:8.2f} ms  "
+                "p99 {p99:8.2f} ms  {throughput:8.1f} req/s".format(
+                    name, **results[name]
+                )
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump({
+                    "meta": {
+                        "created": datetime.now(timezone.utc).isoformat(),
+                        "user": user.email,
+                        "recipes": user.recipe_count,
+                        "iterations": options["iterations"],
+                        "python": platform.python_version(),
+                    },
+                    "results": results,
+                }, output, indent=2)
+
+        if options["baseline"]:
+            with open(options["baseline"]) as baseline:
+                previous = json.load(baseline)["results"]
+            regressions = benchmarks.compare(
+                results,
+                previous,
+                options["threshold"]
+            )
+            for item in regressions:
+                self.stdout.write(self.style.ERROR(
+                    "{scenario} {metric}: {baseline:.2f} -> {current:.2f} "
+                    "({change:+.0%})".format(**item)
+                ))
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions found.")
+            self.stdout.write(self.style.SUCCESS("No regressions."))
+
+    def _get_user(self, email):
+        users = get_user_model().objects.annotate(
+            recipe_count=Count("recipe")
+        )
+        if email:
+            user = users.filter(email=email).first()
+        else:
+            user = users.order_by("-recipe_count").first()
+
+        if user is None or not user.recipe_count:
+            raise CommandError(
+                "No user with recipes found, run 'manage.py seed' first."
+            )
+        return user
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.schema import generate_schema, render_schema
+
+
+class Command(BaseCommand):
+    """Django command to write the OpenAPI schema served at /api/schema/."""
+    help = "Generate SCHEMA_FILE, or with --check fail if it is stale."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check", action="store_true",
+            help="Only compare the generated schema with SCHEMA_FILE."
+        )
+
+    def handle(self, *args, **options):
+        path = settings.SCHEMA_FILE
+        content = render_schema(generate_schema())
+
+        if options["check"]:
+            if not path.exists() or path.read_bytes() != content:
+                raise CommandError(
+                    f"{path.name} is stale, run `python manage.py "
+                    f"build_schema` and commit the result."
+                )
+            self.stdout.write(self.style.SUCCESS(f"{path.name} is up to date"))
+            return
+
+        path.write_bytes(content)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
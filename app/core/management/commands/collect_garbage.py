@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from core.garbage import (
+    delete_orphan_files,
+    delete_orphan_rows,
+    delete_unused_blobs,
+)
+from core.idempotency import prune_idempotency_keys
+from core.models import Ingredient, Tag
+from core.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    """Django command to remove unused tags, ingredients and uploads."""
+    help = "Delete tags and ingredients without recipes, unreferenced " \
+           "image blobs, upload files nothing points at, expired " \
+           "sync tombstones and expired idempotency keys."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only report what would be deleted."
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--min-age", type=int, default=3600,
+            help="Keep files modified in the last N seconds."
+        )
+        parser.add_argument(
+            "--skip-rows", action="store_true",
+            help="Don't touch tags, ingredients, tombstones and "
+                 "idempotency keys."
+        )
+        parser.add_argument(
+            "--skip-files", action="store_true",
+            help="Don't touch uploaded files and image blobs."
+        )
+
+    def handle(self, *args, **options):
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+
+        if not options["skip_rows"]:
+            for model in (Tag, Ingredient):
+                count = delete_orphan_rows(
+                    model,
+                    batch_size=options["batch_size"],
+                    dry_run=options["dry_run"],
+                )
+                self.stdout.write(
+                    f"{verb} {count} {model._meta.verbose_name_plural}"
+                )
+            count = prune_tombstones(
+                batch_size=options["batch_size"],
+                dry_run=options["dry_run"],
+            )
+            self.stdout.write(f"{verb} {count} tombstones")
+            count = prune_idempotency_keys(
+                batch_size=options["batch_size"],
+                dry_run=options["dry_run"],
+            )
+            self.stdout.write(f"{verb} {count} idempotency keys")
+
+        if not options["skip_files"]:
+            for label, collect in (
+                ("unused image blobs", delete_unused_blobs),
+                ("files", delete_orphan_files),
+            ):
+                count, reclaimed = collect(
+                    batch_size=options["batch_size"],
+                    min_age=options["min_age"],
+                    dry_run=options["dry_run"],
+                )
+                self.stdout.write(
+                    f"{verb} {count} {label}, {filesizeformat(reclaimed)} "
+                    f"({reclaimed} bytes)"
+                )
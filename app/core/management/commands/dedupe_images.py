@@ -0,0 +1,54 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from core.images import dedupe_image, file_digest, legacy_images
+from core.models import ImageBlob
+
+
+class Command(BaseCommand):
+    """Django command to move existing recipe images to shared blobs."""
+    help = "Replace per-upload recipe images with content-addressed " \
+           "blobs, storing each distinct image once. Safe to interrupt " \
+           "and run again."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only report how much would be freed."
+        )
+
+    def handle(self, *args, **options):
+        files = duplicates = missing = freed = 0
+        seen = set()
+
+        for name in legacy_images().iterator():
+            try:
+                if options["dry_run"]:
+                    with default_storage.open(name) as file:
+                        size = file.size
+                        digest = file_digest(file)
+                    duplicate = digest in seen or \
+                        ImageBlob.objects.filter(digest=digest).exists()
+                    seen.add(digest)
+                else:
+                    size = default_storage.size(name)
+                    blob, created = dedupe_image(name)
+                    duplicate = not created
+            except FileNotFoundError:
+                missing += 1
+                self.stderr.write(f"Missing file {name}")
+                continue
+
+            files += 1
+            if duplicate:
+                duplicates += 1
+                freed += size
+            if files % 1000 == 0:
+                self.stdout.write(f"{files} files...")
+
+        verb = "Would free" if options["dry_run"] else "Freed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{files} files, {duplicates} duplicates, {missing} missing. "
+            f"{verb} {filesizeformat(freed)} ({freed} bytes)"
+        ))
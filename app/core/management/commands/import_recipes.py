@@ -0,0 +1,48 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importer import FORMATS, RecipeImporter, RecipeImportError
+
+
+class Command(BaseCommand):
+    """Django command to bulk import recipes from CSV or JSONL."""
+    help = "Import recipes with their tags and ingredients for a user."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--user", required=True, help="Owner's email.")
+        parser.add_argument(
+            "--format", choices=FORMATS,
+            help="Input format (default: guessed from the file extension)."
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist.")
+
+        format = options["format"] or \
+            os.path.splitext(options["path"])[1].lstrip(".").lower()
+
+        importer = RecipeImporter(
+            user,
+            batch_size=options["batch_size"],
+            progress=self._progress,
+        )
+        try:
+            with open(options["path"], encoding="utf-8", newline="") as file:
+                counts = importer.run(file, format)
+        except RecipeImportError as error:
+            raise CommandError(f"Import failed, nothing saved: {error}")
+
+        self.stdout.write(self.style.SUCCESS(
+            "Imported {recipes} recipes, {tags} new tags, "
+            "{ingredients} new ingredients, {links} links.".format(**counts)
+        ))
+
+    def _progress(self, counts):
+        self.stdout.write(f"{counts['recipes']} recipes imported...")
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.deletion import pending_deletions, purge_user
+
+
+class Command(BaseCommand):
+    """Django command to delete users whose deletion was requested."""
+    help = "Delete accounts marked for deletion, in small batches. Safe " \
+           "to interrupt and run again."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--pause", type=float, default=0,
+            help="Seconds to sleep between batches to spare the database."
+        )
+        parser.add_argument("--user", help="Only purge this user.")
+
+    def handle(self, *args, **options):
+        users = pending_deletions()
+        if options["user"]:
+            users = users.filter(email=options["user"])
+
+        def progress(step, deleted):
+            self.stdout.write(f"  {step}: {deleted}")
+            if options["pause"]:
+                time.sleep(options["pause"])
+
+        count = 0
+        for user in users.iterator():
+            self.stdout.write(f"Purging {user.email}")
+            purge_user(user, options["batch_size"], progress)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Purged {count} users"))
@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cooccurrence import rebuild
+from core.models import Ingredient
+
+
+class Command(BaseCommand):
+    """Django command to recompute ingredient co-occurrence counts."""
+    help = "Rebuild the ingredient pair counts behind ingredient " \
+           "suggestions from the recipe links."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only rebuild this user's pairs.")
+
+    def handle(self, *args, **options):
+        ingredients = None
+        if options["user"]:
+            user = get_user_model().objects.filter(
+                email=options["user"]
+            ).first()
+            if user is None:
+                raise CommandError(f"User '{options['user']}' not found.")
+            ingredients = Ingredient.objects.filter(user=user)
+
+        pairs = rebuild(ingredients)
+        self.stdout.write(self.style.SUCCESS(f"Stored {pairs} pairs"))
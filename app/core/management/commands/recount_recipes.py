@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.counters import COUNTED_FIELDS, recount
+
+
+class Command(BaseCommand):
+    """Django command to repair tag and ingredient recipe counters."""
+    help = "Recompute recipe_count of tags and ingredients."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only repair this user's rows.")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            user = get_user_model().objects.filter(
+                email=options["user"]
+            ).first()
+            if user is None:
+                raise CommandError(f"User '{options['user']}' not found.")
+
+        for model in COUNTED_FIELDS:
+            queryset = model.objects.all()
+            if user is not None:
+                queryset = queryset.filter(user=user)
+            fixed = recount(model, queryset)
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}: {fixed} fixed"
+            )
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Recipe
+from core.similarity import refresh_stale
+
+
+class Command(BaseCommand):
+    """Django command to recompute similar recipes of changed recipes."""
+    help = "Refresh the stored similar recipes of recipes whose tags or " \
+           "ingredients changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only refresh this user's recipes.")
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Mark every selected recipe stale first (full rebuild)."
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.all()
+        if options["user"]:
+            user = get_user_model().objects.filter(
+                email=options["user"]
+            ).first()
+            if user is None:
+                raise CommandError(f"User '{options['user']}' not found.")
+            recipes = recipes.filter(user=user)
+
+        if options["all"]:
+            recipes.update(similar_stale=True)
+
+        done = refresh_stale(
+            recipes,
+            batch_size=options["batch_size"],
+            progress=lambda done: self.stdout.write(f"{done} refreshed..."),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {done} recipes"))
@@ -0,0 +1,217 @@
+import io
+import random
+from decimal import Decimal
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import cooccurrence
+from core.bulk import copy_rows
+from core.counters import recount
+from core.images import adjust_refs, store_image
+from core.models import Ingredient, Recipe, Tag
+
+
+class Command(BaseCommand):
+    """Django command to generate deterministic synthetic data for load."""
+    help = "Seed the database with synthetic users, recipes, tags and " \
+           "ingredients."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument(
+            "--recipes", type=float, default=50,
+            help="Mean number of recipes per user."
+        )
+        parser.add_argument(
+            "--tags", type=float, default=20,
+            help="Mean number of tags per user."
+        )
+        parser.add_argument(
+            "--ingredients", type=float, default=60,
+            help="Mean number of ingredients per user."
+        )
+        parser.add_argument("--tags-per-recipe", type=float, default=3)
+        parser.add_argument("--ingredients-per-recipe", type=float, default=8)
+        parser.add_argument(
+            "--image-ratio", type=float, default=0.0,
+            help="Fraction of recipes that get an image."
+        )
+        parser.add_argument(
+            "--image-files", type=int, default=10,
+            help="Number of distinct image files to generate."
+        )
+        parser.add_argument(
+            "--distribution",
+            choices=["fixed", "uniform", "exponential"],
+            default="exponential",
+            help="How per-user and per-recipe counts vary around the mean."
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--prefix", default="seed",
+            help="Prefix of generated user emails."
+        )
+        parser.add_argument("--password", default="seed12345")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.distribution = options["distribution"]
+        self.batch_size = options["batch_size"]
+
+        prefix = f"{options['prefix']}-{options['seed']}-"
+        user_model = get_user_model()
+        if user_model.objects.filter(email__startswith=prefix).exists():
+            raise CommandError(
+                f"Users with prefix '{prefix}' already exist, "
+                f"use another --seed or --prefix."
+            )
+
+        images = self._create_images(options)
+        password = make_password(options["password"])
+        totals = dict.fromkeys(
+            ["users", "recipes", "tags", "ingredients", "links"], 0
+        )
+
+        # Work in chunks of users so memory stays flat for large runs.
+        chunk_size = max(1, int(self.batch_size // max(options["recipes"], 1)))
+        for start in range(0, options["users"], chunk_size):
+            end = min(start + chunk_size, options["users"])
+            with transaction.atomic():
+                counts = self._seed_users(
+                    range(start, end), prefix, password, images, options
+                )
+            for key, value in counts.items():
+                totals[key] += value
+            self.stdout.write(
+                f"{end}/{options['users']} users, "
+                f"{totals['recipes']} recipes, {totals['links']} links"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded " + ", ".join(
+                f"{value} {key}" for key, value in totals.items()
+            )
+        ))
+
+    def _count(self, mean):
+        if mean <= 0:
+            return 0
+        if self.distribution == "fixed":
+            return round(mean)
+        if self.distribution == "uniform":
+            return self.rng.randint(0, round(2 * mean))
+        return round(self.rng.expovariate(1 / mean))
+
+    def _create_images(self, options):
+        if options["image_ratio"] <= 0:
+            return []
+
+        names = []
+        for index in range(options["image_files"]):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            buffer = io.BytesIO()
+            Image.new("RGB", (64, 64), color).save(buffer, format="JPEG")
+            blob, created = store_image(
+                ContentFile(buffer.getvalue()),
+                f"seed-{options['seed']}-{index}.jpg"
+            )
+            names.append(blob.name)
+        return names
+
+    def _seed_users(self, indexes, prefix, password, images, options):
+        users = get_user_model().objects.bulk_create(
+            [
+                get_user_model()(
+                    email=f"{prefix}{index}@example.com",
+                    name=f"User {index}",
+                    password=password,
+                )
+                for index in indexes
+            ],
+            batch_size=self.batch_size,
+        )
+
+        tags, ingredients = {}, {}
+        tag_objs, ingredient_objs = [], []
+        for user in users:
+            tags[user.id] = [
+                Tag(user=user, name=f"tag {number}")
+                for number in range(self._count(options["tags"]))
+            ]
+            ingredients[user.id] = [
+                Ingredient(user=user, name=f"ingredient {number}")
+                for number in range(self._count(options["ingredients"]))
+            ]
+            tag_objs.extend(tags[user.id])
+            ingredient_objs.extend(ingredients[user.id])
+
+        Tag.objects.bulk_create(tag_objs, batch_size=self.batch_size)
+        Ingredient.objects.bulk_create(
+            ingredient_objs,
+            batch_size=self.batch_size
+        )
+
+        recipes = []
+        for user in users:
+            for number in range(self._count(options["recipes"])):
+                has_image = images and \
+                    self.rng.random() < options["image_ratio"]
+                recipes.append(Recipe(
+                    user=user,
+                    title=f"Recipe {number}",
+                    description=f"Synthetic recipe {number} of {user.email}",
+                    price=Decimal(self.rng.randint(100, 99999)).scaleb(-2),
+                    time_minutes=self.rng.randint(5, 180),
+                    link="",
+                    image=self.rng.choice(images) if has_image else None,
+                ))
+        Recipe.objects.bulk_create(recipes, batch_size=self.batch_size)
+        adjust_refs([recipe.image.name for recipe in recipes], 1)
+
+        tag_links, ingredient_links = [], []
+        for recipe in recipes:
+            for tag in self._pick(
+                tags[recipe.user_id],
+                options["tags_per_recipe"]
+            ):
+                tag_links.append((recipe.id, tag.id))
+            for ingredient in self._pick(
+                ingredients[recipe.user_id],
+                options["ingredients_per_recipe"]
+            ):
+                ingredient_links.append((recipe.id, ingredient.id))
+
+        links = copy_rows(
+            Recipe.tags.through._meta.db_table,
+            ["recipe_id", "tag_id"],
+            tag_links,
+            batch_size=self.batch_size,
+        )
+        links += copy_rows(
+            Recipe.ingredients.through._meta.db_table,
+            ["recipe_id", "ingredient_id"],
+            ingredient_links,
+            batch_size=self.batch_size,
+        )
+
+        for model in (Tag, Ingredient):
+            recount(model, model.objects.filter(user__in=users))
+        cooccurrence.adjust([recipe.id for recipe in recipes], None, 1)
+
+        return {
+            "users": len(users),
+            "recipes": len(recipes),
+            "tags": len(tag_objs),
+            "ingredients": len(ingredient_objs),
+            "links": links,
+        }
+
+    def _pick(self, population, mean):
+        count = min(self._count(mean), len(population))
+        return self.rng.sample(population, count)
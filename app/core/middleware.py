@@ -0,0 +1,197 @@
+import logging
+import os
+import re
+import time
+import traceback
+from itertools import groupby
+
+from django.conf import settings
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from core import compression
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def normalize_sql(sql):
+    """Replace literals and placeholders so similar queries look the same."""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _IN_LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def params_shape(params, many=False):
+    if params is None:
+        return "()"
+    if many:
+        params = list(params)
+        first = params_shape(params[0]) if params else "()"
+        return f"{len(params)} x {first}"
+    if isinstance(params, dict):
+        types = [f"{key}: {type(value).__name__}"
+                 for key, value in params.items()]
+    else:
+        types = [type(value).__name__ for value in params]
+
+    # Collapse runs such as the parameters of a long IN (...) list.
+    shape = []
+    for name, run in groupby(types):
+        count = len(list(run))
+        shape.append(f"{name} x {count}" if count > 1 else name)
+    return f"({', '.join(shape)})"
+
+
+def get_call_site():
+    """Return the innermost project frame that issued a query.
+
+    Lazy querysets are often evaluated inside library code (e.g. DRF
+    serializers), so fall back to the innermost frame outside `django.db`.
+    """
+    base_dir = str(settings.BASE_DIR)
+    db_dir = os.path.join("django", "db") + os.sep
+    tests_dir = f"{os.sep}tests{os.sep}"
+    fallback = None
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if filename == __file__ or db_dir in filename:
+            continue
+        location = f"{filename}:{frame.lineno} in {frame.name}"
+        if filename.startswith(base_dir) and tests_dir not in filename:
+            return location
+        fallback = fallback or location
+    return fallback or "unknown"
+
+
+class QueryInspector:
+    """`connection.execute_wrapper` that times and counts request queries."""
+
+    def __init__(self, request):
+        self.request = request
+        self.count = 0
+        self.call_site = None
+
+    @property
+    def view_name(self):
+        match = getattr(self.request, "resolver_match", None)
+        return match.view_name if match else self.request.path
+
+    @property
+    def budget(self):
+        return settings.QUERY_BUDGETS.get(
+            self.view_name,
+            settings.QUERY_BUDGET_DEFAULT
+        )
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            self.count += 1
+            if self.count == self.budget + 1:
+                self.call_site = get_call_site()
+            if duration >= settings.QUERY_SLOW_THRESHOLD_MS:
+                logger.warning(
+                    "Slow query (%.1f ms) in %s: %s params=%s",
+                    duration,
+                    self.view_name,
+                    normalize_sql(sql),
+                    params_shape(params, many),
+                )
+
+
+class QueryBudgetMiddleware:
+    """Log slow SQL and flag requests that run more queries than budgeted.
+
+    Only queries run until the view returns are counted: those run while
+    a streaming response is consumed (exports, event streams) are not.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inspector = QueryInspector(request)
+        with connection.execute_wrapper(inspector):
+            response = self.get_response(request)
+
+        if inspector.count > inspector.budget:
+            message = (
+                f"{inspector.view_name} ran {inspector.count} queries "
+                f"(budget {inspector.budget}), first over budget at "
+                f"{inspector.call_site}"
+            )
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses with brotli or gzip, as the client prefers.
+
+    Works like Django's GZipMiddleware, adding brotli when it is installed
+    and skipping bodies under `COMPRESSION_MIN_SIZE` bytes. Streaming
+    responses are compressed as they are sent, except event streams,
+    which a compressor would hold back. HTML keeps to gzip and its random
+    header bytes against BREACH, as pages there carry CSRF tokens.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        if not response.streaming and \
+                len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        content_type = response.get("Content-Type", "")
+        if content_type.startswith("text/event-stream"):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = compression.negotiate(
+            request.META.get("HTTP_ACCEPT_ENCODING", ""),
+            ["gzip"] if content_type.startswith("text/html") else None,
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = \
+                    compression.compress_async_chunks(
+                        response.streaming_content, encoding
+                    )
+            else:
+                response.streaming_content = compression.compress_chunks(
+                    response.streaming_content, encoding
+                )
+            del response.headers["Content-Length"]
+        else:
+            compressed = compression.compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # The body differs byte for byte from the uncompressed one.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
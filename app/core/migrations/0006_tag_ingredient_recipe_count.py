@@ -0,0 +1,45 @@
+# Generated by Django 5.2 on 2026-10-19 09:38
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_recipes(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    for field in ('tags', 'ingredients'):
+        through = getattr(Recipe, field).through
+        model = getattr(Recipe, field).field.related_model
+        column = f'{model._meta.model_name}_id'
+        counts = through.objects.filter(**{column: OuterRef('pk')}) \
+            .values(column).annotate(count=Count('*')).values('count')
+        model.objects.update(recipe_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='تعداد دستور عمل'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='تعداد دستور عمل'),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'recipe_count'], name='core_ingredient_user_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'recipe_count'], name='core_tag_user_count_idx'),
+        ),
+        migrations.RunPython(count_recipes, migrations.RunPython.noop),
+    ]
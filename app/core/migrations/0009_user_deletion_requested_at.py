@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='deletion_requested_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='درخواست حذف'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-19 09:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_user_deletion_requested_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('image__isnull', False)), fields=['image'], name='core_recipe_image_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-19 10:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_similarity'),
+    ]
+
+    # The through table is created by Django, so its index is raw SQL.
+    # Pantry lookups read recipe ids by ingredient from the index alone.
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX core_recipe_ingredients_pantry_idx '
+            'ON core_recipe_ingredients (ingredient_id, recipe_id)',
+            'DROP INDEX core_recipe_ingredients_pantry_idx',
+        ),
+    ]
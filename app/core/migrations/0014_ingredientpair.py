@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-19 10:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def count_pairs(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    IngredientPair = apps.get_model('core', 'IngredientPair')
+    through = Recipe.ingredients.through._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {IngredientPair._meta.db_table} '
+            '(ingredient_id, other_id, count) '
+            'SELECT a.ingredient_id, b.ingredient_id, count(*) '
+            f'FROM {through} a JOIN {through} b '
+            'ON b.recipe_id = a.recipe_id '
+            'AND b.ingredient_id <> a.ingredient_id '
+            'GROUP BY a.ingredient_id, b.ingredient_id'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_recipe_ingredients_pantry_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField()),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pairs', to='core.ingredient')),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.ingredient')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ingredient', 'other'), name='core_ingredientpair_unique')],
+            },
+        ),
+        migrations.RunPython(count_pairs, migrations.RunPython.noop),
+    ]
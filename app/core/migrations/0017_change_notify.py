@@ -0,0 +1,77 @@
+# Generated by Django 5.2 on 2026-10-19 10:52
+
+from django.db import migrations
+
+TABLES = {
+    "core_recipe": "recipe",
+    "core_tag": "tag",
+    "core_ingredient": "ingredient",
+}
+
+# One NOTIFY per statement and user on the `core_changes` channel, read
+# by core.events. Updates count only when `updated_at` moves, so counter
+# and bookkeeping columns stay quiet. PostgreSQL folds identical
+# notifications of a transaction into one.
+FUNCTION = """
+CREATE FUNCTION core_notify_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM pg_notify('core_changes', json_build_object(
+            'user', user_id, 'model', TG_ARGV[0])::text)
+        FROM (SELECT DISTINCT user_id FROM new_rows) changed;
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM pg_notify('core_changes', json_build_object(
+            'user', user_id, 'model', TG_ARGV[0])::text)
+        FROM (
+            SELECT DISTINCT n.user_id FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            WHERE n.updated_at IS DISTINCT FROM o.updated_at
+        ) changed;
+    ELSE
+        PERFORM pg_notify('core_changes', json_build_object(
+            'user', user_id, 'model', TG_ARGV[0])::text)
+        FROM (SELECT DISTINCT user_id FROM old_rows) changed;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+TRIGGERS = """
+CREATE TRIGGER {table}_notify_insert AFTER INSERT ON {table}
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_notify_change('{model}');
+CREATE TRIGGER {table}_notify_update AFTER UPDATE ON {table}
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_notify_change('{model}');
+CREATE TRIGGER {table}_notify_delete AFTER DELETE ON {table}
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_notify_change('{model}');
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER {table}_notify_insert ON {table};
+DROP TRIGGER {table}_notify_update ON {table};
+DROP TRIGGER {table}_notify_delete ON {table};
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_sync'),
+    ]
+
+    # Raw inserts and deletes (import, purge) skip model signals, triggers
+    # see every write.
+    operations = [
+        migrations.RunSQL(FUNCTION, "DROP FUNCTION core_notify_change()"),
+        *(
+            migrations.RunSQL(
+                TRIGGERS.format(table=table, model=model),
+                DROP_TRIGGERS.format(table=table),
+            )
+            for table, model in TABLES.items()
+        ),
+    ]
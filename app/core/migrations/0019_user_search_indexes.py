@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 11:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0018_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['name'], name='core_user_name_like_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 5.2 on 2026-10-19 11:40
+
+from django.db import migrations
+
+SYNCED = {
+    "core_recipe": "recipe",
+    "core_tag": "tag",
+    "core_ingredient": "ingredient",
+}
+LINKS = ["core_recipe_tags", "core_recipe_ingredients"]
+
+# Delta sync bookkeeping, one statement per deleting or linking statement
+# however many rows it covers, so bulk deletes stay bulk. Rows of users
+# being purged are skipped, they are gone before anyone syncs again.
+BURY = """
+CREATE FUNCTION core_bury() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO core_tombstone (user_id, model, object_id, deleted_at)
+    SELECT o.user_id, TG_ARGV[0], o.id, statement_timestamp()
+    FROM old_rows o JOIN core_user u ON u.id = o.user_id
+    WHERE u.deletion_requested_at IS NULL;
+    RETURN NULL;
+END
+$$
+"""
+
+# Links change without saving the recipe; deleting a tag or ingredient
+# removes its links first.
+TOUCH = """
+CREATE FUNCTION core_touch_linked() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE core_recipe r SET updated_at = statement_timestamp()
+        FROM core_user u
+        WHERE r.id IN (SELECT recipe_id FROM new_rows)
+        AND u.id = r.user_id AND u.deletion_requested_at IS NULL;
+    ELSE
+        UPDATE core_recipe r SET updated_at = statement_timestamp()
+        FROM core_user u
+        WHERE r.id IN (SELECT recipe_id FROM old_rows)
+        AND u.id = r.user_id AND u.deletion_requested_at IS NULL;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+# A user deleted without a request still cascades to rows whose
+# tombstones may be written after theirs were deleted.
+UNBURY = """
+CREATE FUNCTION core_unbury() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM core_tombstone
+    WHERE user_id IN (SELECT id FROM old_rows);
+    RETURN NULL;
+END
+$$;
+CREATE TRIGGER core_user_unbury AFTER DELETE ON core_user
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_unbury();
+"""
+
+BURY_TRIGGER = """
+CREATE TRIGGER {table}_bury AFTER DELETE ON {table}
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_bury('{model}');
+"""
+
+TOUCH_TRIGGERS = """
+CREATE TRIGGER {table}_touch_insert AFTER INSERT ON {table}
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_touch_linked();
+CREATE TRIGGER {table}_touch_delete AFTER DELETE ON {table}
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION core_touch_linked();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_user_search_indexes'),
+    ]
+
+    # Replace the per-row pre_delete/post_delete and m2m_changed
+    # receivers, which made Django delete tags and ingredients one by one.
+    operations = [
+        migrations.RunSQL(BURY, "DROP FUNCTION core_bury()"),
+        migrations.RunSQL(TOUCH, "DROP FUNCTION core_touch_linked()"),
+        migrations.RunSQL(
+            UNBURY,
+            "DROP TRIGGER core_user_unbury ON core_user;"
+            "DROP FUNCTION core_unbury()",
+        ),
+        *(
+            migrations.RunSQL(
+                BURY_TRIGGER.format(table=table, model=model),
+                f"DROP TRIGGER {table}_bury ON {table}",
+            )
+            for table, model in SYNCED.items()
+        ),
+        *(
+            migrations.RunSQL(
+                TOUCH_TRIGGERS.format(table=table),
+                f"DROP TRIGGER {table}_touch_insert ON {table};"
+                f"DROP TRIGGER {table}_touch_delete ON {table}",
+            )
+            for table in LINKS
+        ),
+    ]
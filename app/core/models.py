@@ -9,6 +9,8 @@ from django.contrib.auth.models import (
 
 )
 from django.db import models
+from django.db.models.functions import Now
+from rest_framework.utils.encoders import JSONEncoder
 
 
 def recipe_image_file_path(instance, file_name):
@@ -45,6 +47,13 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255, verbose_name="نام")
     is_active = models.BooleanField(default=True, verbose_name="کاربر فعال")
     is_staff = models.BooleanField(default=False, verbose_name="کاربر مدیر")
+    # Set by core.deletion.request_deletion, purged by `purge_users`.
+    deletion_requested_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name="درخواست حذف"
+    )
 
     USERNAME_FIELD = "email"
 
@@ -53,6 +62,15 @@ class User(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = "کاربر"
         verbose_name_plural = "کاربر"
+        indexes = [
+            # Prefix search in the admin, `name LIKE 'x%'`. The unique
+            # email already has a pattern ops index of Django's.
+            models.Index(
+                fields=["name"],
+                name="core_user_name_like_idx",
+                opclasses=["varchar_pattern_ops"]
+            ),
+        ]
 
 
 class Recipe(models.Model):
@@ -79,10 +97,100 @@ class Recipe(models.Model):
         upload_to=recipe_image_file_path,
         null=True
     )
+    # Set when tags or ingredients change, cleared by core.similarity.
+    similar_stale = models.BooleanField(default=True, db_default=True)
+    # Also moved when tags or ingredients change, see migration 0020.
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_default=Now(),
+        verbose_name="زمان ویرایش"
+    )
+
+    class Meta:
+        indexes = [
+            # Delta sync, see core.sync.
+            models.Index(
+                fields=["user", "updated_at", "id"],
+                name="core_recipe_updated_idx"
+            ),
+            # Keyset pages of the recipe list for each ordering.
+            models.Index(
+                fields=["user", "id"],
+                name="core_recipe_user_id_idx"
+            ),
+            models.Index(
+                fields=["user", "price", "id"],
+                name="core_recipe_user_price_idx"
+            ),
+            models.Index(
+                fields=["user", "time_minutes", "id"],
+                name="core_recipe_user_time_idx"
+            ),
+            # Prefix search in the admin, `title LIKE 'x%'`.
+            models.Index(
+                fields=["title"],
+                name="core_recipe_title_like_idx",
+                opclasses=["varchar_pattern_ops"]
+            ),
+            # Lookups by file name when collecting orphan uploads.
+            models.Index(
+                fields=["image"],
+                name="core_recipe_image_idx",
+                condition=models.Q(image__isnull=False)
+            ),
+            models.Index(
+                fields=["id"],
+                name="core_recipe_similar_stale_idx",
+                condition=models.Q(similar_stale=True)
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored image name, so core.signals can tell whether a save
+        # changes it without reading it back.
+        if "image" in instance.__dict__:
+            instance._loaded_image = instance.__dict__["image"] or ""
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        self.__dict__.pop("_loaded_image", None)
+        super().refresh_from_db(*args, **kwargs)
+
+
+class RecipeSimilarity(models.Model):
+    """Top-k neighbours of a recipe by tag and ingredient overlap, kept by
+    core.similarity."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="similarities"
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipe", "similar"],
+                name="core_recipesimilarity_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["recipe", "-score"],
+                name="core_recipesimilarity_top_idx"
+            ),
+        ]
+
 
 class Tag(models.Model):
     name = models.CharField(max_length=255, verbose_name="نام")
@@ -91,6 +199,37 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
         verbose_name="کاربر"
     )
+    # Kept in sync by core.signals, see core.counters.recount.
+    recipe_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="تعداد دستور عمل"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_default=Now(),
+        verbose_name="زمان ویرایش"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "name", "id"],
+                name="core_tag_user_name_idx"
+            ),
+            models.Index(
+                fields=["user", "updated_at", "id"],
+                name="core_tag_updated_idx"
+            ),
+            models.Index(
+                fields=["user", "recipe_count", "id"],
+                name="core_tag_user_count_idx"
+            ),
+            models.Index(
+                fields=["name"],
+                name="core_tag_name_like_idx",
+                opclasses=["varchar_pattern_ops"]
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -104,6 +243,150 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
         verbose_name="کاربر"
     )
+    # Kept in sync by core.signals, see core.counters.recount.
+    recipe_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="تعداد دستور عمل"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_default=Now(),
+        verbose_name="زمان ویرایش"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "name", "id"],
+                name="core_ingredient_user_name_idx"
+            ),
+            models.Index(
+                fields=["user", "updated_at", "id"],
+                name="core_ingredient_updated_idx"
+            ),
+            models.Index(
+                fields=["user", "recipe_count", "id"],
+                name="core_ingredient_user_count_idx"
+            ),
+            models.Index(
+                fields=["name"],
+                name="core_ingredient_name_like_idx",
+                opclasses=["varchar_pattern_ops"]
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class IngredientPair(models.Model):
+    """How many recipes use both ingredients, stored in both directions so
+    an ingredient's partners are one index range. Kept by
+    core.cooccurrence, pairs at 0 are deleted."""
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name="pairs"
+    )
+    other = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+    count = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ingredient", "other"],
+                name="core_ingredientpair_unique"
+            ),
+        ]
+
+
+class Tombstone(models.Model):
+    """A deleted recipe, tag or ingredient, for delta sync to report until
+    `collect_garbage` prunes it. Written by the triggers of migration
+    0020."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name="کاربر"
+    )
+    model = models.CharField(
+        max_length=20,
+        choices=[
+            ("recipe", "دستور عمل"),
+            ("tag", "تگ"),
+            ("ingredient", "مواد اولیه"),
+        ]
+    )
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_default=Now())
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "deleted_at", "id"],
+                name="core_tombstone_user_idx"
+            ),
+            models.Index(
+                fields=["deleted_at"],
+                name="core_tombstone_deleted_idx"
+            ),
+        ]
+
+
+class ImageBlob(models.Model):
+    """One stored recipe image file, shared by every recipe with the same
+    content. `Recipe.image` holds the blob's `name`."""
+    digest = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    # Kept in sync by core.signals; blobs at 0 are removed by
+    # `collect_garbage` once `used_at` is old enough.
+    ref_count = models.PositiveIntegerField(default=0)
+    used_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["used_at"],
+                name="core_imageblob_unused_idx",
+                condition=models.Q(ref_count=0)
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class IdempotencyKey(models.Model):
+    """The response to a write sent with an `Idempotency-Key` header,
+    replayed to retries until `expires_at`. See core.idempotency."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name="کاربر"
+    )
+    # Method and path, e.g. "POST /api/recipe/recipes/".
+    route = models.CharField(max_length=255)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=JSONEncoder)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "route", "key"],
+                name="core_idempotencykey_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["expires_at"],
+                name="core_idempotencykey_exp_idx"
+            ),
+        ]
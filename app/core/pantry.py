@@ -0,0 +1,25 @@
+from django.db.models import Count, F, FloatField, OuterRef, Subquery
+from django.db.models.functions import Cast
+
+from core.models import Recipe
+
+
+def cookable(recipes, ingredient_ids):
+    """`recipes` using any of `ingredient_ids`, best covered first.
+
+    Candidates come from the through table's `(ingredient_id, recipe_id)`
+    index, the inverted index from an ingredient to its recipes, so only
+    recipes sharing an ingredient with the pantry are scored. `coverage`
+    is the fraction of a recipe's ingredients in the pantry and `missing`
+    how many it lacks.
+    """
+    through = Recipe.ingredients.through
+    totals = through.objects.filter(recipe_id=OuterRef("pk")) \
+        .values("recipe_id").annotate(count=Count("*")).values("count")
+    return recipes.filter(ingredients__in=ingredient_ids).annotate(
+        matched=Count("*"),
+        total=Subquery(totals),
+    ).annotate(
+        coverage=Cast("matched", FloatField()) / F("total"),
+        missing=F("total") - F("matched"),
+    ).order_by("-coverage", "-id")
@@ -0,0 +1,23 @@
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from core.renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(parsers.JSONParser):
+    """JSONParser decoding UTF-8 bodies with orjson.
+
+    Falls back to the stock parser when orjson is missing or the request
+    declares another charset.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        if orjson is None or encoding.lower().replace("_", "-") != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
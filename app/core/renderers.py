@@ -0,0 +1,40 @@
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer encoding with orjson, falling back to the stock encoder.
+
+    Output matches `rest_framework.renderers.JSONRenderer` with the default
+    settings: compact, non-ASCII text such as Persian left unescaped, and
+    values orjson doesn't handle itself (Decimal, datetimes, lazy strings)
+    converted by DRF's own `JSONEncoder`. Indented output (e.g. for the
+    browsable API) and non-default JSON settings use the stock path.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=encoders.JSONEncoder().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+
+        # Same strict JavaScript subset escaping as the stock renderer.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028") \
+                .replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
@@ -0,0 +1,83 @@
+import hashlib
+
+import yaml
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from drf_spectacular.renderers import OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+
+_rendered = {}
+
+
+def generate_schema():
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    return generator.get_schema(request=None, public=True)
+
+
+def render_schema(schema):
+    """The schema as YAML, byte for byte what `manage.py spectacular`
+    writes."""
+    return OpenApiYamlRenderer().render(schema, renderer_context={})
+
+
+def load_schema():
+    """The committed `SCHEMA_FILE`, or a freshly generated schema in DEBUG
+    or when there is no file."""
+    path = settings.SCHEMA_FILE
+    if settings.DEBUG or not path.exists():
+        return generate_schema()
+    with open(path, "rb") as file:
+        return yaml.safe_load(file)
+
+
+def rendered_schema(renderer):
+    """Return `(content, etag)` for `renderer`, rendering only once per
+    process."""
+    key = type(renderer)
+    if key not in _rendered:
+        content = renderer.render(load_schema(), renderer_context={})
+        etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+        _rendered[key] = (content, etag)
+    return _rendered[key]
+
+
+def clear_cache():
+    _rendered.clear()
+
+
+class CachedSchemaView(SpectacularAPIView):
+    """`SpectacularAPIView` serving a precomputed schema.
+
+    Introspecting every view takes hundreds of milliseconds, so the schema
+    is read from `SCHEMA_FILE` (see `manage.py build_schema`), rendered
+    once per format and served with an ETag. Requests for another version
+    or language still go through the generator.
+    """
+
+    def _get_schema_response(self, request):
+        if self.api_version or request.version or \
+                request.GET.get("version") or request.GET.get("lang"):
+            return super()._get_schema_response(request)
+
+        renderer = request.accepted_renderer
+        content, etag = rendered_schema(renderer)
+
+        if etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type += f"; charset={renderer.charset}"
+            response = HttpResponse(content, content_type=content_type)
+            response["Content-Disposition"] = \
+                f'inline; filename="{self._get_filename(request, None)}"'
+
+        response["ETag"] = etag
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.SCHEMA_CACHE_MAX_AGE
+        )
+        return response
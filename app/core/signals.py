@@ -0,0 +1,147 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from core import cooccurrence, counters, images, similarity
+from core.models import Recipe
+
+_PENDING = "_recipe_count_pending"
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_changed(sender, instance, action, reverse, model, pk_set,
+                         **kwargs):
+    """Keep `recipe_count` of tags and ingredients in step with links.
+
+    `pk_set` of a remove may hold ids that weren't linked and a clear has
+    none, so the linked ids are collected before the change is applied.
+    """
+    counted = type(instance) if reverse else model
+    column = f"{counted._meta.model_name}_id"
+
+    if action == "post_add":
+        if reverse:
+            counters.adjust(counted, [instance.pk] * len(pk_set), 1)
+        else:
+            counters.adjust(counted, pk_set, 1)
+
+    elif action in ("pre_remove", "pre_clear"):
+        if reverse:
+            links = sender.objects.filter(**{column: instance.pk})
+            if pk_set is not None:
+                links = links.filter(recipe_id__in=pk_set)
+        else:
+            links = sender.objects.filter(recipe_id=instance.pk)
+            if pk_set is not None:
+                links = links.filter(**{f"{column}__in": pk_set})
+        setattr(
+            instance,
+            f"{_PENDING}_{column}",
+            list(links.values_list(column, flat=True))
+        )
+
+    elif action in ("post_remove", "post_clear"):
+        linked = instance.__dict__.pop(f"{_PENDING}_{column}", [])
+        counters.adjust(counted, linked, -1)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_features_changed(sender, instance, action, reverse, pk_set,
+                            **kwargs):
+    """Flag recipes whose similar recipes need recomputing."""
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+
+    if not reverse:
+        marked = instance.__dict__.get(similarity.MARKED)
+        if marked:
+            return
+        recipe_ids = [instance.pk]
+        if marked is False:
+            # relinking() refreshes once all links are in place.
+            instance.__dict__[similarity.MARKED] = True
+            similarity.mark_stale(recipe_ids)
+            return
+    elif action == "pre_clear":
+        column = f"{type(instance)._meta.model_name}_id"
+        recipe_ids = list(
+            sender.objects.filter(**{column: instance.pk})
+            .values_list("recipe_id", flat=True)
+        )
+    else:
+        recipe_ids = list(pk_set)
+    similarity.mark_stale(recipe_ids)
+    # Outside a transaction the callback runs right away, before a clear.
+    if action != "pre_clear":
+        similarity.refresh_on_commit(recipe_ids)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_ingredients_changed(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    """Keep ingredient co-occurrence counts in step with links."""
+    delta = {"post_add": 1, "pre_remove": -1, "pre_clear": -1}.get(action)
+    if delta is None:
+        return
+
+    pk_set = None if action == "pre_clear" else pk_set
+    if reverse:
+        cooccurrence.adjust(pk_set, [instance.pk], delta)
+    else:
+        cooccurrence.adjust([instance.pk], pk_set, delta)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Through rows are removed by cascade without m2m_changed."""
+    for model in counters.COUNTED_FIELDS:
+        counters.adjust(model, counters.linked_ids(model, [instance.pk]), -1)
+    cooccurrence.adjust([instance.pk], None, -1)
+    images.adjust_refs([instance.image.name], -1)
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_image_stored(sender, instance, update_fields=None, **kwargs):
+    """Store a new upload as a shared blob instead of a file of its own.
+
+    The previous image name is kept so `recipe_image_changed` can move the
+    reference. It is read back only for instances not loaded with their
+    image.
+    """
+    if update_fields is not None and "image" not in update_fields:
+        return
+    if "image" not in instance.__dict__:
+        return
+
+    image = instance.image
+    if image and not image._committed:
+        blob, created = images.store_image(image.file, image.name)
+        instance.image = blob.name
+
+    previous = None
+    if "_loaded_image" in instance.__dict__:
+        previous = instance._loaded_image
+        if previous == (instance.image.name or ""):
+            return
+    elif instance.pk is not None:
+        previous = Recipe.objects.filter(pk=instance.pk) \
+            .values_list("image", flat=True).first()
+    instance._previous_image = previous
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(sender, instance, **kwargs):
+    if "_previous_image" not in instance.__dict__:
+        return
+    previous = instance.__dict__.pop("_previous_image")
+    current = instance.image.name
+    instance._loaded_image = current or ""
+    if previous != current:
+        images.adjust_refs([current], 1)
+        images.adjust_refs([previous], -1)
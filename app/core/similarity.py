@@ -0,0 +1,164 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from core.models import Recipe, RecipeSimilarity
+
+# Jaccard similarity over the union of tags and ingredients. Tags and
+# ingredients belong to one user, so only that user's recipes can share
+# them. Candidates are the recipes sharing the most features with the
+# target; only those get an exact score.
+_SIMILAR_SQL = """
+WITH features AS (
+    SELECT recipe_id FROM {tags}
+    WHERE tag_id IN (SELECT tag_id FROM {tags} WHERE recipe_id = %(id)s)
+    UNION ALL
+    SELECT recipe_id FROM {ingredients}
+    WHERE ingredient_id IN (
+        SELECT ingredient_id FROM {ingredients} WHERE recipe_id = %(id)s
+    )
+), overlap AS (
+    SELECT recipe_id, count(*) AS shared FROM features
+    WHERE recipe_id <> %(id)s
+    GROUP BY recipe_id
+    ORDER BY shared DESC, recipe_id DESC
+    LIMIT %(candidates)s
+), size AS (
+    SELECT (SELECT count(*) FROM {tags} WHERE recipe_id = %(id)s)
+        + (SELECT count(*) FROM {ingredients} WHERE recipe_id = %(id)s)
+        AS total
+)
+SELECT o.recipe_id,
+    o.shared::float / (size.total + (
+        (SELECT count(*) FROM {tags} t WHERE t.recipe_id = o.recipe_id)
+        + (SELECT count(*) FROM {ingredients} i
+           WHERE i.recipe_id = o.recipe_id)
+    ) - o.shared) AS score
+FROM overlap o, size
+ORDER BY score DESC, o.recipe_id DESC
+LIMIT %(k)s
+"""
+
+
+def top_similar(recipe_id, k=None):
+    """`[(recipe_id, score), ...]` of the `k` recipes most similar to
+    `recipe_id`, computed from the through tables."""
+    sql = _SIMILAR_SQL.format(
+        tags=Recipe.tags.through._meta.db_table,
+        ingredients=Recipe.ingredients.through._meta.db_table,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {
+            "id": recipe_id,
+            "k": k or settings.SIMILAR_RECIPES_K,
+            "candidates": settings.SIMILAR_RECIPES_CANDIDATES,
+        })
+        return cursor.fetchall()
+
+
+# Set on a recipe inside `relinking()`, True once it has been flagged.
+MARKED = "_similar_stale_marked"
+
+
+@contextmanager
+def relinking(recipe):
+    """Flag `recipe` once for all link changes made inside, instead of
+    once per change, e.g. while a serializer rewrites its links."""
+    recipe.__dict__[MARKED] = False
+    try:
+        yield
+    finally:
+        marked = recipe.__dict__.pop(MARKED, None)
+    if marked:
+        refresh_on_commit([recipe.pk])
+
+
+def mark_stale(recipe_ids):
+    """Flag `recipe_ids` and the recipes listing them for a refresh."""
+    listing = RecipeSimilarity.objects.filter(similar_id__in=recipe_ids) \
+        .values("recipe_id")
+    Recipe.objects.filter(
+        Q(id__in=recipe_ids) | Q(id__in=listing),
+        similar_stale=False,
+    ).update(similar_stale=True)
+
+
+def refresh_on_commit(recipe_ids):
+    """Refresh `recipe_ids` once the current transaction commits, unless
+    there are too many of them for a request to wait on."""
+    if not recipe_ids or \
+            len(recipe_ids) > settings.SIMILAR_RECIPES_REFRESH_LIMIT:
+        return
+    queryset = Recipe.objects.filter(id__in=list(recipe_ids))
+    # Only the first of several callbacks for a recipe finds it stale.
+    transaction.on_commit(lambda: refresh_stale(queryset), robust=True)
+
+
+def _offer(recipe_id, scores):
+    """Insert `recipe_id` into its neighbours' lists where it makes their
+    top k, so a new or changed recipe shows up without refreshing them."""
+    k = settings.SIMILAR_RECIPES_K
+    scores = dict(scores)
+    lists = {neighbour: [] for neighbour in scores}
+    for row in RecipeSimilarity.objects.filter(recipe_id__in=scores) \
+            .exclude(similar_id=recipe_id) \
+            .values_list("recipe_id", "id", "score"):
+        lists[row[0]].append(row[1:])
+
+    insert, drop = [], []
+    for neighbour, rows in lists.items():
+        score = scores[neighbour]
+        if len(rows) >= k:
+            worst_id, worst = min(rows, key=lambda row: row[1])
+            if worst >= score:
+                continue
+            drop.append(worst_id)
+        insert.append(RecipeSimilarity(
+            recipe_id=neighbour,
+            similar_id=recipe_id,
+            score=score,
+        ))
+
+    RecipeSimilarity.objects.filter(id__in=drop).delete()
+    RecipeSimilarity.objects.bulk_create(
+        insert,
+        update_conflicts=True,
+        unique_fields=["recipe", "similar"],
+        update_fields=["score"],
+    )
+
+
+def refresh(recipe_id):
+    """Recompute the stored neighbours of one recipe."""
+    with transaction.atomic():
+        scores = top_similar(recipe_id)
+        RecipeSimilarity.objects.filter(recipe_id=recipe_id).delete()
+        RecipeSimilarity.objects.bulk_create([
+            RecipeSimilarity(
+                recipe_id=recipe_id,
+                similar_id=similar_id,
+                score=score,
+            )
+            for similar_id, score in scores
+        ])
+        _offer(recipe_id, scores)
+        Recipe.objects.filter(id=recipe_id).update(similar_stale=False)
+    return scores
+
+
+def refresh_stale(queryset=None, batch_size=500, progress=None):
+    """Refresh every stale recipe of `queryset`, returning how many."""
+    queryset = Recipe.objects.all() if queryset is None else queryset
+    stale = queryset.filter(similar_stale=True).order_by("id") \
+        .values_list("id", flat=True)
+    done, last_id = 0, 0
+    while ids := list(stale.filter(id__gt=last_id)[:batch_size]):
+        for recipe_id in ids:
+            refresh(recipe_id)
+        done += len(ids)
+        last_id = ids[-1]
+        if progress:
+            progress(done)
+    return done
@@ -0,0 +1,58 @@
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+from core import compression
+
+# Formats that shrink; images and fonts are compressed already.
+COMPRESSIBLE_EXTENSIONS = {
+    ".css", ".js", ".mjs", ".map", ".json", ".svg", ".txt", ".html",
+    ".xml", ".ico", ".ttf", ".eot",
+}
+MIN_SIZE = 256
+SUFFIXES = {"gzip": "gz", "br": "br"}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Hashed static files with precompressed `.gz` and `.br` siblings.
+
+    After `collectstatic` hashes the files, every compressible hashed file
+    gets a copy per content coding, kept only where it is smaller, for the
+    proxy to serve as is. File names not collected yet (tests, a fresh
+    checkout) resolve to the plain name instead of raising.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        for name in sorted(set(self.hashed_files.values())):
+            for compressed_name in self._compress(name):
+                yield name, compressed_name, True
+
+    def _compress(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        with self.open(name) as file:
+            content = file.read()
+        if len(content) < MIN_SIZE:
+            return
+
+        for encoding in compression.encodings():
+            compressed = compression.compress_static(content, encoding)
+            if len(compressed) >= len(content):
+                continue
+            compressed_name = f"{name}.{SUFFIXES[encoding]}"
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            self._save(compressed_name, ContentFile(compressed))
+            yield compressed_name
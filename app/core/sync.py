@@ -0,0 +1,131 @@
+import json
+from base64 import b64decode, b64encode
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Value
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+from core.models import Ingredient, Recipe, Tag, Tombstone
+from recipe.pagination import Row
+
+# Synced tables by response key; tombstones name them by model name.
+MODELS = {"recipes": Recipe, "tags": Tag, "ingredients": Ingredient}
+TOMBSTONES = "deleted"
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def horizon():
+    """A time before which every change is committed.
+
+    Timestamps are taken when a row is written but become visible at
+    commit, so a cursor past the start of a still running transaction
+    could skip its rows. The oldest open transaction bounds the horizon
+    however long it runs, and `SYNC_SETTLE_SECONDS` covers the gap
+    between taking a timestamp and the transaction starting, and clock
+    skew. A transaction left open stalls syncing rather than losing rows;
+    the server's `idle_in_transaction_session_timeout` bounds that.
+    """
+    until = timezone.now()
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT min(xact_start) FROM pg_stat_activity "
+                "WHERE datname = current_database() "
+                "AND backend_type = 'client backend' "
+                "AND pid <> pg_backend_pid()"
+            )
+            oldest = cursor.fetchone()[0]
+        if oldest is not None:
+            until = min(until, oldest)
+    return until - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+
+
+def changed(queryset, position, until, field="updated_at"):
+    """Rows of `queryset` written after `position`, `(time, id)` or None
+    for the start, and before `until`, in the order they were written."""
+    queryset = queryset.filter(**{f"{field}__lt": until})
+    if position is not None:
+        # A row comparison seeks straight to the position on the index.
+        output_field = queryset.model._meta.get_field(field)
+        queryset = queryset.filter(GreaterThan(
+            Row(F(field), F("id"), output_field=output_field),
+            Row(*map(Value, position), output_field=output_field),
+        ))
+    return queryset.order_by(field, "id")
+
+
+def page(rows, positions, key, until, limit, field="updated_at"):
+    """Up to `limit` rows of `rows`, a `changed()` values queryset, and
+    whether more are left, moving `positions[key]` past them."""
+    rows = list(rows[:limit + 1])
+    if len(rows) > limit:
+        rows = rows[:limit]
+        positions[key] = (rows[-1][field], rows[-1]["id"])
+        return rows, True
+
+    if positions[key] is None or positions[key] < (until, 0):
+        positions[key] = (until, 0)
+    return rows, False
+
+
+def initial_positions(until):
+    """Positions of a first sync: everything that exists, no deletions."""
+    positions = dict.fromkeys(MODELS)
+    positions[TOMBSTONES] = (until, 0)
+    return positions
+
+
+def encode_cursor(positions):
+    data = {
+        key: None if position is None else
+        [position[0].isoformat(), position[1]]
+        for key, position in positions.items()
+    }
+    return b64encode(json.dumps(data).encode()).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Positions from `encode_cursor`, raising `ValueError` if invalid and
+    `CursorExpired` if deletions since then may have been pruned."""
+    try:
+        data = json.loads(b64decode(cursor.encode("ascii"), validate=True))
+        positions = {
+            key: None if data[key] is None else (
+                datetime.fromisoformat(data[key][0]), int(data[key][1])
+            )
+            for key in [*MODELS, TOMBSTONES]
+        }
+    except (TypeError, ValueError, KeyError, IndexError):
+        raise ValueError("Invalid cursor.")
+    if positions[TOMBSTONES] is None or any(
+        position[0].tzinfo is None
+        for position in positions.values() if position is not None
+    ):
+        raise ValueError("Invalid cursor.")
+
+    retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    if positions[TOMBSTONES][0] < timezone.now() - retention:
+        raise CursorExpired()
+    return positions
+
+
+def prune_tombstones(batch_size=1000, dry_run=False):
+    """Delete tombstones past `SYNC_TOMBSTONE_RETENTION_DAYS`."""
+    cutoff = timezone.now() - timedelta(
+        days=settings.SYNC_TOMBSTONE_RETENTION_DAYS
+    )
+    old = Tombstone.objects.filter(deleted_at__lt=cutoff)
+    if dry_run:
+        return old.count()
+
+    deleted = 0
+    ids = old.order_by().values_list("id", flat=True)
+    while batch := list(ids[:batch_size]):
+        deleted += Tombstone.objects.filter(id__in=batch).delete()[0]
+    return deleted
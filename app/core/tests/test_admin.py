@@ -1,8 +1,14 @@
+from decimal import Decimal
+
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.db import connection
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 
+from core.admin import EstimatedCountPaginator
+from core.models import Recipe, Tag
+
 
 class AdminSiteTests(TestCase):
     def setUp(self):
@@ -34,3 +40,106 @@ class AdminSiteTests(TestCase):
         url = reverse("admin:core_user_add")
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class LargeTableAdminTests(TestCase):
+    def setUp(self):
+        self.admin_user = get_user_model().objects.create_superuser(
+            email="admin@gmail.com",
+            password="admin_user",
+        )
+        self.client = Client()
+        self.client.force_login(self.admin_user)
+
+        self.tag = Tag.objects.create(user=self.admin_user, name="idle tag")
+        self.recipe = Recipe.objects.create(
+            user=self.admin_user,
+            title="admin recipe",
+            price=Decimal("5.00"),
+            time_minutes=5,
+        )
+        self.recipe.tags.add(
+            Tag.objects.create(user=self.admin_user, name="popular tag")
+        )
+
+    def test_recipe_change_list(self):
+        url = reverse("admin:core_recipe_changelist")
+
+        response = self.client.get(url, {"q": "admin"})
+
+        self.assertContains(response, self.recipe.title)
+
+    def test_recipe_change_form_does_not_list_all_tags(self):
+        url = reverse("admin:core_recipe_change", args=[self.recipe.id])
+
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertContains(response, "popular tag")
+        self.assertNotContains(response, self.tag.name)
+
+    def test_tag_used_filter(self):
+        url = reverse("admin:core_tag_changelist")
+
+        response = self.client.get(url, {"used": "0"})
+
+        self.assertContains(response, self.tag.name)
+        self.assertNotContains(response, "popular tag</a>")
+
+    def test_tag_autocomplete(self):
+        response = self.client.get(reverse("admin:autocomplete"), {
+            "app_label": "core",
+            "model_name": "recipe",
+            "field_name": "tags",
+            "term": "idle",
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["text"] for item in response.json()["results"]],
+            [self.tag.name]
+        )
+
+    def test_delete_user_is_deferred(self):
+        url = reverse("admin:core_user_delete", args=[self.admin_user.id])
+
+        response = self.client.post(url, {"post": "yes"})
+
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.admin_user.refresh_from_db()
+        self.assertFalse(self.admin_user.is_active)
+        self.assertTrue(Recipe.objects.filter(id=self.recipe.id).exists())
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="user@gmail.com",
+            password="normal_user",
+        )
+        for name in ["a", "b", "c"]:
+            Tag.objects.create(user=user, name=name)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Tag._meta.db_table}")
+
+    @override_settings(ADMIN_COUNT_ESTIMATE_THRESHOLD=1)
+    def test_unfiltered_count_is_estimated(self):
+        paginator = EstimatedCountPaginator(Tag.objects.order_by("id"), 100)
+
+        with self.assertNumQueries(1) as queries:
+            self.assertEqual(paginator.count, 3)
+        self.assertIn("reltuples", queries.captured_queries[0]["sql"])
+
+    @override_settings(ADMIN_COUNT_ESTIMATE_THRESHOLD=1)
+    def test_filtered_count_is_exact(self):
+        paginator = EstimatedCountPaginator(
+            Tag.objects.filter(name="a").order_by("id"), 100
+        )
+
+        self.assertEqual(paginator.count, 1)
+
+    def test_small_table_count_is_exact(self):
+        paginator = EstimatedCountPaginator(Tag.objects.order_by("id"), 100)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(paginator.count, 3)
@@ -0,0 +1,206 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+BATCH_URL = reverse("batch")
+ME_URL = reverse("user:me")
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+
+
+def detail_url(recipe_id):
+    return reverse("recipe:recipe-detail", args=[recipe_id])
+
+
+def tag_url(tag_id):
+    return reverse("recipe:tag-detail", args=[tag_id])
+
+
+def recipe_payload(title):
+    return {"title": title, "price": "5.00", "time_minutes": 10}
+
+
+class PublicBatchAPITest(TestCase):
+    def test_auth_required(self):
+        res = APIClient().post(BATCH_URL, {
+            "operations": [{"path": ME_URL}],
+        }, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBatchAPITest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="batch@example.com",
+            password="testpass123",
+            name="batch",
+        )
+        self.client = APIClient()
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def batch(self, operations, **params):
+        return self.client.post(BATCH_URL, {
+            "operations": operations, **params
+        }, format="json")
+
+    def test_runs_operations_in_order(self):
+        recipe = Recipe.objects.create(
+            user=self.user, title="soup", price="5.00", time_minutes=10
+        )
+        tag = Tag.objects.create(user=self.user, name="dinner")
+
+        res = self.batch([
+            {"path": ME_URL},
+            {"path": f"{RECIPES_URL}?ordering=price"},
+            {"path": TAGS_URL},
+            {"path": detail_url(recipe.id)},
+            {
+                "method": "PATCH",
+                "path": tag_url(tag.id),
+                "body": {"name": "lunch"},
+            },
+        ])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data["results"]
+        self.assertEqual(
+            [result["status"] for result in results],
+            [200, 200, 200, 200, 200]
+        )
+        self.assertEqual(results[0]["body"]["email"], self.user.email)
+        self.assertEqual(results[1]["body"]["results"][0]["id"], recipe.id)
+        self.assertEqual(results[2]["body"]["results"][0]["name"], "dinner")
+        self.assertEqual(results[3]["body"]["title"], "soup")
+        self.assertEqual(results[4]["body"]["name"], "lunch")
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, "lunch")
+
+    def test_other_users_data_not_visible(self):
+        other = get_user_model().objects.create_user(
+            email="other@example.com", password="testpass123"
+        )
+        recipe = Recipe.objects.create(
+            user=other, title="secret", price="5.00", time_minutes=10
+        )
+
+        res = self.batch([{"path": detail_url(recipe.id)}])
+
+        self.assertEqual(
+            res.data["results"][0]["status"], status.HTTP_404_NOT_FOUND
+        )
+
+    def test_failures_do_not_stop_a_plain_batch(self):
+        res = self.batch([
+            {"method": "POST", "path": RECIPES_URL, "body": {}},
+            {
+                "method": "POST",
+                "path": RECIPES_URL,
+                "body": recipe_payload("kept"),
+            },
+        ])
+
+        self.assertEqual(
+            [result["status"] for result in res.data["results"]], [400, 201]
+        )
+        self.assertTrue(Recipe.objects.filter(title="kept").exists())
+
+    def test_error_is_reported_per_operation(self):
+        def fail(view, serializer):
+            serializer.save(user=self.user)
+            raise RuntimeError("boom")
+
+        with mock.patch(
+            "recipe.views.RecipeViewSet.perform_create", fail
+        ), self.assertLogs("core.batch", "ERROR"):
+            res = self.batch([
+                {"path": f"{RECIPES_URL}?tags=abc"},
+                {
+                    "method": "POST",
+                    "path": RECIPES_URL,
+                    "body": recipe_payload("gone"),
+                },
+                {"path": ME_URL},
+            ])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["status"] for result in res.data["results"]],
+            [500, 500, 200]
+        )
+        self.assertFalse(Recipe.objects.filter(title="gone").exists())
+
+    def test_atomic_batch_rolls_back(self):
+        res = self.batch([
+            {
+                "method": "POST",
+                "path": RECIPES_URL,
+                "body": {**recipe_payload("gone"), "tags": [{"name": "a"}]},
+            },
+            {"method": "POST", "path": RECIPES_URL, "body": {}},
+            {
+                "method": "POST",
+                "path": RECIPES_URL,
+                "body": recipe_payload("never"),
+            },
+        ], atomic=True)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["status"] for result in res.data["results"]],
+            [201, 400, 424]
+        )
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
+
+    def test_atomic_batch_commits(self):
+        res = self.batch([
+            {
+                "method": "POST",
+                "path": RECIPES_URL,
+                "body": recipe_payload(title),
+            }
+            for title in ("a", "b")
+        ], atomic=True)
+
+        self.assertEqual(
+            [result["status"] for result in res.data["results"]], [201, 201]
+        )
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_invalid_paths_rejected(self):
+        for path in [
+            "/api/nothing/",
+            "/api/schema/",
+            BATCH_URL,
+            reverse("recipe:events"),
+        ]:
+            res = self.batch([{"path": path}])
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_empty_batch_rejected(self):
+        res = self.batch([])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_too_many_operations_rejected(self):
+        res = self.batch([{"path": ME_URL}] * 21)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_streaming_endpoint_not_supported(self):
+        res = self.batch([{"path": reverse("recipe:recipe-export")}])
+
+        self.assertEqual(
+            res.data["results"][0]["status"],
+            status.HTTP_501_NOT_IMPLEMENTED
+        )
@@ -0,0 +1,87 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+
+from core.benchmarks import compare, percentile
+
+
+class BenchmarkHelpersTests(SimpleTestCase):
+    def test_percentile(self):
+        samples = [5, 1, 4, 2, 3]
+
+        self.assertEqual(percentile(samples, 50), 3)
+        self.assertEqual(percentile(samples, 100), 5)
+        self.assertAlmostEqual(percentile(samples, 95), 4.8)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_compare_flags_regressions(self):
+        baseline = {
+            "recipe-list": {"p50": 10.0, "p95": 20.0, "throughput": 100.0},
+        }
+        results = {
+            "recipe-list": {"p50": 13.0, "p95": 21.0, "throughput": 70.0},
+            "new-scenario": {"p50": 1.0},
+        }
+
+        regressions = compare(results, baseline, threshold=0.2)
+
+        self.assertEqual(
+            [(item["scenario"], item["metric"]) for item in regressions],
+            [("recipe-list", "p50"), ("recipe-list", "throughput")]
+        )
+
+
+class BenchCommandTests(TestCase):
+    def setUp(self):
+        call_command(
+            "seed",
+            users=1,
+            recipes=3,
+            distribution="fixed",
+            stdout=StringIO(),
+        )
+
+    def test_bench_writes_results(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "results.json"
+            call_command(
+                "bench",
+                iterations=2,
+                warmup=0,
+                scenarios=["recipe-list", "recipe-update"],
+                output=str(output),
+                stdout=StringIO(),
+            )
+            data = json.loads(output.read_text())
+
+        self.assertEqual(
+            set(data["results"]),
+            {"recipe-list", "recipe-update"}
+        )
+        self.assertEqual(data["results"]["recipe-list"]["iterations"], 2)
+
+    def test_bench_fails_on_regression(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = Path(directory) / "baseline.json"
+            baseline.write_text(json.dumps({
+                "results": {"recipe-retrieve": {"p50": 1e-9}},
+            }))
+
+            with self.assertRaises(CommandError):
+                call_command(
+                    "bench",
+                    iterations=2,
+                    warmup=0,
+                    scenarios=["recipe-retrieve"],
+                    baseline=str(baseline),
+                    stdout=StringIO(),
+                )
+
+    def test_bench_requires_seeded_data(self):
+        with self.assertRaises(CommandError):
+            call_command("bench", user="missing@example.com")
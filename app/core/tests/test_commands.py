@@ -1,10 +1,17 @@
+import json
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
 from psycopg2 import OperationalError as Psycopg2Error
 
+from core.models import Ingredient, Recipe, Tag
+
 
 @patch("core.management.commands.wait_for_db.Command.check")
 class CommandTests(SimpleTestCase):
@@ -23,3 +30,88 @@ class CommandTests(SimpleTestCase):
         call_command("wait_for_db")
         self.assertEqual(6, patched_check.call_count)
         patched_check.assert_called_with(databases=["default"])
+
+
+class SeedCommandTests(TestCase):
+    def seed(self, **options):
+        defaults = {
+            "users": 3,
+            "recipes": 4,
+            "tags": 3,
+            "ingredients": 5,
+            "seed": 7,
+            "stdout": StringIO(),
+        }
+        defaults.update(options)
+        call_command("seed", **defaults)
+
+    def snapshot(self, prefix):
+        return list(
+            Recipe.objects.filter(user__email__startswith=prefix)
+            .order_by("id")
+            .values_list("title", "price", "time_minutes")
+        )
+
+    def test_seed_creates_related_rows(self):
+        self.seed(distribution="fixed")
+
+        self.assertEqual(get_user_model().objects.count(), 3)
+        self.assertEqual(Recipe.objects.count(), 12)
+        self.assertEqual(Tag.objects.count(), 9)
+        self.assertEqual(Ingredient.objects.count(), 15)
+
+        for tag in Tag.objects.all():
+            self.assertEqual(tag.recipe_count, tag.recipe_set.count())
+        for recipe in Recipe.objects.all():
+            self.assertEqual(recipe.tags.count(), 3)
+            for tag in recipe.tags.all():
+                self.assertEqual(tag.user_id, recipe.user_id)
+
+    def test_seed_is_deterministic(self):
+        self.seed(prefix="first")
+        self.seed(prefix="second")
+
+        self.assertEqual(self.snapshot("first"), self.snapshot("second"))
+
+    def test_seed_twice_with_same_prefix_fails(self):
+        self.seed()
+
+        with self.assertRaises(CommandError):
+            self.seed()
+
+
+class ImportRecipesCommandTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="importer@gmail.com",
+            password="test12345",
+        )
+
+    def test_import_jsonl_file(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as file:
+            for number in range(5):
+                file.write(json.dumps({
+                    "title": f"recipe {number}",
+                    "price": "1.25",
+                    "time_minutes": number,
+                    "tags": ["shared", f"tag {number}"],
+                }) + "\n")
+            file.flush()
+
+            call_command(
+                "import_recipes",
+                file.name,
+                user=self.user.email,
+                batch_size=2,
+                stdout=StringIO(),
+            )
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 6)
+        shared = Tag.objects.get(user=self.user, name="shared")
+        self.assertEqual(shared.recipe_set.count(), 5)
+        self.assertEqual(shared.recipe_count, 5)
+
+    def test_import_unknown_user(self):
+        with self.assertRaises(CommandError):
+            call_command("import_recipes", "x.csv", user="no@gmail.com")
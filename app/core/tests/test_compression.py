@@ -0,0 +1,187 @@
+import gzip
+import json
+import tempfile
+from pathlib import Path
+
+import brotli
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import compression
+from core.middleware import CompressionMiddleware
+from core.models import Recipe
+from core.storage import CompressedManifestStaticFilesStorage
+
+RECIPES_URL = reverse("recipe:recipe-list")
+RECIPE_EXPORT_URL = reverse("recipe:recipe-export")
+SCHEMA_URL = reverse("schema")
+
+
+def decompress(data, encoding):
+    if encoding == "br":
+        return brotli.decompress(data)
+    return gzip.decompress(data)
+
+
+class NegotiateTests(SimpleTestCase):
+    def test_prefers_brotli(self):
+        self.assertEqual(compression.negotiate("gzip, deflate, br"), "br")
+
+    def test_quality_values(self):
+        self.assertEqual(compression.negotiate("br;q=0.5, gzip"), "gzip")
+        self.assertEqual(compression.negotiate("br;q=0, gzip;q=0"), None)
+        self.assertEqual(compression.negotiate("gzip;q=bad"), None)
+
+    def test_wildcard(self):
+        self.assertEqual(compression.negotiate("*"), "br")
+        self.assertEqual(compression.negotiate("*;q=0.1, br;q=0"), "gzip")
+
+    def test_allowed(self):
+        self.assertEqual(compression.negotiate("br, gzip", ["gzip"]), "gzip")
+        self.assertEqual(compression.negotiate("identity"), None)
+        self.assertEqual(compression.negotiate(""), None)
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def process(self, response, accept="br, gzip"):
+        middleware = CompressionMiddleware(lambda request: response)
+        return middleware(
+            self.factory.get("/", HTTP_ACCEPT_ENCODING=accept)
+        )
+
+    def test_small_response_is_left_alone(self):
+        response = self.process(HttpResponse(b"x" * 100))
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, b"x" * 100)
+
+    def test_html_uses_gzip(self):
+        body = b"<p>hello</p>" * 500
+        response = self.process(HttpResponse(body))
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), body)
+
+    def test_encoded_response_is_left_alone(self):
+        original = HttpResponse(b"x" * 5000)
+        original["Content-Encoding"] = "identity"
+
+        response = self.process(original)
+
+        self.assertEqual(response.content, b"x" * 5000)
+
+    def test_event_stream_is_not_compressed(self):
+        original = StreamingHttpResponse(
+            iter([b"data: 1\n\n"]), content_type="text/event-stream"
+        )
+
+        response = self.process(original)
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(b"".join(response), b"data: 1\n\n")
+
+    def test_identity_only_client(self):
+        response = self.process(
+            HttpResponse(b"x" * 5000, content_type="application/json"),
+            accept="identity",
+        )
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+
+class CompressedResponseTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email="compress@example.com",
+            password="testpass123",
+        )
+        self.client.force_authenticate(self.user)
+        Recipe.objects.bulk_create([
+            Recipe(
+                user=self.user,
+                title=f"recipe {number}",
+                description="a description that repeats " * 4,
+                price="10.00",
+                time_minutes=10,
+            )
+            for number in range(30)
+        ])
+
+    def test_recipe_list(self):
+        expected = self.client.get(RECIPES_URL).json()
+
+        for encoding in compression.encodings():
+            res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING=encoding)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res["Content-Encoding"], encoding)
+            self.assertIn("Accept-Encoding", res["Vary"])
+            self.assertEqual(int(res["Content-Length"]), len(res.content))
+            self.assertEqual(
+                json.loads(decompress(res.content, encoding)), expected
+            )
+
+    def test_streaming_export(self):
+        expected = b"".join(self.client.get(RECIPE_EXPORT_URL))
+
+        res = self.client.get(RECIPE_EXPORT_URL, HTTP_ACCEPT_ENCODING="br")
+
+        self.assertEqual(res["Content-Encoding"], "br")
+        self.assertFalse(res.has_header("Content-Length"))
+        self.assertEqual(brotli.decompress(b"".join(res)), expected)
+
+    def test_schema_etag_is_weakened(self):
+        plain = self.client.get(SCHEMA_URL)
+        res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(res["ETag"], "W/" + plain["ETag"])
+        res = self.client.get(
+            SCHEMA_URL,
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=res["ETag"],
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class CompressedStaticStorageTests(SimpleTestCase):
+    def test_post_process_writes_compressed_copies(self):
+        css = b"body { color: #123456; margin: 0 auto; }\n" * 50
+        with tempfile.TemporaryDirectory() as root:
+            storage = CompressedManifestStaticFilesStorage(location=root)
+            storage.save("app.css", ContentFile(css))
+            storage.save("logo.png", ContentFile(b"\x89PNG" * 200))
+            storage.save("tiny.js", ContentFile(b"var a = 1;"))
+
+            processed = [
+                (name, hashed) for name, hashed, done in storage.post_process(
+                    {
+                        name: (storage, name)
+                        for name in ("app.css", "logo.png", "tiny.js")
+                    }
+                )
+            ]
+            hashed = storage.stored_name("app.css")
+            files = {path.name for path in Path(root).iterdir()}
+
+            for encoding, suffix in (("gzip", "gz"), ("br", "br")):
+                self.assertIn((hashed, f"{hashed}.{suffix}"), processed)
+                with storage.open(f"{hashed}.{suffix}") as file:
+                    self.assertEqual(decompress(file.read(), encoding), css)
+            self.assertFalse(
+                any(name.startswith("logo.") and name.endswith(".br")
+                    for name in files)
+            )
+            self.assertFalse(
+                any(name.startswith("tiny.") and name.endswith(".gz")
+                    for name in files)
+            )
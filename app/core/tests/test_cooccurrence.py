@@ -0,0 +1,172 @@
+import io
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from core import cooccurrence
+from core.deletion import purge_user
+from core.importer import RecipeImporter
+from core.models import Ingredient, IngredientPair, Recipe
+
+
+def create_recipe(user, **params):
+    defaults = {
+        "title": "recipe",
+        "price": Decimal("5.00"),
+        "time_minutes": 10,
+    }
+    defaults.update(user=user, **params)
+    return Recipe.objects.create(**defaults)
+
+
+class CooccurrenceTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            password="test12345",
+        )
+        self.egg, self.milk, self.flour, self.salt = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ("egg", "milk", "flour", "salt")
+        ]
+        self.pancake = create_recipe(self.user, title="pancake")
+        self.pancake.ingredients.add(self.egg, self.milk, self.flour)
+        self.omelette = create_recipe(self.user, title="omelette")
+        self.omelette.ingredients.add(self.egg, self.salt)
+
+    def pairs(self):
+        return set(
+            IngredientPair.objects.values_list(
+                "ingredient_id", "other_id", "count"
+            )
+        )
+
+    def assertConsistent(self):
+        """The incrementally kept pairs match a full recount."""
+        through = Recipe.ingredients.through._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT a.ingredient_id, b.ingredient_id, count(*) "
+                f"FROM {through} a JOIN {through} b "
+                "ON b.recipe_id = a.recipe_id "
+                "AND b.ingredient_id <> a.ingredient_id "
+                "GROUP BY 1, 2"
+            )
+            expected = set(cursor.fetchall())
+        self.assertEqual(self.pairs(), expected)
+
+    def test_add(self):
+        self.assertEqual(
+            IngredientPair.objects.get(
+                ingredient=self.egg, other=self.milk
+            ).count,
+            1
+        )
+        self.assertConsistent()
+
+        self.omelette.ingredients.add(self.milk)
+        self.assertEqual(
+            IngredientPair.objects.get(
+                ingredient=self.milk, other=self.egg
+            ).count,
+            2
+        )
+        self.assertConsistent()
+
+    def test_remove_and_clear(self):
+        self.pancake.ingredients.remove(self.milk, self.salt)
+        self.assertConsistent()
+        self.assertFalse(
+            IngredientPair.objects.filter(ingredient=self.milk).exists()
+        )
+
+        self.pancake.ingredients.clear()
+        self.assertConsistent()
+        self.assertEqual(
+            self.pairs(),
+            {(self.egg.id, self.salt.id, 1), (self.salt.id, self.egg.id, 1)}
+        )
+
+    def test_reverse_relation(self):
+        self.salt.recipe_set.add(self.pancake)
+        self.assertConsistent()
+
+        self.egg.recipe_set.remove(self.omelette)
+        self.assertConsistent()
+
+        self.egg.recipe_set.clear()
+        self.assertConsistent()
+
+    def test_recipe_delete(self):
+        self.pancake.delete()
+        self.assertConsistent()
+
+        Recipe.objects.all().delete()
+        self.assertEqual(self.pairs(), set())
+
+    def test_import(self):
+        rows = io.StringIO(
+            '{"title": "cake", "price": 1, "time_minutes": 1, '
+            '"ingredients": ["egg", "flour", "sugar"]}\n'
+        )
+        RecipeImporter(self.user).run(rows, "jsonl")
+
+        self.assertConsistent()
+        self.assertEqual(
+            IngredientPair.objects.get(
+                ingredient=self.egg, other=self.flour
+            ).count,
+            2
+        )
+
+    def test_purge(self):
+        other = get_user_model().objects.create_user(
+            email="other@gmail.com",
+            password="test12345",
+        )
+        shared = [Ingredient.objects.create(user=other, name=name)
+                  for name in ("oil", "water")]
+        self.pancake.ingredients.add(*shared)
+        create_recipe(other).ingredients.add(*shared)
+
+        purge_user(self.user)
+
+        self.assertConsistent()
+        self.assertEqual(
+            self.pairs(),
+            {(shared[0].id, shared[1].id, 1), (shared[1].id, shared[0].id, 1)}
+        )
+
+    def test_rebuild(self):
+        IngredientPair.objects.all().delete()
+
+        stored = cooccurrence.rebuild(
+            Ingredient.objects.filter(id=self.egg.id)
+        )
+
+        self.assertEqual(stored, 3)
+        self.assertEqual(
+            set(IngredientPair.objects.values_list("other_id", flat=True)),
+            {self.milk.id, self.flour.id, self.salt.id}
+        )
+
+        out = StringIO()
+        call_command("rebuild_ingredient_pairs", stdout=out)
+        self.assertIn("Stored 8 pairs", out.getvalue())
+        self.assertConsistent()
+
+    def test_suggest(self):
+        self.omelette.ingredients.add(self.milk)
+
+        self.assertEqual(
+            cooccurrence.suggest(self.user, [self.egg.id]),
+            [(self.milk.id, 2), (self.flour.id, 1), (self.salt.id, 1)]
+        )
+        self.assertEqual(
+            cooccurrence.suggest(self.user, [self.egg.id, self.milk.id], 1),
+            [(self.flour.id, 2)]
+        )
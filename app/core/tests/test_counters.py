@@ -0,0 +1,98 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.counters import recount
+from core.models import Ingredient, Recipe, Tag
+
+
+def create_recipe(user, **params):
+    defaults = {
+        "title": "recipe",
+        "price": Decimal("5.00"),
+        "time_minutes": 10,
+    }
+    defaults.update(user=user, **params)
+    return Recipe.objects.create(**defaults)
+
+
+class RecipeCountTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            password="test12345",
+        )
+        self.tag1 = Tag.objects.create(user=self.user, name="tag1")
+        self.tag2 = Tag.objects.create(user=self.user, name="tag2")
+        self.recipe1 = create_recipe(self.user)
+        self.recipe2 = create_recipe(self.user)
+
+    def assertCounts(self, tag1, tag2):
+        self.tag1.refresh_from_db()
+        self.tag2.refresh_from_db()
+        self.assertEqual(
+            (self.tag1.recipe_count, self.tag2.recipe_count),
+            (tag1, tag2)
+        )
+
+    def test_add_and_remove(self):
+        self.recipe1.tags.add(self.tag1, self.tag2)
+        self.recipe1.tags.add(self.tag1)
+        self.recipe2.tags.add(self.tag1)
+        self.assertCounts(2, 1)
+
+        self.recipe1.tags.remove(self.tag1)
+        self.recipe1.tags.remove(self.tag1)
+        self.assertCounts(1, 1)
+
+    def test_clear(self):
+        self.recipe1.tags.add(self.tag1, self.tag2)
+        self.recipe2.tags.add(self.tag1)
+
+        self.recipe1.tags.clear()
+
+        self.assertCounts(1, 0)
+
+    def test_reverse_relation(self):
+        self.tag1.recipe_set.add(self.recipe1, self.recipe2)
+        self.assertCounts(2, 0)
+
+        self.tag1.recipe_set.remove(self.recipe1)
+        self.assertCounts(1, 0)
+
+        self.tag1.recipe_set.clear()
+        self.assertCounts(0, 0)
+
+    def test_recipe_delete(self):
+        ingredient = Ingredient.objects.create(user=self.user, name="ing")
+        self.recipe1.tags.add(self.tag1)
+        self.recipe1.ingredients.add(ingredient)
+        self.recipe2.tags.add(self.tag1)
+
+        Recipe.objects.filter(id=self.recipe1.id).delete()
+
+        self.assertCounts(1, 0)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.recipe_count, 0)
+
+    def test_recount_repairs_drift(self):
+        self.recipe1.tags.add(self.tag1)
+        Tag.objects.filter(id=self.tag1.id).update(recipe_count=7)
+        Tag.objects.filter(id=self.tag2.id).update(recipe_count=3)
+
+        fixed = recount(Tag)
+
+        self.assertEqual(fixed, 2)
+        self.assertCounts(1, 0)
+
+    def test_recount_command(self):
+        Tag.objects.filter(id=self.tag1.id).update(recipe_count=7)
+        out = StringIO()
+
+        call_command("recount_recipes", user=self.user.email, stdout=out)
+
+        self.assertIn("1 fixed", out.getvalue())
+        self.assertCounts(0, 0)
@@ -0,0 +1,108 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+
+from core.deletion import purge_user, request_deletion
+from core.models import Ingredient, Recipe, Tag
+
+
+def create_recipe(user, **params):
+    defaults = {
+        "title": "recipe",
+        "price": Decimal("5.00"),
+        "time_minutes": 10,
+    }
+    defaults.update(user=user, **params)
+    return Recipe.objects.create(**defaults)
+
+
+class Crash(Exception):
+    pass
+
+
+class UserDeletionTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="leaving@gmail.com",
+            password="test12345",
+        )
+        self.other = get_user_model().objects.create_user(
+            email="staying@gmail.com",
+            password="test12345",
+        )
+        tags = [Tag.objects.create(user=self.user, name=f"t{i}")
+                for i in range(3)]
+        ingredient = Ingredient.objects.create(user=self.user, name="ing")
+        self.foreign_tag = Tag.objects.create(user=self.other, name="shared")
+        for _ in range(5):
+            recipe = create_recipe(self.user)
+            recipe.tags.add(*tags, self.foreign_tag)
+            recipe.ingredients.add(ingredient)
+        self.kept = create_recipe(self.other)
+        self.kept.tags.add(self.foreign_tag)
+
+    def test_request_deletion(self):
+        Token.objects.create(user=self.user)
+
+        request_deletion(self.user)
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertIsNotNone(self.user.deletion_requested_at)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+
+    def test_purge_in_batches(self):
+        calls = []
+
+        deleted = purge_user(
+            self.user,
+            batch_size=2,
+            progress=lambda step, count: calls.append((step, count))
+        )
+
+        self.assertEqual(deleted, {
+            "recipes": 5,
+            "tags": 3,
+            "ingredients": 1,
+        })
+        self.assertIn(("recipes", 4), calls)
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+        self.assertEqual(list(Recipe.objects.all()), [self.kept])
+        self.foreign_tag.refresh_from_db()
+        self.assertEqual(self.foreign_tag.recipe_count, 1)
+
+    def test_purge_resumes_after_crash(self):
+        def crash(step, count):
+            if step == "recipes":
+                raise Crash
+
+        with self.assertRaises(Crash):
+            purge_user(self.user, batch_size=2, progress=crash)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(self.foreign_tag.recipe_set.count(), 4)
+
+        deleted = purge_user(self.user, batch_size=2)
+
+        self.assertEqual(deleted["recipes"], 3)
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
+
+    def test_purge_users_command(self):
+        request_deletion(self.user)
+        out = StringIO()
+
+        call_command("purge_users", batch_size=10, stdout=out)
+
+        self.assertIn("Purged 1 users", out.getvalue())
+        self.assertTrue(
+            get_user_model().objects.filter(id=self.other.id).exists()
+        )
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
@@ -0,0 +1,160 @@
+import asyncio
+from contextlib import suppress
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.http import StreamingHttpResponse
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core import events
+from core.models import Recipe, Tag
+
+EVENTS_URL = reverse("recipe:events")
+
+
+def create_recipe(user, **params):
+    defaults = {"title": "recipe", "price": Decimal("5.00"), "time_minutes": 5}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class NotifyTriggerTests(TransactionTestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="notify@example.com",
+            password="test12345",
+        )
+        self.listening = connections.create_connection(DEFAULT_DB_ALIAS)
+        self.listening.connect()
+        self.listening.connection.cursor().execute(
+            f"LISTEN {events.CHANNEL}"
+        )
+        self.addCleanup(self.listening.close)
+
+    def notifications(self):
+        raw = self.listening.connection
+        raw.poll()
+        payloads = [notify.payload for notify in raw.notifies]
+        raw.notifies.clear()
+        return payloads
+
+    def test_writes_notify(self):
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name="tag")
+        recipe.tags.add(tag)
+        recipe.delete()
+
+        self.assertEqual(
+            self.notifications(),
+            [
+                '{"user" : %d, "model" : "%s"}' % (self.user.id, model)
+                for model in ("recipe", "tag", "recipe", "recipe")
+            ]
+        )
+
+    def test_counter_updates_are_quiet(self):
+        tag = Tag.objects.create(user=self.user, name="tag")
+        self.notifications()
+
+        Tag.objects.filter(pk=tag.pk).update(recipe_count=3)
+
+        self.assertEqual(self.notifications(), [])
+
+
+class ChangeEventsTests(TransactionTestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="events@example.com",
+            password="test12345",
+        )
+        self.other = get_user_model().objects.create_user(
+            email="other@example.com",
+            password="test12345",
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    async def open_stream(self):
+        """Queue of the chunks sent, read by a task as the ASGI handler
+        does; cancelling it is a client disconnecting."""
+        response = await self.async_client.get(
+            EVENTS_URL,
+            headers={"authorization": f"Token {self.token.key}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        chunks = asyncio.Queue()
+
+        async def read():
+            async for chunk in response.streaming_content:
+                await chunks.put(chunk)
+            await chunks.put(None)
+
+        self.reader = asyncio.create_task(read())
+        self.assertEqual(await self.next(chunks), b"retry: 3000\n\n")
+        return chunks
+
+    async def disconnect(self):
+        self.reader.cancel()
+        with suppress(asyncio.CancelledError):
+            await self.reader
+
+    async def next(self, chunks):
+        return await asyncio.wait_for(chunks.get(), 5)
+
+    async def test_auth_required(self):
+        for headers in ({}, {"authorization": "Token nope"}):
+            response = await self.async_client.get(EVENTS_URL, headers=headers)
+
+            self.assertEqual(response.status_code, 401)
+
+    def test_not_served_over_wsgi(self):
+        response = self.client.get(
+            EVENTS_URL,
+            headers={"authorization": f"Token {self.token.key}"},
+        )
+
+        self.assertEqual(response.status_code, 501)
+        self.assertNotIsInstance(response, StreamingHttpResponse)
+
+    async def test_changes_of_the_user_are_sent(self):
+        chunks = await self.open_stream()
+        try:
+            await sync_to_async(create_recipe)(self.other)
+            await sync_to_async(Tag.objects.create)(user=self.user, name="a")
+
+            self.assertEqual(
+                await self.next(chunks),
+                b'event: change\ndata: {"models": ["tag"]}\n\n'
+            )
+        finally:
+            await self.disconnect()
+
+        self.assertIsNone(events.listener().connection)
+
+    @override_settings(EVENTS_HEARTBEAT_SECONDS=0.05)
+    async def test_heartbeat(self):
+        chunks = await self.open_stream()
+        try:
+            self.assertEqual(await self.next(chunks), b": ping\n\n")
+        finally:
+            await self.disconnect()
+
+    async def test_stream_ends_when_listener_fails(self):
+        chunks = await self.open_stream()
+        try:
+            pid = events.listener().connection.get_backend_pid()
+
+            def terminate():
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_terminate_backend(%s)", [pid])
+            with self.assertLogs("core.events", "ERROR"):
+                await sync_to_async(terminate)()
+
+                self.assertIsNone(await self.next(chunks))
+        finally:
+            await self.disconnect()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.garbage import delete_orphan_files, delete_orphan_rows
+from core.models import Ingredient, Recipe, Tag
+
+
+class GarbageCollectionTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            password="test12345",
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title="recipe",
+            price=Decimal("5.00"),
+            time_minutes=10,
+        )
+        self.used = Tag.objects.create(user=self.user, name="used")
+        self.recipe.tags.add(self.used)
+        for index in range(5):
+            Tag.objects.create(user=self.user, name=f"orphan {index}")
+
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        settings = override_settings(MEDIA_ROOT=self.media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def write_upload(self, name, size):
+        directory = os.path.join(self.media.name, "uploads", "recipe")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        with open(path, "wb") as file:
+            file.write(b"x" * size)
+        os.utime(path, (0, 0))
+        return f"uploads/recipe/{name}"
+
+    def test_delete_orphan_rows(self):
+        self.assertEqual(delete_orphan_rows(Tag, dry_run=True), 5)
+        self.assertEqual(Tag.objects.count(), 6)
+
+        self.assertEqual(delete_orphan_rows(Tag, batch_size=2), 5)
+
+        self.assertEqual(list(Tag.objects.all()), [self.used])
+
+    def test_drifted_counter_is_not_trusted(self):
+        Tag.objects.filter(id=self.used.id).update(recipe_count=0)
+
+        delete_orphan_rows(Tag)
+
+        self.assertTrue(Tag.objects.filter(id=self.used.id).exists())
+
+    def test_delete_orphan_files(self):
+        self.recipe.image = self.write_upload("kept.jpg", 10)
+        self.recipe.save()
+        orphan = self.write_upload("orphan.jpg", 20)
+        self.write_upload("other.jpg", 30)
+
+        self.assertEqual(delete_orphan_files(dry_run=True), (2, 50))
+        self.assertEqual(delete_orphan_files(batch_size=1), (2, 50))
+
+        remaining = os.listdir(os.path.dirname(
+            os.path.join(self.media.name, orphan)
+        ))
+        self.assertEqual(remaining, ["kept.jpg"])
+
+    def test_recent_files_are_kept(self):
+        path = os.path.join(self.media.name, self.write_upload("new.jpg", 5))
+        os.utime(path)
+
+        self.assertEqual(delete_orphan_files(), (0, 0))
+
+    def test_command(self):
+        self.write_upload("orphan.jpg", 2048)
+        out = StringIO()
+
+        call_command("collect_garbage", dry_run=True, stdout=out)
+
+        self.assertIn("Would delete 5 tags", out.getvalue())
+        self.assertIn("Would delete 0 ingredients", out.getvalue())
+        self.assertIn("1 files", out.getvalue())
+        self.assertIn("(2048 bytes)", out.getvalue())
+        self.assertEqual(Ingredient.objects.count(), 0)
+        self.assertEqual(Tag.objects.count(), 6)
@@ -0,0 +1,110 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core import idempotency
+from core.models import IdempotencyKey
+
+ROUTE = "POST /api/recipe/recipes/"
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="idempotency@example.com",
+            password="test12345",
+        )
+
+    def test_claim(self):
+        first, created = idempotency.claim(self.user, ROUTE, "a", "digest")
+        self.assertTrue(created)
+
+        again, created = idempotency.claim(self.user, ROUTE, "a", "digest")
+        self.assertFalse(created)
+        self.assertEqual(again, first)
+
+        for route, key in ((ROUTE, "b"), ("PUT /api/recipe/recipes/", "a")):
+            _, created = idempotency.claim(self.user, route, key, "digest")
+            self.assertTrue(created)
+
+    def test_expired_key_is_claimed_again(self):
+        first, _ = idempotency.claim(self.user, ROUTE, "a", "digest")
+        IdempotencyKey.objects.update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        record, created = idempotency.claim(self.user, ROUTE, "a", "digest")
+
+        self.assertTrue(created)
+        self.assertNotEqual(record.pk, first.pk)
+
+    def test_prune(self):
+        idempotency.claim(self.user, ROUTE, "old", "digest")
+        IdempotencyKey.objects.update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        idempotency.claim(self.user, ROUTE, "new", "digest")
+        out = StringIO()
+
+        call_command("collect_garbage", skip_files=True, stdout=out)
+
+        self.assertIn("Deleted 1 idempotency keys", out.getvalue())
+        self.assertEqual(
+            list(IdempotencyKey.objects.values_list("key", flat=True)),
+            ["new"]
+        )
+
+
+class ConcurrentClaimTests(TransactionTestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="concurrent@example.com",
+            password="test12345",
+        )
+
+    def claim_meanwhile(self, finish):
+        """Claim the key in a thread while this thread holds it, then
+        `finish` the first claim and commit."""
+        claimed = {}
+
+        def duplicate():
+            try:
+                with transaction.atomic():
+                    claimed["record"], claimed["created"] = \
+                        idempotency.claim(self.user, ROUTE, "a", "digest")
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            record, _ = idempotency.claim(self.user, ROUTE, "a", "digest")
+            thread = threading.Thread(target=duplicate)
+            thread.start()
+            thread.join(0.2)
+            # Still waiting for this transaction.
+            self.assertTrue(thread.is_alive())
+            finish(record)
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        return claimed
+
+    def test_duplicate_waits_for_the_response(self):
+        def respond(record):
+            record.status = 201
+            record.response = {"id": 1}
+            record.save()
+
+        claimed = self.claim_meanwhile(respond)
+
+        self.assertFalse(claimed["created"])
+        self.assertEqual(claimed["record"].response, {"id": 1})
+
+    def test_duplicate_runs_after_a_failure(self):
+        claimed = self.claim_meanwhile(lambda record: record.delete())
+
+        self.assertTrue(claimed["created"])
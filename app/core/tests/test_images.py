@@ -0,0 +1,175 @@
+import io
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.deletion import purge_user
+from core.images import BLOB_DIR
+from core.models import ImageBlob, Recipe
+
+
+def image_bytes(color=(0, 0, 0)):
+    buffer = io.BytesIO()
+    Image.new("RGB", (10, 10), color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class ImageBlobTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        settings = override_settings(MEDIA_ROOT=self.media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            password="test12345",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipes = [self.create_recipe() for _ in range(2)]
+
+    def create_recipe(self, **params):
+        return Recipe.objects.create(
+            user=self.user,
+            title="recipe",
+            price=Decimal("5.00"),
+            time_minutes=10,
+            **params
+        )
+
+    def upload(self, recipe, content):
+        file = io.BytesIO(content)
+        file.name = "photo.JPG"
+        return self.client.post(
+            reverse("recipe:recipe-upload-image", args=[recipe.id]),
+            {"image": file},
+            format="multipart",
+        )
+
+    def blob_files(self):
+        files = []
+        for path, dirs, names in os.walk(
+            os.path.join(self.media.name, BLOB_DIR)
+        ):
+            files.extend(names)
+        return files
+
+    def test_same_upload_stored_once(self):
+        content = image_bytes()
+        for recipe in self.recipes:
+            self.upload(recipe, content)
+            recipe.refresh_from_db()
+
+        blob = ImageBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(blob.size, len(content))
+        self.assertEqual(self.recipes[0].image.name, blob.name)
+        self.assertEqual(self.recipes[1].image.name, blob.name)
+        self.assertTrue(blob.name.endswith(f"{blob.digest}.jpg"))
+        self.assertEqual(len(self.blob_files()), 1)
+
+    def test_references_follow_changes(self):
+        recipe = self.recipes[0]
+        self.upload(recipe, image_bytes())
+        self.upload(recipe, image_bytes((255, 0, 0)))
+
+        first, second = ImageBlob.objects.order_by("id")
+        self.assertEqual((first.ref_count, second.ref_count), (0, 1))
+
+        Recipe.objects.get(id=recipe.id).delete()
+        second.refresh_from_db()
+        self.assertEqual(second.ref_count, 0)
+
+    def test_unchanged_image_is_not_read_back(self):
+        self.upload(self.recipes[0], image_bytes())
+        recipe = Recipe.objects.get(id=self.recipes[0].id)
+
+        recipe.title = "renamed"
+        with CaptureQueriesContext(connection) as queries:
+            recipe.save()
+
+        self.assertEqual(
+            [q["sql"] for q in queries if q["sql"].startswith("SELECT")], []
+        )
+        self.assertEqual(ImageBlob.objects.get().ref_count, 1)
+
+        recipe.image = self.recipes[1].image.name
+        recipe.save()
+        self.assertEqual(ImageBlob.objects.get().ref_count, 0)
+
+    def test_purge_releases_references(self):
+        self.upload(self.recipes[0], image_bytes())
+
+        purge_user(self.user)
+
+        self.assertEqual(ImageBlob.objects.get().ref_count, 0)
+
+    def test_unused_blobs_collected(self):
+        self.upload(self.recipes[0], image_bytes())
+        Recipe.objects.filter(id=self.recipes[0].id).delete()
+        ImageBlob.objects.update(used_at=timezone.now() - timedelta(days=1))
+        out = StringIO()
+
+        call_command("collect_garbage", skip_rows=True, stdout=out)
+
+        self.assertIn("Deleted 1 unused image blobs", out.getvalue())
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertEqual(self.blob_files(), [])
+
+    def test_dedupe_images_command(self):
+        directory = os.path.join(self.media.name, "uploads", "recipe")
+        os.makedirs(directory)
+        content = image_bytes()
+        for name, data in [("a.jpg", content), ("b.jpg", content),
+                           ("c.jpg", image_bytes((0, 255, 0)))]:
+            with open(os.path.join(directory, name), "wb") as file:
+                file.write(data)
+        Recipe.objects.filter(id=self.recipes[0].id) \
+            .update(image="uploads/recipe/a.jpg")
+        Recipe.objects.filter(id=self.recipes[1].id) \
+            .update(image="uploads/recipe/b.jpg")
+        self.create_recipe(image="uploads/recipe/c.jpg")
+        self.create_recipe(image="uploads/recipe/missing.jpg")
+
+        out, err = StringIO(), StringIO()
+        call_command("dedupe_images", dry_run=True, stdout=out, stderr=err)
+        self.assertIn("3 files, 1 duplicates, 1 missing", out.getvalue())
+        self.assertEqual(len(os.listdir(directory)), 3)
+
+        out = StringIO()
+        call_command("dedupe_images", stdout=out, stderr=err)
+
+        self.assertIn("3 files, 1 duplicates, 1 missing", out.getvalue())
+        self.assertIn(f"({len(content)} bytes)", out.getvalue())
+        self.assertEqual(os.listdir(directory), [])
+        self.assertEqual(
+            sorted(ImageBlob.objects.values_list("ref_count", flat=True)),
+            [1, 2]
+        )
+        for recipe in self.recipes:
+            recipe.refresh_from_db()
+        self.assertEqual(self.recipes[0].image, self.recipes[1].image)
+
+    def test_store_image_keeps_extension(self):
+        recipe = self.recipes[0]
+        recipe.image = ContentFile(image_bytes(), name="x.png")
+        recipe.save()
+
+        self.assertTrue(recipe.image.name.startswith(BLOB_DIR))
+        self.assertTrue(recipe.image.name.endswith(".png"))
+        self.assertEqual(ImageBlob.objects.get().ref_count, 1)
@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.middleware import (
+    QueryBudgetExceeded,
+    normalize_sql,
+    params_shape,
+)
+from core.models import Tag
+
+TAGS_URL = reverse("recipe:tag-list")
+
+
+class QueryHelpersTests(SimpleTestCase):
+    def test_normalize_sql(self):
+        sql = """SELECT "id" FROM "core_tag"
+                 WHERE "user_id" = 12 AND "name" = 'it''s'
+                 AND "id" IN (%s, %s, %s)"""
+
+        self.assertEqual(
+            normalize_sql(sql),
+            'SELECT "id" FROM "core_tag" WHERE "user_id" = ? '
+            'AND "name" = ? AND "id" IN (...)'
+        )
+
+    def test_params_shape(self):
+        self.assertEqual(params_shape((1, "a")), "(int, str)")
+        self.assertEqual(
+            params_shape([(1, "a"), (2, "b")], many=True),
+            "2 x (int, str)"
+        )
+        self.assertEqual(params_shape(None), "()")
+        self.assertEqual(params_shape([1, 2, 3, "a"]), "(int x 3, str)")
+
+
+class QueryBudgetMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            password="test12345",
+        )
+        Tag.objects.create(user=self.user, name="tag")
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_within_budget(self):
+        response = self.client.get(TAGS_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(
+        QUERY_BUDGETS={"recipe:tag-list": 0},
+        QUERY_BUDGET_STRICT=True,
+    )
+    def test_over_budget_fails_in_strict_mode(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(TAGS_URL)
+
+    @override_settings(
+        QUERY_BUDGETS={"recipe:tag-list": 0},
+        QUERY_BUDGET_STRICT=False,
+    )
+    def test_over_budget_warns_with_call_site(self):
+        with self.assertLogs("core.middleware", "WARNING") as logs:
+            response = self.client.get(TAGS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("recipe:tag-list", logs.output[0])
+        self.assertIn("budget 0", logs.output[0])
+
+    @override_settings(QUERY_SLOW_THRESHOLD_MS=0)
+    def test_slow_query_logged(self):
+        with self.assertLogs("core.middleware", "WARNING") as logs:
+            self.client.get(TAGS_URL)
+
+        self.assertIn("Slow query", logs.output[0])
+        self.assertIn("recipe:tag-list", logs.output[0])
+        self.assertIn('FROM "core_tag"', logs.output[0])
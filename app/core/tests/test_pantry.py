@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.models import Ingredient, Recipe
+from core.pantry import cookable
+
+
+def create_recipe(user, **params):
+    defaults = {
+        "title": "recipe",
+        "price": Decimal("5.00"),
+        "time_minutes": 10,
+    }
+    defaults.update(user=user, **params)
+    return Recipe.objects.create(**defaults)
+
+
+class CookableTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            password="test12345",
+        )
+        self.egg, self.milk, self.flour, self.salt = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ("egg", "milk", "flour", "salt")
+        ]
+        self.omelette = create_recipe(self.user, title="omelette")
+        self.omelette.ingredients.add(self.egg, self.salt)
+        self.pancake = create_recipe(self.user, title="pancake")
+        self.pancake.ingredients.add(self.egg, self.milk, self.flour)
+        self.bread = create_recipe(self.user, title="bread")
+        self.bread.ingredients.add(self.flour, self.salt)
+
+    def test_ranks_by_coverage(self):
+        recipes = cookable(
+            Recipe.objects.filter(user=self.user),
+            [self.egg.id, self.milk.id],
+        )
+
+        self.assertEqual(
+            list(recipes.values_list("title", "coverage", "missing")),
+            [("pancake", 2 / 3, 1), ("omelette", 1 / 2, 1)]
+        )
+
+    def test_ties_newest_first(self):
+        recipes = cookable(
+            Recipe.objects.filter(user=self.user),
+            [self.salt.id],
+        )
+
+        self.assertEqual(
+            list(recipes.values_list("title", flat=True)),
+            ["bread", "omelette"]
+        )
+
+    def test_full_coverage(self):
+        recipes = cookable(
+            Recipe.objects.filter(user=self.user),
+            [self.egg.id, self.milk.id, self.flour.id, self.salt.id],
+        ).filter(coverage__gte=1)
+
+        self.assertEqual(recipes.count(), 3)
+        self.assertEqual(set(recipes.values_list("missing", flat=True)), {0})
@@ -0,0 +1,86 @@
+import io
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+SAMPLE = {
+    "id": 1,
+    "title": "قورمه سبزی",
+    "price": Decimal("12.50"),
+    "created": datetime(2025, 5, 25, 2, 5, 1, 123456, tzinfo=timezone.utc),
+    "label": gettext_lazy("Name"),
+    "tags": [{"id": 2, "name": "ایرانی"}],
+    "counts": {3: "three"},
+    "separator": "a b",
+    "image": None,
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def test_matches_stock_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE),
+            JSONRenderer().render(SAMPLE)
+        )
+
+    def test_persian_text_not_escaped(self):
+        rendered = FastJSONRenderer().render({"name": "ایرانی"})
+
+        self.assertEqual(rendered, '{"name":"ایرانی"}'.encode())
+
+    def test_indented_output_uses_stock_renderer(self):
+        rendered = FastJSONRenderer().render(
+            SAMPLE,
+            "application/json; indent=4"
+        )
+
+        self.assertEqual(
+            rendered,
+            JSONRenderer().render(SAMPLE, "application/json; indent=4")
+        )
+
+    def test_fallback_without_orjson(self):
+        with patch("core.renderers.orjson", None):
+            rendered = FastJSONRenderer().render(SAMPLE)
+
+        self.assertEqual(rendered, JSONRenderer().render(SAMPLE))
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+
+class FastJSONParserTests(SimpleTestCase):
+    def parse(self, body, **context):
+        return FastJSONParser().parse(
+            io.BytesIO(body),
+            parser_context=context
+        )
+
+    def test_parse(self):
+        body = '{"title": "کباب", "price": "10.5", "tags": []}'.encode()
+
+        self.assertEqual(
+            self.parse(body),
+            JSONParser().parse(io.BytesIO(body))
+        )
+
+    def test_invalid_json_raises_parse_error(self):
+        with self.assertRaises(ParseError):
+            self.parse(b'{"title": ')
+
+    def test_other_encoding_uses_stock_parser(self):
+        body = '{"title": "کباب"}'.encode("utf-16")
+
+        self.assertEqual(
+            self.parse(body, encoding="utf-16"),
+            {"title": "کباب"}
+        )
@@ -0,0 +1,68 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import schema
+
+SCHEMA_URL = reverse("schema")
+
+
+class BuildSchemaCommandTests(SimpleTestCase):
+    def test_committed_schema_is_up_to_date(self):
+        out = StringIO()
+
+        call_command("build_schema", check=True, stdout=out)
+
+        self.assertIn("up to date", out.getvalue())
+
+    def test_stale_schema_fails_check(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "schema.yml"
+            path.write_text("openapi: 3.0.3\n")
+
+            with override_settings(SCHEMA_FILE=path), \
+                    self.assertRaises(CommandError):
+                call_command("build_schema", check=True, stdout=StringIO())
+
+
+class CachedSchemaViewTests(SimpleTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        schema.clear_cache()
+        self.addCleanup(schema.clear_cache)
+
+    def test_schema_rendered_once(self):
+        with patch("core.schema.load_schema", wraps=schema.load_schema) \
+                as load:
+            first = self.client.get(SCHEMA_URL)
+            second = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(load.call_count, 1)
+        self.assertTrue(first.content.startswith(b"openapi: 3.0.3"))
+        self.assertIn("max-age=", first["Cache-Control"])
+
+    def test_not_modified(self):
+        etag = self.client.get(SCHEMA_URL)["ETag"]
+
+        response = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_json_format(self):
+        yaml_response = self.client.get(SCHEMA_URL)
+        response = self.client.get(SCHEMA_URL, {"format": "json"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["openapi"], "3.0.3")
+        self.assertNotEqual(response["ETag"], yaml_response["ETag"])
@@ -0,0 +1,198 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core import similarity
+from core.deletion import purge_user
+from core.models import Ingredient, Recipe, RecipeSimilarity, Tag
+
+
+def create_recipe(user, **params):
+    defaults = {
+        "title": "recipe",
+        "price": Decimal("5.00"),
+        "time_minutes": 10,
+    }
+    defaults.update(user=user, **params)
+    return Recipe.objects.create(**defaults)
+
+
+class SimilarityTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="test@gmail.com",
+            password="test12345",
+        )
+        self.tags = [Tag.objects.create(user=self.user, name=f"t{i}")
+                     for i in range(4)]
+        self.egg = Ingredient.objects.create(user=self.user, name="egg")
+        self.base = create_recipe(self.user, title="base")
+        self.base.tags.add(*self.tags[:3])
+        self.base.ingredients.add(self.egg)
+        self.close = create_recipe(self.user, title="close")
+        self.close.tags.add(*self.tags[:3])
+        self.far = create_recipe(self.user, title="far")
+        self.far.tags.add(self.tags[0], self.tags[3])
+        self.unrelated = create_recipe(self.user, title="unrelated")
+
+    def stored(self, recipe):
+        return dict(
+            RecipeSimilarity.objects.filter(recipe=recipe)
+            .values_list("similar_id", "score")
+        )
+
+    def test_top_similar_scores_jaccard(self):
+        scores = similarity.top_similar(self.base.id)
+
+        self.assertEqual(
+            scores,
+            [(self.close.id, 3 / 4), (self.far.id, 1 / 5)]
+        )
+
+    @override_settings(SIMILAR_RECIPES_K=1)
+    def test_top_similar_keeps_k(self):
+        scores = similarity.top_similar(self.base.id)
+
+        self.assertEqual(scores, [(self.close.id, 3 / 4)])
+
+    def test_refresh_stores_neighbours_and_clears_stale(self):
+        similarity.refresh(self.base.id)
+
+        self.base.refresh_from_db()
+        self.assertFalse(self.base.similar_stale)
+        self.assertEqual(
+            self.stored(self.base),
+            {self.close.id: 3 / 4, self.far.id: 1 / 5}
+        )
+
+    def test_refresh_offers_recipe_to_neighbours(self):
+        similarity.refresh(self.base.id)
+
+        self.assertEqual(self.stored(self.close), {self.base.id: 3 / 4})
+        self.assertEqual(self.stored(self.far), {self.base.id: 1 / 5})
+        self.close.refresh_from_db()
+        self.assertTrue(self.close.similar_stale)
+
+    @override_settings(SIMILAR_RECIPES_K=1)
+    def test_offer_replaces_only_worse_neighbours(self):
+        RecipeSimilarity.objects.create(
+            recipe=self.far, similar=self.unrelated, score=0.9
+        )
+        RecipeSimilarity.objects.create(
+            recipe=self.close, similar=self.unrelated, score=0.1
+        )
+
+        similarity.refresh(self.base.id)
+
+        self.assertEqual(self.stored(self.far), {self.unrelated.id: 0.9})
+        self.assertEqual(self.stored(self.close), {self.base.id: 3 / 4})
+
+    def test_link_changes_mark_stale(self):
+        similarity.refresh(self.base.id)
+        similarity.refresh(self.close.id)
+
+        Recipe.objects.get(id=self.close.id).tags.remove(self.tags[2])
+
+        stale = set(
+            Recipe.objects.filter(similar_stale=True)
+            .values_list("id", flat=True)
+        )
+        self.assertIn(self.close.id, stale)
+        self.assertIn(self.base.id, stale)
+
+    def test_every_link_change_marks_stale(self):
+        recipe = Recipe.objects.get(id=self.close.id)
+        with similarity.relinking(recipe):
+            recipe.tags.clear()
+            with CaptureQueriesContext(connection) as queries:
+                recipe.tags.add(self.tags[0])
+        self.assertFalse(
+            any("similar_stale" in query["sql"] for query in queries)
+        )
+
+        for change in (
+            lambda: recipe.tags.add(self.tags[1]),
+            lambda: recipe.tags.remove(self.tags[0]),
+        ):
+            similarity.refresh_stale()
+            change()
+
+            recipe.refresh_from_db()
+            self.assertTrue(recipe.similar_stale)
+
+    def test_tag_clear_marks_linked_recipes_stale(self):
+        similarity.refresh_stale()
+
+        self.tags[3].recipe_set.clear()
+
+        self.far.refresh_from_db()
+        self.unrelated.refresh_from_db()
+        self.assertTrue(self.far.similar_stale)
+        self.assertFalse(self.unrelated.similar_stale)
+
+    def test_link_change_refreshes_on_commit(self):
+        similarity.refresh_stale()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.far.tags.add(self.tags[1])
+
+        self.assertEqual(len(callbacks), 1)
+        self.far.refresh_from_db()
+        self.assertFalse(self.far.similar_stale)
+        self.assertEqual(self.stored(self.far)[self.base.id], 2 / 5)
+
+    def test_relinking_refreshes_once(self):
+        recipe = Recipe.objects.get(id=self.unrelated.id)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with similarity.relinking(recipe):
+                recipe.tags.add(*self.tags[:3])
+                recipe.ingredients.add(self.egg)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.stored(recipe)[self.base.id], 1)
+
+    @override_settings(SIMILAR_RECIPES_REFRESH_LIMIT=1)
+    def test_large_change_is_left_stale(self):
+        similarity.refresh_stale()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.tags[1].recipe_set.add(self.far, self.unrelated)
+
+        self.assertEqual(callbacks, [])
+        self.far.refresh_from_db()
+        self.assertTrue(self.far.similar_stale)
+
+    def test_refresh_stale(self):
+        done = similarity.refresh_stale(batch_size=2)
+
+        self.assertEqual(done, 4)
+        self.assertFalse(Recipe.objects.filter(similar_stale=True).exists())
+        self.assertEqual(self.stored(self.unrelated), {})
+
+    def test_command(self):
+        out = StringIO()
+        call_command(
+            "refresh_similar_recipes", user="test@gmail.com", stdout=out
+        )
+
+        self.assertIn("Refreshed 4 recipes", out.getvalue())
+        self.assertEqual(self.stored(self.base)[self.close.id], 3 / 4)
+
+        call_command("refresh_similar_recipes", stdout=out)
+        self.assertIn("Refreshed 0 recipes", out.getvalue())
+
+        call_command("refresh_similar_recipes", all=True, stdout=out)
+        self.assertIn("Refreshed 4 recipes", out.getvalue())
+
+    def test_purge_removes_similarities(self):
+        similarity.refresh_stale()
+
+        purge_user(self.user)
+
+        self.assertFalse(RecipeSimilarity.objects.exists())
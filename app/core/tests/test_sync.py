@@ -0,0 +1,207 @@
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import sync
+from core.deletion import purge_user, request_deletion
+from core.models import Ingredient, Recipe, Tag, Tombstone
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="sync@example.com",
+            password="test12345",
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title="recipe",
+            price=Decimal("5.00"),
+            time_minutes=10,
+        )
+        self.tag = Tag.objects.create(user=self.user, name="tag")
+
+    def updated_at(self):
+        return Recipe.objects.get(pk=self.recipe.pk).updated_at
+
+    def test_links_move_updated_at(self):
+        for change in (
+            lambda: self.recipe.tags.add(self.tag),
+            lambda: self.recipe.tags.remove(self.tag),
+            lambda: self.tag.recipe_set.add(self.recipe),
+            lambda: self.tag.recipe_set.clear(),
+            lambda: self.recipe.tags.set([self.tag]),
+            lambda: self.recipe.tags.clear(),
+        ):
+            before = self.updated_at()
+            change()
+            self.assertGreater(self.updated_at(), before)
+
+    def test_deleting_linked_tag_moves_updated_at(self):
+        self.recipe.tags.add(self.tag)
+        before = self.updated_at()
+
+        self.tag.delete()
+
+        self.assertGreater(self.updated_at(), before)
+
+    def test_deletes_leave_tombstones(self):
+        ingredient = Ingredient.objects.create(user=self.user, name="salt")
+        ids = {
+            "recipe": self.recipe.pk,
+            "tag": self.tag.pk,
+            "ingredient": ingredient.pk,
+        }
+
+        self.recipe.delete()
+        Tag.objects.filter(user=self.user).delete()
+        ingredient.delete()
+
+        self.assertEqual(
+            dict(Tombstone.objects.values_list("model", "object_id")), ids
+        )
+
+    def test_bulk_deletes_stay_bulk(self):
+        tags = Tag.objects.bulk_create(
+            Tag(user=self.user, name=f"t{i}") for i in range(50)
+        )
+        self.recipe.tags.add(tags[0])
+        before = self.updated_at()
+
+        with self.assertNumQueries(3):
+            Tag.objects.filter(user=self.user).delete()
+
+        self.assertGreater(self.updated_at(), before)
+        self.assertEqual(Tombstone.objects.filter(model="tag").count(), 51)
+
+    def test_purged_users_leave_no_tombstones(self):
+        request_deletion(self.user)
+
+        purge_user(self.user)
+
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_deleting_user_without_request(self):
+        self.recipe.tags.add(self.tag)
+
+        self.user.delete()
+
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_changed(self):
+        other = Recipe.objects.create(
+            user=self.user, title="other", price="1.00", time_minutes=1
+        )
+        Recipe.objects.update(updated_at=self.recipe.updated_at)
+        until = timezone.now()
+        queryset = Recipe.objects.all()
+
+        self.assertEqual(
+            list(sync.changed(queryset, None, until)), [self.recipe, other]
+        )
+        self.assertEqual(
+            list(sync.changed(
+                queryset, (self.recipe.updated_at, self.recipe.id), until
+            )),
+            [other]
+        )
+        self.assertEqual(
+            list(sync.changed(queryset, None, self.recipe.updated_at)), []
+        )
+
+    def test_cursor_round_trip(self):
+        until = timezone.now()
+        positions = sync.initial_positions(until)
+        positions["tags"] = (until - timedelta(days=1), 12)
+
+        cursor = sync.encode_cursor(positions)
+
+        self.assertEqual(sync.decode_cursor(cursor), positions)
+
+    def test_invalid_cursors(self):
+        naive = sync.initial_positions(timezone.now())
+        naive["tags"] = (timezone.now().replace(tzinfo=None), 1)
+
+        for cursor in ("", "not base64!", "e30=", sync.encode_cursor(naive)):
+            with self.assertRaises(ValueError):
+                sync.decode_cursor(cursor)
+
+    @override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=1)
+    def test_expired_cursor(self):
+        cursor = sync.encode_cursor(sync.initial_positions(
+            timezone.now() - timedelta(days=2)
+        ))
+
+        with self.assertRaises(sync.CursorExpired):
+            sync.decode_cursor(cursor)
+
+    @override_settings(SYNC_SETTLE_SECONDS=5)
+    def test_horizon(self):
+        before = timezone.now()
+
+        until = sync.horizon()
+
+        after = timezone.now()
+        self.assertLessEqual(until, after - timedelta(seconds=5))
+        self.assertGreater(until, before - timedelta(seconds=6))
+
+    @override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=30)
+    def test_prune_tombstones(self):
+        self.recipe.delete()
+        self.tag.delete()
+        Tombstone.objects.filter(model="tag").update(
+            deleted_at=timezone.now() - timedelta(days=31)
+        )
+        out = StringIO()
+
+        call_command("collect_garbage", skip_files=True, stdout=out)
+
+        self.assertIn("Deleted 1 tombstones", out.getvalue())
+        self.assertEqual(
+            list(Tombstone.objects.values_list("model", flat=True)),
+            ["recipe"]
+        )
+
+
+class LongTransactionTests(TransactionTestCase):
+    @override_settings(SYNC_SETTLE_SECONDS=0)
+    def test_horizon_waits_for_open_transactions(self):
+        user = get_user_model().objects.create_user(
+            email="long@example.com",
+            password="test12345",
+        )
+        written, release = threading.Event(), threading.Event()
+
+        def write():
+            try:
+                with transaction.atomic():
+                    # Start the transaction before taking the timestamp.
+                    Tag.objects.exists()
+                    Tag.objects.create(user=user, name="late")
+                    written.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        try:
+            self.assertTrue(written.wait(5))
+            time.sleep(0.2)
+            until = sync.horizon()
+        finally:
+            release.set()
+            thread.join(5)
+
+        tags = sync.changed(
+            Tag.objects.filter(user=user), (until, 0), sync.horizon()
+        )
+        self.assertEqual([tag.name for tag in tags], ["late"])
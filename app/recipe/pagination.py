@@ -0,0 +1,208 @@
+import json
+from base64 import b64decode, b64encode
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import connections
+from django.db.models import F, Func, Value
+from django.db.models.lookups import GreaterThan, LessThan
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+Cursor = namedtuple("Cursor", ["reverse", "position"])
+
+
+class Row(Func):
+    function = "ROW"
+
+
+def planner_estimate(queryset):
+    """Rows PostgreSQL expects `queryset` to return, from `EXPLAIN`."""
+    plan = json.loads(queryset.explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def cheap_count(queryset, threshold):
+    """`(count, exact)` for `queryset` without counting past `threshold`.
+
+    Up to `threshold` rows are counted exactly through a LIMIT subquery;
+    beyond that the planner's estimate is used, never reported as less
+    than what was counted.
+    """
+    queryset = queryset.order_by()
+    count = queryset[:threshold + 1].count()
+    if count <= threshold:
+        return count, True
+    if connections[queryset.db].vendor != "postgresql":
+        return count, False
+    return max(count, planner_estimate(queryset)), False
+
+
+class KeysetPagination(CursorPagination):
+    """Cursor pagination on the queryset's `(field, id)` ordering.
+
+    The cursor holds the sort value and id of the row at the page boundary
+    and pages are selected with a row comparison, `(field, id) < (x, y)`,
+    which PostgreSQL answers from a `(user, field, id)` index. Unlike the
+    stock cursor there is no OFFSET for ties, so every page costs the same
+    however deep the client goes.
+
+    Responses carry a `count` of the whole result, exact up to
+    `PAGINATION_EXACT_COUNT_THRESHOLD` rows and estimated above it, with
+    `count_exact` telling which.
+    """
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = ("-id",)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(queryset.query.order_by) or self.ordering
+        directions = {name.startswith("-") for name in ordering}
+        if ordering[-1].lstrip("-") not in ("id", "pk") or len(directions) > 1:
+            raise ImproperlyConfigured(
+                "KeysetPagination needs an ordering ending with id, in a "
+                f"single direction, got {ordering}."
+            )
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = [name.lstrip("-") for name in self.ordering]
+        self.output_fields = [
+            self._output_field(queryset, name) for name in self.fields
+        ]
+        descending = self.ordering[0].startswith("-")
+
+        base = queryset
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        if reverse:
+            queryset = queryset.order_by(*(
+                name.lstrip("-") if descending else f"-{name}"
+                for name in self.fields
+            ))
+
+        if self.cursor:
+            lookup = LessThan if descending != reverse else GreaterThan
+            output_field = self.output_fields[0]
+            queryset = queryset.filter(lookup(
+                Row(*map(F, self.fields), output_field=output_field),
+                Row(*map(Value, self.cursor.position),
+                    output_field=output_field),
+            ))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+
+        # A lone first page is its own count.
+        if not self.cursor and not has_more:
+            self.count, self.count_exact = len(self.page), True
+        else:
+            self.count, self.count_exact = cheap_count(
+                base, settings.PAGINATION_EXACT_COUNT_THRESHOLD
+            )
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, bool(self.cursor)
+
+        if (self.has_next or self.has_previous) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.count,
+            "count_exact": self.count_exact,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response = super().get_paginated_response_schema(schema)
+        response["required"] = ["count", "count_exact", "results"]
+        response["properties"] = {
+            "count": {"type": "integer", "example": 123},
+            "count_exact": {
+                "type": "boolean",
+                "description": "False when `count` is an estimate",
+            },
+            **response["properties"],
+        }
+        return response
+
+    def _output_field(self, queryset, name):
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        if name == "pk":
+            return queryset.model._meta.pk
+        return queryset.model._meta.get_field(name)
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            return [instance[name] for name in self.fields]
+        return [getattr(instance, name) for name in self.fields]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._get_position_from_instance(
+            self.page[-1], self.ordering
+        ), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self._get_position_from_instance(
+            self.page[0], self.ordering
+        ), reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            data = json.loads(b64decode(encoded.encode("ascii")))
+            reverse, position = bool(data["r"]), data["p"]
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or \
+                len(position) != len(self.fields) or \
+                not all(
+                    isinstance(value, (str, int, float)) for value in position
+                ):
+            raise NotFound(self.invalid_cursor_message)
+
+        # Typed by the ordering, a crafted cursor or one from another
+        # ordering can't send a mistyped value to the database.
+        try:
+            position = [
+                field.to_python(value)
+                for field, value in zip(self.output_fields, position)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(reverse, position)
+
+    def encode_cursor(self, position, reverse):
+        # Decimals go out as strings and compare as numbers in SQL.
+        data = json.dumps(
+            {"r": int(reverse), "p": position},
+            default=str
+        ).encode()
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            b64encode(data).decode("ascii")
+        )
@@ -1,22 +1,58 @@
+from collections import defaultdict
+
+from django.db.models import QuerySet
 from rest_framework import serializers
 
+from core import similarity
+from core.importer import FORMATS
 from core.models import Ingredient, Recipe, Tag
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Serializer mixin taking a `fields` kwarg to limit the output fields.
+
+    Fields listed in `Meta.optional_fields` are left out unless requested.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+
+        if fields is None:
+            optional = getattr(self.Meta, "optional_fields", [])
+            fields = [name for name in self.fields if name not in optional]
+        for name in set(self.fields) - set(fields):
+            self.fields.pop(name)
+
+
+class IngredientSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Ingredient
+        fields = ["id", "name", "recipe_count"]
+        read_only_fields = ["recipe_count"]
+        optional_fields = ["recipe_count"]
+
+
+class IngredientSuggestionSerializer(serializers.ModelSerializer):
+    score = serializers.IntegerField(
+        read_only=True,
+        help_text="Number of recipes using the ingredient with the given ones"
+    )
+
     class Meta:
         model = Ingredient
-        fields = ["id", "name"]
+        fields = ["id", "name", "score"]
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
-        fields = ["id", "name"]
-        read_only_fields = ["id"]
+        fields = ["id", "name", "recipe_count"]
+        read_only_fields = ["id", "recipe_count"]
+        optional_fields = ["recipe_count"]
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
 
@@ -60,8 +96,9 @@ class RecipeSerializer(serializers.ModelSerializer):
 
         recipe = Recipe.objects.create(**validated_data)
 
-        self._get_or_create_tags(recipe, tags)
-        self._get_or_create_ingredients(recipe, ingredients)
+        with similarity.relinking(recipe):
+            self._get_or_create_tags(recipe, tags)
+            self._get_or_create_ingredients(recipe, ingredients)
 
         return recipe
 
@@ -69,11 +106,12 @@ class RecipeSerializer(serializers.ModelSerializer):
         tags = validated_data.pop("tags", None)
         ingredients = validated_data.pop("ingredients", None)
 
-        instance.ingredients.clear()
-        instance.tags.clear()
+        with similarity.relinking(instance):
+            instance.ingredients.clear()
+            instance.tags.clear()
 
-        self._get_or_create_ingredients(instance, ingredients)
-        self._get_or_create_tags(instance, tags)
+            self._get_or_create_ingredients(instance, ingredients)
+            self._get_or_create_tags(instance, tags)
 
         for key, value in validated_data.items():
             setattr(instance, key, value)
@@ -91,8 +129,176 @@ class RecipeDetailSerializer(RecipeSerializer):
     #     return super().create(validated_data)
 
 
+class SimilarRecipeSerializer(RecipeSerializer):
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ["similarity"]
+
+
+class PantryRecipeSerializer(RecipeSerializer):
+    coverage = serializers.FloatField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ["coverage", "missing"]
+
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ["id", "image"]
         kwargs = {"image": {"required": True}}
+
+
+class ValuesListSerializer:
+    """Read-only fast path producing the same output as
+    `serializer_class(queryset, many=True).data`.
+
+    Rows come from `values()` and each nested many-to-many field is loaded
+    with one query over the through table, so no model instances are built
+    and the per-field serializer machinery runs only where the output needs
+    it (decimals and files).
+    """
+
+    def __init__(self, serializer_class, fields=None, context=None):
+        kwargs = {} if fields is None else {"fields": fields}
+        self.context = context or {}
+        self.model = serializer_class.Meta.model
+        self.fields = serializer_class(context=self.context, **kwargs).fields
+
+    def _file_url(self, model_field):
+        request = self.context.get("request")
+
+        def to_representation(name):
+            if not name:
+                return None
+            url = model_field.storage.url(name)
+            return request.build_absolute_uri(url) if request else url
+        return to_representation
+
+    def _nested(self, name, child_fields, ids):
+        descriptor = getattr(self.model, name)
+        target = descriptor.field.m2m_reverse_field_name()
+        source = descriptor.field.m2m_field_name()
+        values = descriptor.through.objects.filter(**{
+            f"{source}_id__in": ids
+        }).order_by("id").values_list(
+            f"{source}_id",
+            *(f"{target}__{child}" for child in child_fields)
+        )
+
+        related = defaultdict(list)
+        for parent_id, *row in values:
+            related[parent_id].append(dict(zip(child_fields, row)))
+        return related
+
+    def values(self, queryset):
+        """The `values()` queryset `to_representation` reads.
+
+        Columns the queryset is ordered by are selected too, so a paginator
+        can build its cursor from the rows.
+        """
+        columns = ["id"]
+        for name, field in self.fields.items():
+            if name not in columns and \
+                    not isinstance(field, serializers.ListSerializer):
+                columns.append(name)
+        for name in queryset.query.order_by:
+            name = name.lstrip("-")
+            if name not in columns and name != "pk":
+                columns.append(name)
+        return queryset.prefetch_related(None).values(*columns)
+
+    def to_representation(self, rows):
+        """Serialize a queryset, or rows already read from `values()`."""
+        nested, converters = {}, {}
+        for name, field in self.fields.items():
+            if isinstance(field, serializers.ListSerializer):
+                nested[name] = list(field.child.fields)
+            elif isinstance(field, serializers.DecimalField):
+                converters[name] = field.to_representation
+            elif isinstance(field, serializers.FileField):
+                converters[name] = self._file_url(
+                    self.model._meta.get_field(name)
+                )
+
+        if isinstance(rows, QuerySet):
+            rows = self.values(rows)
+        rows = list(rows)
+        ids = [row["id"] for row in rows]
+        nested = {
+            name: self._nested(name, child_fields, ids)
+            for name, child_fields in nested.items()
+        }
+
+        data = []
+        for row in rows:
+            item = {}
+            for name in self.fields:
+                if name in nested:
+                    item[name] = nested[name][row["id"]]
+                elif name in converters:
+                    item[name] = converters[name](row[name])
+                else:
+                    item[name] = row[name]
+            data.append(item)
+        return data
+
+
+class RecipeFilterSerializer(serializers.Serializer):
+    """Range filters and ordering of the recipe list, read from the query
+    string."""
+    ORDERINGS = [
+        "-id", "id", "price", "-price", "time_minutes", "-time_minutes"
+    ]
+    LOOKUPS = {
+        "price_min": "price__gte",
+        "price_max": "price__lte",
+        "time_min": "time_minutes__gte",
+        "time_max": "time_minutes__lte",
+    }
+
+    price_min = serializers.DecimalField(
+        max_digits=5, decimal_places=2, required=False
+    )
+    price_max = serializers.DecimalField(
+        max_digits=5, decimal_places=2, required=False
+    )
+    time_min = serializers.IntegerField(required=False)
+    time_max = serializers.IntegerField(required=False)
+    ordering = serializers.ChoiceField(
+        choices=ORDERINGS, default="-id"
+    )
+
+    def lookups(self):
+        return {
+            lookup: self.validated_data[name]
+            for name, lookup in self.LOOKUPS.items()
+            if name in self.validated_data
+        }
+
+
+class RecipeImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=FORMATS, required=False)
+
+
+class DeletedSerializer(serializers.Serializer):
+    recipes = serializers.ListField(child=serializers.IntegerField())
+    tags = serializers.ListField(child=serializers.IntegerField())
+    ingredients = serializers.ListField(child=serializers.IntegerField())
+
+
+class ChangesSerializer(serializers.Serializer):
+    """Response of the delta sync endpoint."""
+    recipes = RecipeDetailSerializer(many=True)
+    tags = TagSerializer(many=True)
+    ingredients = IngredientSerializer(many=True)
+    deleted = DeletedSerializer()
+    cursor = serializers.CharField(
+        help_text="Pass as `since` on the next sync"
+    )
+    has_more = serializers.BooleanField(
+        help_text="More changes are waiting, sync again right away"
+    )
@@ -1,4 +1,5 @@
 from decimal import Decimal
+from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
 from django.test import TestCase
@@ -10,6 +11,7 @@ from core.models import Ingredient, Recipe
 from recipe.serializers import IngredientSerializer
 
 INGREDIENTS_URL = reverse("recipe:ingredient-list")
+SUGGESTIONS_URL = reverse("recipe:ingredient-suggestions")
 
 
 def get_detail(ingredient_id):
@@ -61,7 +63,7 @@ class PrivateIngredientsAPITest(TestCase):
         queryset = Ingredient.objects.order_by("-name")
         serializer = IngredientSerializer(queryset, many=True)
 
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data["results"], serializer.data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     def test_ingredient_limited_to_user(self):
@@ -73,9 +75,9 @@ class PrivateIngredientsAPITest(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["name"], ingredient2.name)
-        self.assertEqual(response.data[0]["id"], ingredient2.id)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["name"], ingredient2.name)
+        self.assertEqual(response.data["results"][0]["id"], ingredient2.id)
 
     def test_update_ingredient(self):
         ingredient = create_ingredient(user=self.user)
@@ -111,8 +113,8 @@ class PrivateIngredientsAPITest(TestCase):
         s1 = IngredientSerializer(ingredient1)
         s2 = IngredientSerializer(ingredient2)
 
-        self.assertIn(s1.data, response.data)
-        self.assertNotIn(s2.data, response.data)
+        self.assertIn(s1.data, response.data["results"])
+        self.assertNotIn(s2.data, response.data["results"])
 
     def test_filtered_ingredients_unique(self):
         ingredient = create_ingredient(user=self.user, name="ing")
@@ -128,4 +130,66 @@ class PrivateIngredientsAPITest(TestCase):
         response = self.client.get(INGREDIENTS_URL, params)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_exclude_fields(self):
+        ingredient = create_ingredient(user=self.user)
+
+        response = self.client.get(INGREDIENTS_URL, {"exclude": "name"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [{"id": ingredient.id}])
+
+    def test_suggestions(self):
+        egg, milk, flour, salt = [
+            create_ingredient(user=self.user, name=name)
+            for name in ("egg", "milk", "flour", "salt")
+        ]
+        create_recipe(user=self.user).ingredients.add(egg, milk, flour)
+        create_recipe(user=self.user).ingredients.add(egg, milk)
+        create_recipe(user=self.user).ingredients.add(salt)
+        other = create_user(email="other@gmail.com")
+        foreign = create_ingredient(user=other, name="foreign")
+        create_recipe(user=other).ingredients.add(egg, foreign)
+
+        response = self.client.get(SUGGESTIONS_URL, {"ingredients": egg.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {"id": milk.id, "name": "milk", "score": 2},
+            {"id": flour.id, "name": "flour", "score": 1},
+        ])
+
+        response = self.client.get(
+            SUGGESTIONS_URL, {"ingredients": f"{egg.id},{milk.id}"}
+        )
+        self.assertEqual(
+            [item["name"] for item in response.data], ["flour"]
+        )
+
+    def test_suggestions_skip_deleted_ingredients(self):
+        egg, milk = [
+            create_ingredient(user=self.user, name=name)
+            for name in ("egg", "milk")
+        ]
+        gone = milk.id
+        milk.delete()
+
+        with patch(
+            "core.cooccurrence.suggest", return_value=[(gone, 2)]
+        ):
+            response = self.client.get(
+                SUGGESTIONS_URL, {"ingredients": egg.id}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+    def test_suggestions_invalid_params(self):
+        response = self.client.get(SUGGESTIONS_URL)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(
+            SUGGESTIONS_URL, {"ingredients": "1", "limit": "x"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,27 +1,46 @@
+import base64
+import csv
+import io
+import json
 import tempfile
 from decimal import Decimal
 from pathlib import Path
+from unittest.mock import patch
 
 from PIL import Image
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
 
-from core.models import Ingredient, Recipe, Tag
+from core import similarity
+from core.models import Ingredient, Recipe, RecipeSimilarity, Tag
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
+    ValuesListSerializer,
 )
 
 RECIPES_URL = reverse("recipe:recipe-list")
+RECIPE_IMPORT_URL = reverse("recipe:recipe-import")
+RECIPE_EXPORT_URL = reverse("recipe:recipe-export")
+RECIPE_PANTRY_URL = reverse("recipe:recipe-pantry")
+RECIPE_CHANGES_URL = reverse("recipe:recipe-changes")
 
 
 def detail_url(recipe_id):
     return reverse("recipe:recipe-detail", args=[recipe_id])
 
 
+def similar_url(recipe_id):
+    return reverse("recipe:recipe-similar", args=[recipe_id])
+
+
 def image_upload_url(recipe_id):
     return reverse("recipe:recipe-upload-image", args=[recipe_id])
 
@@ -74,7 +93,7 @@ class PrivateRecipeAPITest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(serializer.data, response.data)
+        self.assertEqual(serializer.data, response.data["results"])
 
     def test_recipes_list_limited_to_user(self):
         other_user = create_user(
@@ -92,7 +111,7 @@ class PrivateRecipeAPITest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data["results"], serializer.data)
 
     def test_get_recipe_detail(self):
         recipe = create_recipe(user=self.user)
@@ -445,9 +464,9 @@ class PrivateRecipeAPITest(TestCase):
         s3 = RecipeSerializer(recipe3)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn(s1.data, response.data)
-        self.assertIn(s2.data, response.data)
-        self.assertNotIn(s3.data, response.data)
+        self.assertIn(s1.data, response.data["results"])
+        self.assertIn(s2.data, response.data["results"])
+        self.assertNotIn(s3.data, response.data["results"])
 
     def test_filter_recipes_by_ingredients(self):
         recipe1 = create_recipe(user=self.user, title="recipe1")
@@ -474,9 +493,383 @@ class PrivateRecipeAPITest(TestCase):
         s3 = RecipeSerializer(recipe3)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn(s1.data, response.data)
-        self.assertIn(s2.data, response.data)
-        self.assertNotIn(s3.data, response.data)
+        self.assertIn(s1.data, response.data["results"])
+        self.assertIn(s2.data, response.data["results"])
+        self.assertNotIn(s3.data, response.data["results"])
+
+    def test_list_sparse_fields(self):
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="tag"))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                RECIPES_URL,
+                {"fields": "id,title,image"}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(response.data["results"][0]),
+            ["id", "title", "image"]
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("description", queries[0]["sql"])
+
+    def test_retrieve_exclude_fields(self):
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="tag"))
+
+        response = self.client.get(
+            detail_url(recipe.id),
+            {"exclude": "description,ingredients"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("description", response.data)
+        self.assertNotIn("ingredients", response.data)
+        self.assertEqual(response.data["tags"][0]["name"], "tag")
+
+    def test_list_prefetches_tags_and_ingredients(self):
+        for _ in range(3):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(Tag.objects.create(user=self.user, name="tag"))
+
+        with self.assertNumQueries(3):
+            response = self.client.get(RECIPES_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_unknown_sparse_field_returns_error(self):
+        response = self.client.get(RECIPES_URL, {"fields": "id,user"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_values_list_serializer_matches_model_serializer(self):
+        tag = Tag.objects.create(user=self.user, name="تگ")
+        ingredient = Ingredient.objects.create(user=self.user, name="ing")
+        recipe1 = create_recipe(user=self.user, price=Decimal("5.5"))
+        recipe1.tags.add(tag)
+        recipe1.ingredients.add(ingredient)
+        recipe2 = create_recipe(user=self.user, title="with image")
+        recipe2.image = "uploads/recipe/sample.jpg"
+        recipe2.save()
+
+        recipes = Recipe.objects.filter(user=self.user).order_by("-id")
+        context = {"request": APIRequestFactory().get(RECIPES_URL)}
+        renderer = JSONRenderer()
+
+        expected = renderer.render(
+            RecipeSerializer(recipes, many=True, context=context).data
+        )
+        fast = renderer.render(
+            ValuesListSerializer(
+                RecipeSerializer,
+                context=context
+            ).to_representation(recipes)
+        )
+
+        self.assertEqual(fast, expected)
+
+
+class RecipeListFilterTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="test@gmail.com", password="test12345")
+        self.client.force_authenticate(self.user)
+
+        for title, price, minutes in [
+            ("a", "12.50", 20),
+            ("b", "12.50", 45),
+            ("c", "30.00", 10),
+            ("d", "8.00", 90),
+            ("e", "55.25", 30),
+        ]:
+            create_recipe(
+                user=self.user,
+                title=title,
+                price=Decimal(price),
+                time_minutes=minutes,
+            )
+
+    def titles(self, **params):
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [row["title"] for row in res.data["results"]]
+
+    def test_range_filters(self):
+        self.assertEqual(self.titles(time_max=30), ["e", "c", "a"])
+        self.assertEqual(self.titles(price_max="12.50"), ["d", "b", "a"])
+        self.assertEqual(
+            self.titles(price_min="10", price_max="40", time_min=15),
+            ["b", "a"]
+        )
+
+    def test_range_combines_with_tags(self):
+        tag = Tag.objects.create(user=self.user, name="quick")
+        for recipe in Recipe.objects.filter(title__in=["a", "c", "d"]):
+            recipe.tags.add(tag)
+
+        self.assertEqual(
+            self.titles(tags=str(tag.id), price_min="10"),
+            ["c", "a"]
+        )
+
+    def test_ordering(self):
+        self.assertEqual(self.titles(ordering="price"), list("dabce"))
+        self.assertEqual(self.titles(ordering="-price"), list("ecbad"))
+        self.assertEqual(self.titles(ordering="time_minutes"), list("caebd"))
+        self.assertEqual(self.titles(ordering="id"), list("abcde"))
+
+    def test_ordering_pages(self):
+        for ordering, expected in [("price", "dabce"), ("-price", "ecbad")]:
+            titles = []
+            res = self.client.get(
+                RECIPES_URL, {"ordering": ordering, "page_size": 2}
+            )
+            while True:
+                titles += [row["title"] for row in res.data["results"]]
+                if not res.data["next"]:
+                    break
+                res = self.client.get(res.data["next"])
+            self.assertEqual(titles, list(expected))
+
+            res = self.client.get(res.data["previous"])
+            self.assertEqual(
+                [row["title"] for row in res.data["results"]],
+                list(expected[2:4])
+            )
+
+    def test_count_exact(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {"time_max": 30})
+
+        self.assertFalse(any("COUNT(" in query["sql"] for query in queries))
+        self.assertEqual(res.data["count"], 3)
+        self.assertTrue(res.data["count_exact"])
+
+        res = self.client.get(RECIPES_URL, {"time_max": 30, "page_size": 2})
+        self.assertEqual(res.data["count"], 3)
+        self.assertTrue(res.data["count_exact"])
+
+        res = self.client.get(res.data["next"])
+        self.assertEqual(res.data["count"], 3)
+        self.assertTrue(res.data["count_exact"])
+
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=2)
+    def test_count_estimated_above_threshold(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {"page_size": 1})
+
+        self.assertFalse(res.data["count_exact"])
+        self.assertGreaterEqual(res.data["count"], 3)
+        self.assertTrue(
+            any(query["sql"].startswith("EXPLAIN") for query in queries)
+        )
+
+    def test_invalid_params(self):
+        for params in [
+            {"price_min": "cheap"},
+            {"price_max": "10000"},
+            {"time_max": "1.5"},
+            {"ordering": "title"},
+        ]:
+            res = self.client.get(RECIPES_URL, params)
+            self.assertEqual(
+                res.status_code, status.HTTP_400_BAD_REQUEST, params
+            )
+
+    def test_params_ignored_outside_the_list(self):
+        recipe = Recipe.objects.get(title="a")
+
+        res = self.client.get(
+            detail_url(recipe.id), {"ordering": "bogus", "price_min": "x"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_mistyped_price_cursor(self):
+        data = json.dumps({"r": 0, "p": ["cheap", 1]}).encode()
+
+        res = self.client.get(RECIPES_URL, {
+            "ordering": "price",
+            "cursor": base64.b64encode(data).decode(),
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SimilarRecipeTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="test@gmail.com", password="test12345")
+        self.client.force_authenticate(self.user)
+
+        tags = [Tag.objects.create(user=self.user, name=f"t{i}")
+                for i in range(3)]
+        self.recipe = create_recipe(user=self.user, title="base")
+        self.recipe.tags.add(*tags)
+        self.close = create_recipe(user=self.user, title="close")
+        self.close.tags.add(*tags[:2])
+        self.far = create_recipe(user=self.user, title="far")
+        self.far.tags.add(tags[0])
+
+    def test_similar_orders_by_score(self):
+        similarity.refresh_stale()
+
+        res = self.client.get(similar_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row["title"], row["similarity"]) for row in res.data],
+            [("close", 2 / 3), ("far", 1 / 3)]
+        )
+
+    def test_similar_not_computed_yet(self):
+        res = self.client.get(similar_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.similar_stale)
+        self.assertFalse(RecipeSimilarity.objects.exists())
+
+    def test_similar_after_create(self):
+        payload = {
+            "title": "new",
+            "time_minutes": 5,
+            "price": Decimal("1.00"),
+            "tags": [{"name": "t0"}, {"name": "t1"}],
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(RECIPES_URL, payload, format="json")
+
+        res = self.client.get(similar_url(res.data["id"]))
+
+        self.assertEqual(
+            [(row["title"], row["similarity"]) for row in res.data],
+            [("close", 1), ("base", 2 / 3), ("far", 1 / 2)]
+        )
+
+    def test_similar_limit(self):
+        similarity.refresh_stale()
+        res = self.client.get(similar_url(self.recipe.id), {"limit": 1})
+
+        self.assertEqual([row["title"] for row in res.data], ["close"])
+
+        res = self.client.get(similar_url(self.recipe.id), {"limit": "x"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_similar_serves_stored_rows(self):
+        RecipeSimilarity.objects.create(
+            recipe=self.recipe, similar=self.far, score=0.5
+        )
+
+        res = self.client.get(similar_url(self.recipe.id))
+
+        self.assertEqual(
+            [(row["id"], row["similarity"]) for row in res.data],
+            [(self.far.id, 0.5)]
+        )
+
+    def test_similar_other_user_recipe(self):
+        other = create_user(email="other@gmail.com", password="test12345")
+        recipe = create_recipe(user=other)
+
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PantryRecipeTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email="test@gmail.com", password="test12345")
+        self.client.force_authenticate(self.user)
+
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=f"i{i}")
+            for i in range(5)
+        ]
+        self.recipes = []
+        for count in range(1, 6):
+            recipe = create_recipe(user=self.user, title=f"r{count}")
+            # One by one, so links are stored in the order of the names.
+            for ingredient in self.ingredients[:count]:
+                recipe.ingredients.add(ingredient)
+            self.recipes.append(recipe)
+
+    def pantry(self, ids, **params):
+        params["ingredients"] = ",".join(str(item.id) for item in ids)
+        return self.client.get(RECIPE_PANTRY_URL, params)
+
+    def test_pantry_ranks_by_coverage(self):
+        res = self.pantry(self.ingredients[:2])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (row["title"], row["coverage"], row["missing"])
+                for row in res.data["results"]
+            ],
+            [
+                ("r2", 1.0, 0),
+                ("r1", 1.0, 0),
+                ("r3", 2 / 3, 1),
+                ("r4", 1 / 2, 2),
+                ("r5", 2 / 5, 3),
+            ]
+        )
+        self.assertEqual(
+            [item["name"] for item in res.data["results"][2]["ingredients"]],
+            ["i0", "i1", "i2"]
+        )
+
+    def test_pantry_pages(self):
+        titles, url = [], None
+        res = self.pantry(self.ingredients[:2], page_size=2)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            titles += [row["title"] for row in res.data["results"]]
+            url = res.data["next"]
+            if not url:
+                break
+            res = self.client.get(url)
+
+        self.assertEqual(titles, ["r2", "r1", "r3", "r4", "r5"])
+
+        res = self.client.get(res.data["previous"])
+        self.assertEqual(
+            [row["title"] for row in res.data["results"]],
+            ["r3", "r4"]
+        )
+
+    def test_pantry_min_coverage(self):
+        res = self.pantry(self.ingredients[:3], min_coverage="0.8")
+
+        self.assertEqual(
+            [row["title"] for row in res.data["results"]],
+            ["r3", "r2", "r1"]
+        )
+
+    def test_pantry_other_users_recipes(self):
+        other = create_user(email="other@gmail.com", password="test12345")
+        ingredient = Ingredient.objects.create(user=other, name="other")
+        create_recipe(user=other).ingredients.add(ingredient)
+
+        res = self.pantry([ingredient])
+
+        self.assertEqual(res.data["results"], [])
+
+    def test_pantry_invalid_params(self):
+        res = self.client.get(RECIPE_PANTRY_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPE_PANTRY_URL, {"ingredients": "1,x"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.pantry(self.ingredients, min_coverage="x")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
 
 class ImageUploadTest(TestCase):
@@ -516,3 +909,410 @@ class ImageUploadTest(TestCase):
             format="multipart"
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeImportTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email="importer@gmail.com",
+            password="test123456",
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, name, content):
+        file = SimpleUploadedFile(name, content.encode("utf-8"))
+        return self.client.post(
+            RECIPE_IMPORT_URL,
+            {"file": file},
+            format="multipart"
+        )
+
+    def test_import_csv(self):
+        Tag.objects.create(user=self.user, name="iranian")
+        content = (
+            "title,description,price,time_minutes,link,tags,ingredients\n"
+            "قورمه سبزی,خورش,12.50,120,,iranian|stew,سبزی|لوبیا\n"
+            "omelette,,3.00,10,,breakfast,egg\n"
+        )
+
+        response = self.upload("recipes.csv", content)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["recipes"], 2)
+        self.assertEqual(response.data["tags"], 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+
+        recipe = Recipe.objects.get(user=self.user, title="قورمه سبزی")
+        self.assertEqual(recipe.price, Decimal("12.50"))
+        self.assertEqual(
+            sorted(recipe.tags.values_list("name", flat=True)),
+            ["iranian", "stew"]
+        )
+        self.assertEqual(recipe.ingredients.count(), 2)
+
+    def test_import_jsonl(self):
+        content = "\n".join([
+            '{"title": "soup", "price": "4.5", "time_minutes": 30, '
+            '"tags": [{"name": "warm"}], "ingredients": ["water", "salt"]}',
+            '{"title": "salad", "price": 2, "time_minutes": 5, '
+            '"ingredients": ["salt"]}',
+        ])
+
+        response = self.upload("recipes.jsonl", content)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["recipes"], 2)
+        self.assertEqual(response.data["ingredients"], 2)
+        self.assertEqual(response.data["links"], 4)
+        salt = Ingredient.objects.get(user=self.user, name="salt")
+        self.assertEqual(salt.recipe_set.count(), 2)
+
+    def test_import_invalid_row_saves_nothing(self):
+        content = (
+            "title,price,time_minutes\n"
+            "good,1.00,5\n"
+            "bad,1000.00,5\n"
+        )
+
+        response = self.upload("recipes.csv", content)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("line 3", response.data["detail"])
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_import_time_minutes_out_of_range(self):
+        content = "title,price,time_minutes\nlong,1.00,2147483648\n"
+
+        response = self.upload("recipes.csv", content)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("time_minutes is out of range", response.data["detail"])
+
+    def test_import_mistyped_values(self):
+        for row in (
+            '{"title": 5, "price": 1, "time_minutes": 5}',
+            '{"title": "soup", "price": 1, "time_minutes": 5, '
+            '"tags": [{"name": 3}]}',
+            '{"title": "soup", "price": 1, "time_minutes": 5, '
+            '"ingredients": {"name": "salt"}}',
+            '{"title": "soup", "price": 1, "time_minutes": 2.9}',
+            '{"title": "soup", "price": 1, "time_minutes": true}',
+        ):
+            response = self.upload("recipes.jsonl", row)
+
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, row
+            )
+            self.assertIn("line 1", response.data["detail"])
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_import_whole_float_minutes(self):
+        response = self.upload(
+            "recipes.jsonl",
+            '{"title": "soup", "price": 1, "time_minutes": 30.0}'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.get(user=self.user).time_minutes, 30)
+
+    def test_import_malformed_csv(self):
+        content = "title,price,time_minutes\n" + "x" * 200000 + ",1,5\n"
+
+        response = self.upload("recipes.csv", content)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("invalid CSV", response.data["detail"])
+
+    def test_import_nul_characters(self):
+        for row in (
+            '{"title": "so\\u0000up", "price": 1, "time_minutes": 5}',
+            '{"title": "soup", "price": 1, "time_minutes": 5, '
+            '"tags": ["a\\u0000"]}',
+        ):
+            response = self.upload("recipes.jsonl", row)
+
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+            self.assertIn("NUL", response.data["detail"])
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+
+class RecipeExportTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email="exporter@gmail.com",
+            password="test123456",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.recipe1 = create_recipe(user=self.user, title="کباب")
+        self.recipe1.tags.add(Tag.objects.create(user=self.user, name="grill"))
+        self.recipe2 = create_recipe(user=self.user, title="soup")
+        self.recipe2.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="water")
+        )
+
+        other_user = create_user(email="other@gmail.com", password="test123")
+        create_recipe(user=other_user)
+
+    def export(self, **params):
+        response = self.client.get(RECIPE_EXPORT_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_export_jsonl(self):
+        lines = self.export().splitlines()
+
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [row["id"] for row in rows],
+            [self.recipe2.id, self.recipe1.id]
+        )
+        self.assertEqual(rows[1]["title"], "کباب")
+        self.assertEqual(rows[1]["tags"], ["grill"])
+        self.assertEqual(rows[0]["ingredients"], ["water"])
+        self.assertIn("کباب", lines[1])
+
+    def test_export_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self.export(
+            export_format="csv"
+        ))))
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1]["tags"], "grill")
+        self.assertEqual(rows[0]["price"], "10.45")
+
+    def test_export_without_server_side_cursors(self):
+        with patch.dict(
+            connection.settings_dict,
+            {"DISABLE_SERVER_SIDE_CURSORS": True}
+        ), self.settings(EXPORT_CHUNK_SIZE=1):
+            rows = self.export().splitlines()
+
+        self.assertEqual(len(rows), 2)
+
+    def test_export_unknown_format(self):
+        response = self.client.get(RECIPE_EXPORT_URL, {"export_format": "x"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class RecipeChangesTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email="sync@gmail.com",
+            password="test12345",
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user, title="soup")
+        self.tag = Tag.objects.create(user=self.user, name="dinner")
+        self.recipe.tags.add(self.tag)
+        other = create_user(email="other@gmail.com", password="test12345")
+        create_recipe(other, title="not mine")
+
+    def sync(self, since=None):
+        params = {} if since is None else {"since": since}
+        response = self.client.get(RECIPE_CHANGES_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_first_sync_returns_everything(self):
+        data = self.sync()
+
+        self.assertEqual([row["title"] for row in data["recipes"]], ["soup"])
+        self.assertEqual(data["recipes"][0]["tags"], [
+            {"id": self.tag.id, "name": "dinner"}
+        ])
+        self.assertEqual(data["tags"], [{"id": self.tag.id, "name": "dinner"}])
+        self.assertEqual(data["ingredients"], [])
+        self.assertFalse(data["has_more"])
+
+    def test_sync_returns_only_changes(self):
+        cursor = self.sync()["cursor"]
+
+        data = self.sync(cursor)
+        self.assertEqual(
+            (data["recipes"], data["tags"], data["ingredients"]), ([], [], [])
+        )
+
+        new = create_recipe(self.user, title="salad")
+        self.tag.name = "supper"
+        self.tag.save()
+        data = self.sync(data["cursor"])
+
+        self.assertEqual([row["id"] for row in data["recipes"]], [new.id])
+        self.assertEqual(data["tags"], [{"id": self.tag.id, "name": "supper"}])
+
+    def test_link_changes_are_synced(self):
+        cursor = self.sync()["cursor"]
+        ingredient = Ingredient.objects.create(user=self.user, name="salt")
+
+        ingredient.recipe_set.add(self.recipe)
+        data = self.sync(cursor)
+
+        self.assertEqual(
+            [row["id"] for row in data["recipes"]], [self.recipe.id]
+        )
+        self.assertEqual(
+            data["recipes"][0]["ingredients"],
+            [{"id": ingredient.id, "name": "salt"}]
+        )
+
+    def test_deletions_are_synced(self):
+        cursor = self.sync()["cursor"]
+
+        recipe_id, tag_id = self.recipe.id, self.tag.id
+        self.recipe.delete()
+        self.tag.delete()
+        data = self.sync(cursor)
+
+        self.assertEqual(data["deleted"], {
+            "recipes": [recipe_id],
+            "tags": [tag_id],
+            "ingredients": [],
+        })
+        self.assertEqual(self.sync(data["cursor"])["deleted"]["recipes"], [])
+
+    @override_settings(SYNC_PAGE_SIZE=2)
+    def test_changes_are_paged(self):
+        for number in range(4):
+            create_recipe(self.user, title=f"recipe {number}")
+
+        seen, cursor, calls = [], None, 0
+        while True:
+            data = self.sync(cursor)
+            seen += [row["id"] for row in data["recipes"]]
+            cursor, calls = data["cursor"], calls + 1
+            if not data["has_more"]:
+                break
+
+        self.assertEqual(calls, 3)
+        self.assertEqual(
+            seen,
+            list(Recipe.objects.filter(user=self.user)
+                 .order_by("updated_at", "id").values_list("id", flat=True))
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get(RECIPE_CHANGES_URL, {"since": "nope"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=0)
+    def test_expired_cursor(self):
+        cursor = self.sync()["cursor"]
+
+        response = self.client.get(RECIPE_CHANGES_URL, {"since": cursor})
+
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+
+class RecipeIdempotencyTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email="retry@gmail.com",
+            password="test12345",
+        )
+        self.client.force_authenticate(self.user)
+        self.payload = {
+            "title": "soup",
+            "price": "5.00",
+            "time_minutes": 5,
+            "tags": [{"name": "dinner"}],
+        }
+
+    def post(self, url, payload, key="a", **kwargs):
+        kwargs.setdefault("format", "json")
+        return self.client.post(
+            url, payload, headers={"Idempotency-Key": key}, **kwargs
+        )
+
+    def test_retry_replays_the_response(self):
+        first = self.post(RECIPES_URL, self.payload)
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.post(RECIPES_URL, self.payload)
+
+        for query in queries:
+            self.assertNotIn("core_recipe", query["sql"])
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertNotIn("Idempotent-Replayed", first)
+        self.assertEqual(Recipe.objects.count(), 1)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_keys_are_per_user_and_route(self):
+        self.post(RECIPES_URL, self.payload)
+        recipe = Recipe.objects.get()
+        response = self.client.put(
+            detail_url(recipe.id),
+            self.payload,
+            format="json",
+            headers={"Idempotency-Key": "a"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("Idempotent-Replayed", response)
+
+        other = create_user(email="other@gmail.com", password="test12345")
+        self.client.force_authenticate(other)
+        self.post(RECIPES_URL, self.payload)
+
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_key_reused_for_another_request(self):
+        self.post(RECIPES_URL, self.payload)
+
+        response = self.post(RECIPES_URL, {**self.payload, "title": "other"})
+
+        self.assertEqual(
+            response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_failures_are_not_stored(self):
+        response = self.post(RECIPES_URL, {"title": "soup"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.post(RECIPES_URL, self.payload)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn("Idempotent-Replayed", response)
+
+    def test_invalid_key(self):
+        response = self.post(RECIPES_URL, self.payload, key="x" * 256)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_image_upload_retry(self):
+        recipe = create_recipe(self.user)
+        self.addCleanup(lambda: Recipe.objects.get().image.delete())
+        url = image_upload_url(recipe.id)
+        image = io.BytesIO()
+        Image.new("RGB", size=(10, 10)).save(image, format="JPEG")
+
+        def upload(content):
+            file = SimpleUploadedFile("photo.jpg", content, "image/jpeg")
+            return self.post(url, {"image": file}, format="multipart")
+
+        first = upload(image.getvalue())
+        with patch(
+            "recipe.serializers.RecipeImageSerializer.save"
+        ) as save:
+            retry = upload(image.getvalue())
+            save.assert_not_called()
+        other = upload(image.getvalue() + b"\0")
+
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(
+            other.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
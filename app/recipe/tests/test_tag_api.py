@@ -1,7 +1,11 @@
+import json
+from base64 import b64encode
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -68,7 +72,7 @@ class PrivateTagsAPITest(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data["results"], serializer.data)
 
     def test_tags_limited_to_user(self):
         other_user = create_user(email="other@gmail.com", password="test555")
@@ -78,9 +82,9 @@ class PrivateTagsAPITest(TestCase):
         response = self.client.get(TAGS_URL)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["id"], tag.id)
-        self.assertEqual(response.data[0]["name"], tag.name)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data["results"][0]["id"], tag.id)
+        self.assertEqual(response.data["results"][0]["name"], tag.name)
+        self.assertEqual(len(response.data["results"]), 1)
 
     def test_update_tag(self):
         tag = create_tag(self.user, name="my tag")
@@ -125,8 +129,8 @@ class PrivateTagsAPITest(TestCase):
         s1 = TagSerializer(tag1)
         s2 = TagSerializer(tag2)
 
-        self.assertIn(s1.data, response.data)
-        self.assertNotIn(s2.data, response.data)
+        self.assertIn(s1.data, response.data["results"])
+        self.assertNotIn(s2.data, response.data["results"])
 
     def test_filtered_tags_unique(self):
         tag = create_tag(user=self.user, name="tag")
@@ -142,4 +146,125 @@ class PrivateTagsAPITest(TestCase):
         response = self.client.get(TAGS_URL, params)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_sparse_fields(self):
+        create_tag(user=self.user, name="tag")
+
+        response = self.client.get(TAGS_URL, {"fields": "name"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [{"name": "tag"}])
+
+    def test_assigned_only_values(self):
+        used = create_tag(user=self.user, name="used")
+        create_recipe(user=self.user).tags.add(used)
+        create_tag(user=self.user, name="unused")
+
+        for value, expected in (("0", ["used", "unused"]), ("1", ["used"])):
+            response = self.client.get(TAGS_URL, {"assigned_only": value})
+            self.assertEqual(
+                [tag["name"] for tag in response.data["results"]], expected
+            )
+
+        response = self.client.get(TAGS_URL, {"assigned_only": "yes"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_params_ignored_outside_the_list(self):
+        tag = create_tag(user=self.user, name="tag")
+
+        response = self.client.patch(
+            tag_detail_url(tag.id) + "?ordering=bogus&assigned_only=x",
+            {"name": "renamed"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_assigned_only_uses_counter(self):
+        tag = create_tag(user=self.user, name="tag")
+        create_recipe(user=self.user).tags.add(tag)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertNotIn("DISTINCT", queries[0]["sql"])
+        self.assertNotIn("JOIN", queries[0]["sql"])
+
+    def test_order_by_most_used(self):
+        rare = create_tag(user=self.user, name="a rare")
+        common = create_tag(user=self.user, name="b common")
+        for _ in range(2):
+            create_recipe(user=self.user).tags.add(common)
+        create_recipe(user=self.user).tags.add(rare)
+
+        response = self.client.get(TAGS_URL, {
+            "ordering": "-recipe_count",
+            "fields": "id,recipe_count",
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [
+            {"id": common.id, "recipe_count": 2},
+            {"id": rare.id, "recipe_count": 1},
+        ])
+
+    def test_invalid_ordering(self):
+        response = self.client.get(TAGS_URL, {"ordering": "user"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cursor_pagination(self):
+        for name in ["a", "b", "b", "c", "d"]:
+            create_tag(user=self.user, name=name)
+        expected = list(
+            Tag.objects.order_by("-name", "-id").values_list("id", flat=True)
+        )
+
+        pages, url = [], TAGS_URL + "?page_size=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([tag["id"] for tag in response.data["results"]])
+            url = response.data["next"]
+
+        self.assertEqual(pages, [expected[:2], expected[2:4], expected[4:]])
+
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(
+            [tag["id"] for tag in response.data["results"]],
+            expected[2:4]
+        )
+
+    def test_cursor_follows_ordering(self):
+        tags = [create_tag(user=self.user, name=name) for name in "abc"]
+        create_recipe(user=self.user).tags.add(tags[1])
+
+        params = {"ordering": "recipe_count", "page_size": 2}
+        first = self.client.get(TAGS_URL, params)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(first.data["next"])
+
+        ids = [tag["id"] for tag in first.data["results"]] + \
+            [tag["id"] for tag in second.data["results"]]
+        self.assertEqual(ids, [tags[0].id, tags[2].id, tags[1].id])
+        self.assertIsNone(second.data["next"])
+        self.assertIn("ROW(", queries[0]["sql"])
+        self.assertNotIn("OFFSET", queries[0]["sql"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(TAGS_URL, {"cursor": "garbage"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_mistyped_cursor(self):
+        for params in (
+            {"ordering": "recipe_count", "p": ["many", 1]},
+            {"ordering": "name", "p": ["a", "b"]},
+        ):
+            data = json.dumps({"r": 0, "p": params.pop("p")}).encode()
+            params["cursor"] = b64encode(data).decode()
+
+            response = self.client.get(TAGS_URL, params)
+
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
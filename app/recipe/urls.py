@@ -1,6 +1,12 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+from .views import (
+    IngredientViewSet,
+    RecipeViewSet,
+    TagViewSet,
+    change_events,
+)
 
 app_name = "recipe"
 
@@ -10,4 +16,6 @@ router.register("recipes", RecipeViewSet)
 router.register("tags", TagViewSet)
 
 router.register("ingredients", IngredientViewSet)
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path("events/", change_events, name="events"),
+]
@@ -1,16 +1,156 @@
+import io
+import os
+from functools import cached_property
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection
+from django.db.models import Prefetch
+from django.http import JsonResponse, StreamingHttpResponse
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import mixins, status, viewsets
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.authentication import (
+    TokenAuthentication,
+    get_authorization_header,
+)
 from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from core.models import Ingredient, Recipe, Tag
+from core import (
+    cooccurrence,
+    events,
+    exporter,
+    idempotency,
+    pantry,
+    sync,
+)
+from core.authentication import BatchAuthentication
+from core.importer import RecipeImporter, RecipeImportError
+from core.models import Ingredient, Recipe, Tag, Tombstone
 from . import serializers
+from .pagination import KeysetPagination
+
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        name="fields",
+        type=str,
+        description="Comma separated list of fields to return",
+    ),
+    OpenApiParameter(
+        name="exclude",
+        type=str,
+        description="Comma separated list of fields to leave out",
+    ),
+]
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    name=idempotency.HEADER,
+    type=str,
+    location=OpenApiParameter.HEADER,
+    description="Unique key of the request; retries with the same key "
+                f"within {settings.IDEMPOTENCY_KEY_TTL_HOURS} hours get "
+                "the first response",
+)
+
+
+class SparseFieldsMixin:
+    """Let list and retrieve requests pick fields with `fields`/`exclude`.
+
+    The selection narrows both the serializer and the SQL: only the chosen
+    columns are loaded and related fields are prefetched only if requested.
+    """
+    sparse_actions = ["list", "retrieve"]
+
+    def split_names(self, text):
+        return [name.strip() for name in text.split(",") if name.strip()]
+
+    @cached_property
+    def sparse_fields(self):
+        params = self.request.query_params
+        if self.action not in self.sparse_actions or \
+                ("fields" not in params and "exclude" not in params):
+            return None
+
+        meta = self.get_serializer_class().Meta
+        available = list(meta.fields)
+        optional = getattr(meta, "optional_fields", [])
+        fields = self.split_names(params.get("fields", "")) or [
+            name for name in available if name not in optional
+        ]
+        exclude = self.split_names(params.get("exclude", ""))
+
+        unknown = set(fields + exclude) - set(available)
+        if unknown:
+            raise ValidationError(
+                {"fields": f"Unknown fields: {', '.join(sorted(unknown))}"}
+            )
+        return [
+            name for name in available
+            if name in fields and name not in exclude
+        ]
+
+    def narrow_queryset(self, queryset):
+        """Load only the columns and relations the response will use."""
+        if self.action not in self.sparse_actions:
+            return queryset
+
+        fields = self.sparse_fields
+        if fields is None:
+            fields = self.get_serializer_class().Meta.fields
+
+        columns = []
+        for name in fields:
+            field = queryset.model._meta.get_field(name)
+            if field.many_to_many:
+                queryset = queryset.prefetch_related(Prefetch(
+                    name,
+                    queryset=field.related_model.objects.only("id", "name")
+                ))
+            else:
+                columns.append(name)
+
+        if self.sparse_fields is not None:
+            queryset = queryset.only("id", *columns)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.sparse_fields is not None:
+            kwargs.setdefault("fields", self.sparse_fields)
+        return super().get_serializer(*args, **kwargs)
+
+
+class FastListMixin:
+    """Render list responses with `serializers.ValuesListSerializer`.
+
+    When the view has a paginator it is handed the `values()` rows, so the
+    page is cut before any nested data is loaded.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = serializers.ValuesListSerializer(
+            self.get_serializer_class(),
+            fields=self.sparse_fields,
+            context=self.get_serializer_context(),
+        )
+        rows = serializer.values(queryset)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation(page)
+            )
+        return Response(serializer.to_representation(queryset))
 
 
 @extend_schema(
     parameters=[
+        *SPARSE_FIELDS_PARAMETERS,
         OpenApiParameter(
             name="tags",
             description="Comma separated list of IDs to filter",
@@ -21,20 +161,62 @@ from . import serializers
             type=str,
             description="Comma separated list of IDs to filter",
         ),
+        OpenApiParameter(
+            name="price_min",
+            type=float,
+            description="Only recipes costing at least this much",
+        ),
+        OpenApiParameter(
+            name="price_max",
+            type=float,
+            description="Only recipes costing at most this much",
+        ),
+        OpenApiParameter(
+            name="time_min",
+            type=int,
+            description="Only recipes taking at least this many minutes",
+        ),
+        OpenApiParameter(
+            name="time_max",
+            type=int,
+            description="Only recipes taking at most this many minutes",
+        ),
+        OpenApiParameter(
+            name="ordering",
+            enum=serializers.RecipeFilterSerializer.ORDERINGS,
+            description="Sort order, newest first by default",
+        ),
     ],
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    FastListMixin,
+    SparseFieldsMixin,
+    viewsets.ModelViewSet
+):
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [TokenAuthentication, BatchAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    @extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    @idempotency.idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
 
+    @extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    @idempotency.idempotent
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    @extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER])
     @action(
         methods=["POST"],
         detail=True,
         url_path="upload-image",
         description="آپلود تصویر"
     )
+    @idempotency.idempotent
     def upload_image(self, request, pk=None):
         recipe = self.get_object()
         serializer = serializers.RecipeImageSerializer(
@@ -45,6 +227,248 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(
+        methods=["POST"],
+        detail=False,
+        url_path="import",
+        url_name="import",
+        description="ورود دسته ای دستور عمل ها از فایل CSV یا JSONL"
+    )
+    def import_recipes(self, request):
+        serializer = serializers.RecipeImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        file = serializer.validated_data["file"]
+        format = serializer.validated_data.get("format") or \
+            os.path.splitext(file.name)[1].lstrip(".").lower()
+
+        stream = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        try:
+            counts = RecipeImporter(request.user).run(stream, format)
+        except (RecipeImportError, UnicodeDecodeError) as error:
+            return Response(
+                {"detail": str(error)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(counts, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="export_format",
+                enum=list(exporter.FORMATS),
+                default="jsonl",
+                description="File format of the export",
+            ),
+        ],
+        responses={
+            (200, "application/x-ndjson"): OpenApiTypes.STR,
+            (200, "text/csv"): OpenApiTypes.STR,
+        },
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="export",
+        url_name="export",
+        description="خروجی گرفتن از همه دستور عمل ها"
+    )
+    def export(self, request):
+        format = request.query_params.get("export_format", "jsonl")
+        if format not in exporter.FORMATS:
+            return Response(
+                {"detail": f"Unsupported export format '{format}'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        response = StreamingHttpResponse(
+            exporter.export(self.get_queryset(), format),
+            content_type=exporter.FORMATS[format],
+        )
+        response["Content-Disposition"] = \
+            f'attachment; filename="recipes.{format}"'
+        return response
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="limit",
+                type=int,
+                description="Number of recipes to return, at most "
+                            f"{settings.SIMILAR_RECIPES_K}",
+            ),
+        ],
+        responses=serializers.SimilarRecipeSerializer(many=True),
+    )
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="similar",
+        url_name="similar",
+        description="دستور عمل های مشابه بر اساس تگ ها و مواد اولیه"
+    )
+    def similar(self, request, pk=None):
+        recipe = self.get_object()
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            raise ValidationError({"limit": "A valid integer is required."})
+        limit = max(1, min(limit, settings.SIMILAR_RECIPES_K))
+
+        # Link changes refresh the list on commit. Recipes left stale by
+        # imports or large changes keep serving their previous neighbours
+        # until `refresh_similar_recipes` picks them up.
+        stored = recipe.similarities.order_by("-score", "-similar_id") \
+            .values_list("similar_id", "score")
+        scores = dict(stored[:limit])
+
+        serializer = serializers.ValuesListSerializer(
+            serializers.RecipeSerializer,
+            context=self.get_serializer_context(),
+        )
+        rows = {
+            row["id"]: row for row in serializer.to_representation(
+                Recipe.objects.filter(user=request.user, id__in=scores)
+            )
+        }
+        return Response([
+            {**rows[recipe_id], "similarity": score}
+            for recipe_id, score in scores.items() if recipe_id in rows
+        ])
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="ingredients",
+                type=str,
+                required=True,
+                description="Comma separated list of ingredient IDs at hand",
+            ),
+            OpenApiParameter(
+                name="min_coverage",
+                type=float,
+                description="Only return recipes with at least this "
+                            "fraction of their ingredients at hand",
+            ),
+        ],
+        responses=serializers.PantryRecipeSerializer(many=True),
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="pantry",
+        url_name="pantry",
+        pagination_class=KeysetPagination,
+        description="دستور عمل هایی که با مواد اولیه موجود می توان پخت"
+    )
+    def cookable(self, request):
+        params = request.query_params
+        try:
+            ingredients = self.split_params_to_list(params["ingredients"])
+        except (KeyError, ValueError):
+            raise ValidationError(
+                {"ingredients": "A comma separated list of IDs is required."}
+            )
+        try:
+            min_coverage = float(params.get("min_coverage", 0))
+        except ValueError:
+            raise ValidationError({"min_coverage": "A number is required."})
+
+        queryset = pantry.cookable(
+            Recipe.objects.filter(user=request.user), ingredients
+        )
+        if min_coverage > 0:
+            queryset = queryset.filter(coverage__gte=min_coverage)
+
+        serializer = serializers.ValuesListSerializer(
+            self.get_serializer_class(),
+            context=self.get_serializer_context(),
+        )
+        page = self.paginate_queryset(serializer.values(queryset))
+        return self.get_paginated_response(
+            serializer.to_representation(page)
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="since",
+                type=str,
+                description="`cursor` of the previous sync, leave out to "
+                            "fetch everything",
+            ),
+        ],
+        responses={
+            200: serializers.ChangesSerializer,
+            410: OpenApiTypes.OBJECT,
+        },
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="changes",
+        url_name="changes",
+        description="تغییرات دستور عمل ها، تگ ها و مواد اولیه از آخرین "
+                    "همگام سازی"
+    )
+    def changes(self, request):
+        until = sync.horizon()
+        since = request.query_params.get("since")
+        if since is None:
+            positions = sync.initial_positions(until)
+        else:
+            try:
+                positions = sync.decode_cursor(since)
+            except sync.CursorExpired:
+                return Response(
+                    {"detail": "Cursor expired, sync again without since."},
+                    status=status.HTTP_410_GONE
+                )
+            except ValueError as error:
+                raise ValidationError({"since": str(error)})
+
+        limit = settings.SYNC_PAGE_SIZE
+        data, has_more = {}, False
+        for key, serializer_class in (
+            ("recipes", serializers.RecipeDetailSerializer),
+            ("tags", serializers.TagSerializer),
+            ("ingredients", serializers.IngredientSerializer),
+        ):
+            serializer = serializers.ValuesListSerializer(
+                serializer_class,
+                context=self.get_serializer_context(),
+            )
+            queryset = sync.changed(
+                sync.MODELS[key].objects.filter(user=request.user),
+                positions[key],
+                until,
+            )
+            rows, more = sync.page(
+                serializer.values(queryset), positions, key, until, limit
+            )
+            data[key] = serializer.to_representation(rows)
+            has_more |= more
+
+        tombstones = sync.changed(
+            Tombstone.objects.filter(user=request.user),
+            positions[sync.TOMBSTONES],
+            until,
+            field="deleted_at",
+        ).values("id", "deleted_at", "model", "object_id")
+        rows, more = sync.page(
+            tombstones, positions, sync.TOMBSTONES, until, limit,
+            field="deleted_at",
+        )
+        keys = {model._meta.model_name: key
+                for key, model in sync.MODELS.items()}
+        data["deleted"] = {key: [] for key in sync.MODELS}
+        for row in rows:
+            data["deleted"][keys[row["model"]]].append(row["object_id"])
+
+        data["cursor"] = sync.encode_cursor(positions)
+        data["has_more"] = has_more or more
+        return Response(data)
+
     def split_params_to_list(self, text):
         return [int(item) for item in text.split(",")]
 
@@ -63,35 +487,98 @@ class RecipeViewSet(viewsets.ModelViewSet):
             ingredients = self.split_params_to_list(ingredients)
             queryset = queryset.filter(ingredients__id__in=ingredients)
 
-        return queryset.filter(user=user).order_by("-id").distinct()
+        # Range filters and ordering only mean something for the list.
+        order_by = ["-id"]
+        if self.action == "list":
+            params = serializers.RecipeFilterSerializer(
+                data=self.request.query_params
+            )
+            params.is_valid(raise_exception=True)
+            queryset = queryset.filter(**params.lookups())
+
+            # The id tie-breaker follows the same direction so the
+            # paginator can seek with a single row comparison on the index.
+            ordering = params.validated_data["ordering"]
+            order_by = [ordering]
+            if ordering.lstrip("-") != "id":
+                order_by.append("-id" if ordering.startswith("-") else "id")
+
+        queryset = self.narrow_queryset(queryset)
+        return queryset.filter(user=user).order_by(*order_by).distinct()
 
     def get_serializer_class(self):
         if self.action == "list":
             return serializers.RecipeSerializer
         elif self.action == "upload_image":
             return serializers.RecipeImageSerializer
+        elif self.action == "import_recipes":
+            return serializers.RecipeImportSerializer
+        elif self.action == "cookable":
+            return serializers.PantryRecipeSerializer
+        elif self.action == "changes":
+            return serializers.ChangesSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
 
+@extend_schema(
+    parameters=[
+        *SPARSE_FIELDS_PARAMETERS,
+        OpenApiParameter(
+            name="assigned_only",
+            type=int,
+            enum=[0, 1],
+            description="Only return items used by at least one recipe",
+        ),
+        OpenApiParameter(
+            name="ordering",
+            enum=["name", "-name", "recipe_count", "-recipe_count"],
+            description="Sort order, -recipe_count lists most used first",
+        ),
+    ]
+)
 class BaseRecipeAttrViewSet(
+    FastListMixin,
+    SparseFieldsMixin,
     mixins.ListModelMixin,
     mixins.UpdateModelMixin,
     mixins.DestroyModelMixin,
     viewsets.GenericViewSet
 ):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [TokenAuthentication, BatchAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    orderings = ["name", "-name", "recipe_count", "-recipe_count"]
 
     def get_queryset(self):
         user = self.request.user
-        queryset = self.queryset
-        assigned_only = bool(self.request.query_params.get("assigned_only", 0))
+        queryset = self.narrow_queryset(self.queryset).filter(user=user)
+        # Filter and ordering only mean something for the list.
+        if self.action != "list":
+            return queryset
+
+        try:
+            assigned_only = bool(
+                int(self.request.query_params.get("assigned_only", 0))
+            )
+        except ValueError:
+            raise ValidationError({"assigned_only": "Choose 0 or 1."})
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-        return queryset.filter(user=user).order_by("-name").distinct()
+            queryset = queryset.filter(recipe_count__gt=0)
+
+        ordering = self.request.query_params.get("ordering", "-name")
+        if ordering not in self.orderings:
+            raise ValidationError(
+                {"ordering": f"Choose one of {', '.join(self.orderings)}"}
+            )
+
+        # The id tie-breaker follows the same direction so the paginator
+        # can seek with a single row comparison on the index.
+        tie_breaker = "-id" if ordering.startswith("-") else "id"
+        return queryset.order_by(ordering, tie_breaker)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -102,3 +589,110 @@ class TagViewSet(BaseRecipeAttrViewSet):
 class IngredientViewSet(BaseRecipeAttrViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="ingredients",
+                type=str,
+                required=True,
+                description="Comma separated list of ingredient IDs already "
+                            "in the recipe",
+            ),
+            OpenApiParameter(
+                name="limit",
+                type=int,
+                description="Number of suggestions to return, at most 100",
+            ),
+        ],
+        responses=serializers.IngredientSuggestionSerializer(many=True),
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="suggestions",
+        url_name="suggestions",
+        pagination_class=None,
+        description="پیشنهاد مواد اولیه ای که اغلب همراه این مواد می آیند"
+    )
+    def suggestions(self, request):
+        params = request.query_params
+        try:
+            ingredients = [
+                int(item) for item in params["ingredients"].split(",")
+            ]
+        except (KeyError, ValueError):
+            raise ValidationError(
+                {"ingredients": "A comma separated list of IDs is required."}
+            )
+        try:
+            limit = int(params.get("limit", 10))
+        except ValueError:
+            raise ValidationError({"limit": "A valid integer is required."})
+        limit = max(1, min(limit, 100))
+
+        scores = dict(cooccurrence.suggest(request.user, ingredients, limit))
+        names = dict(
+            Ingredient.objects.filter(id__in=scores).values_list("id", "name")
+        )
+        # An ingredient deleted since the scores were read is left out.
+        return Response([
+            {"id": ingredient_id, "name": names[ingredient_id], "score": score}
+            for ingredient_id, score in scores.items()
+            if ingredient_id in names
+        ])
+
+
+def _authenticate(request):
+    """The user of the request's `Token` header, or None."""
+    try:
+        keyword, key = get_authorization_header(request).split()
+        if keyword.decode().lower() != TokenAuthentication.keyword.lower():
+            return None
+        user, token = TokenAuthentication().authenticate_credentials(
+            key.decode()
+        )
+        return user
+    except (ValueError, UnicodeError, AuthenticationFailed):
+        return None
+    finally:
+        # The stream may stay open for hours, it holds no connection.
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+async def change_events(request):
+    """Server-sent events telling a user their recipes, tags or
+    ingredients changed, fed by PostgreSQL `LISTEN` (see core.events).
+
+    Events carry no data beyond the models written; clients fetch the
+    changes themselves from `changes`, also after reconnecting. Served
+    under ASGI only: WSGI handlers read a streaming body to its end, which
+    this one never reaches.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "Change events are only served over ASGI."},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+    if request.method != "GET":
+        return JsonResponse(
+            {"detail": f'Method "{request.method}" not allowed.'},
+            status=status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        response = JsonResponse(
+            {"detail": "Authentication credentials were not provided."},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+        response["WWW-Authenticate"] = TokenAuthentication.keyword
+        return response
+
+    response = StreamingHttpResponse(
+        events.stream(user.id), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Tells nginx not to buffer the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response
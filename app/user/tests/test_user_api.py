@@ -131,3 +131,17 @@ class PrivateUserAPITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(self.user.name, payload["name"])
         self.assertTrue(self.user.check_password(payload["password"]))
+
+    def test_delete_account_is_deferred(self):
+        response = self.client.delete(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertIsNotNone(self.user.deletion_requested_at)
+
+        response = APIClient().post(TOKEN_URL, {
+            "email": self.user.email,
+            "password": "password1234",
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
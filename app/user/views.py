@@ -1,8 +1,13 @@
+from drf_spectacular.utils import extend_schema
 from rest_framework import generics, authentication
-from rest_framework import permissions
+from rest_framework import permissions, status
 from rest_framework.authtoken import views
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
+from core.authentication import BatchAuthentication
+from core.deletion import request_deletion
+
 from .serializers import AuthTokenSerializer, UserSerializer
 
 
@@ -15,11 +20,22 @@ class CreateTokenView(views.ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = UserSerializer
     # queryset = get_user_model().objects.all()
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [
+        authentication.TokenAuthentication,
+        BatchAuthentication,
+    ]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         return self.request.user
+
+    @extend_schema(
+        responses={202: None},
+        description="غیرفعال کردن حساب؛ داده ها بعدا در پس زمینه حذف میشوند"
+    )
+    def delete(self, request, *args, **kwargs):
+        request_deletion(request.user)
+        return Response(status=status.HTTP_202_ACCEPTED)
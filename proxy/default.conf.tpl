@@ -1,14 +1,74 @@
+# Clients accepting brotli get a precompressed `.br` sibling, others a
+# suffix that never exists on disk.
+map $http_accept_encoding $static_br {
+    default       ".no-br";
+    "~*\bbr\b"    ".br";
+}
+
 # configuration of the server
 server {
     listen      ${LISTEN_PORT};
 
+    # collectstatic output: content hashed names with precompressed .gz
+    # and .br copies, see core.storage. gzip_static serves the .gz; stock
+    # nginx has no brotli module, so .br copies are picked by hand.
+    location /static/static/ {
+        root /vol;
+        gzip_static on;
+        add_header Vary Accept-Encoding;
+
+        if (-f $request_filename$static_br) {
+            rewrite ^(.*)$ $1$static_br last;
+        }
+
+        # A hashed name changes with its content.
+        location ~ "\.[0-9a-f]{12}\.\w+$" {
+            add_header Vary Accept-Encoding;
+            add_header Cache-Control "public, max-age=31536000, immutable";
+        }
+
+        location ~ \.br$ {
+            gzip_static off;
+            add_header Vary Accept-Encoding;
+            add_header Cache-Control "public, max-age=31536000, immutable";
+            add_header Content-Encoding br;
+
+            location ~ \.css\.br$ { types {} default_type text/css; }
+            location ~ \.m?js\.br$ {
+                types {} default_type application/javascript;
+            }
+            location ~ \.(json|map)\.br$ {
+                types {} default_type application/json;
+            }
+            location ~ \.svg\.br$ { types {} default_type image/svg+xml; }
+            location ~ \.html\.br$ { types {} default_type text/html; }
+            location ~ \.txt\.br$ { types {} default_type text/plain; }
+            location ~ \.xml\.br$ { types {} default_type text/xml; }
+            location ~ \.ico\.br$ { types {} default_type image/x-icon; }
+            location ~ \.ttf\.br$ { types {} default_type font/ttf; }
+            location ~ \.eot\.br$ {
+                types {} default_type application/vnd.ms-fontobject;
+            }
+        }
+    }
+
     location /static {
         alias /vol/static;
     }
 
+    # Server-sent events come from the ASGI service, unbuffered.
+    location /api/recipe/events/ {
+        proxy_pass         http://${EVENTS_HOST}:${EVENTS_PORT};
+        proxy_http_version 1.1;
+        proxy_set_header   Connection "";
+        proxy_set_header   Host $host;
+        proxy_set_header   X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_buffering    off;
+    }
+
     location / {
         uwsgi_pass           ${APP_HOST}:${APP_PORT};
         include              /etc/nginx/uwsgi_params;
         client_max_body_size 75M;
     }
-}
\ No newline at end of file
+}
@@ -2,5 +2,7 @@
 
 set -e
 
-envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
+# Only our variables, nginx's own $variables must stay in the config.
+envsubst '${LISTEN_PORT} ${APP_HOST} ${APP_PORT} ${EVENTS_HOST} ${EVENTS_PORT}' \
+    < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
 nginx -g 'daemon off;'
\ No newline at end of file
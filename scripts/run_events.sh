@@ -0,0 +1,9 @@
+#!/bin/sh
+
+set -e
+
+python manage.py wait_for_db
+
+# Server-sent events (app.asgi); each worker keeps one LISTEN connection.
+uvicorn app.asgi:application --host 0.0.0.0 --port 9001 --workers 2 \
+    --proxy-headers --forwarded-allow-ips '*'
@@ -0,0 +1,13 @@
+#!/bin/sh
+
+set -e
+
+python manage.py wait_for_db
+
+# Scheduled upkeep, every MAINTENANCE_INTERVAL seconds (default hourly).
+while true; do
+    python manage.py purge_users --pause 0.1 || true
+    python manage.py collect_garbage || true
+    python manage.py refresh_similar_recipes || true
+    sleep "${MAINTENANCE_INTERVAL:-3600}"
+done